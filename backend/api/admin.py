@@ -1,10 +1,118 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
 from .models import User, Document, Fee
 
 
+class InexactCount(int):
+    """A row count that is only an estimate; shows as "~N" in the changelist"""
+    template = "~{}"
+
+    def __str__(self):
+        return self.template.format(int(self))
+
+
+class LowerBoundCount(InexactCount):
+    """A row count that stopped at a limit; shows as "N+" """
+    template = "{}+"
+
+
+class BoundedCountPaginator(Paginator):
+    """
+    Changelist paginator that never counts more than ``COUNT_LIMIT`` rows.
+    An unfiltered changelist on PostgreSQL uses the planner's row estimate
+    instead once the table is larger than that; otherwise the count stops at
+    the limit. Either way pages past the count stay reachable, and the page
+    range grows as far as pages are found to have rows.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self._estimated_rows(queryset)
+            if estimate is not None and estimate > self.COUNT_LIMIT:
+                return InexactCount(estimate)
+        count = queryset.order_by()[:self.COUNT_LIMIT + 1].count()
+        return LowerBoundCount(self.COUNT_LIMIT) if count > self.COUNT_LIMIT else count
+
+    @property
+    def num_pages(self):
+        return max(super().num_pages, getattr(self, "_last_page_found", 0))
+
+    def validate_number(self, number):
+        if not isinstance(self.count, InexactCount):
+            return super().validate_number(number)
+        # Whether a page past the count exists is only known once it is read
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        if not isinstance(self.count, InexactCount):
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # One row more tells whether another page follows
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        found = number + 1 if len(rows) > self.per_page else number
+        self._last_page_found = max(getattr(self, "_last_page_found", 0), found)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    @staticmethod
+    def _estimated_rows(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > 0 else None
+
+
+class PageDateHierarchyChangeList(ChangeList):
+    """
+    Changelist whose date drill-down is built from the rows on the current
+    page. Django reads the distinct years, months or days from the whole
+    filtered queryset; here that queryset is narrowed to the page's primary
+    keys once the page is fetched, so the drill-down never scans the table.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        if self.date_hierarchy:
+            # Nothing reads self.queryset after this except the drill-down
+            self.queryset = self.queryset.filter(
+                pk__in=[obj.pk for obj in self.result_list]
+            )
+
+
+class BoundedCountAdmin(admin.ModelAdmin):
+    """Keeps changelist page cost independent of table size"""
+    paginator = BoundedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "N of M selected"
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return PageDateHierarchyChangeList
+
+
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(BoundedCountAdmin):
     list_display = (
         "username", "email", "role", "owes_fees", 
         "total_debt_display", "student_id", "graduation_year", 
@@ -33,7 +141,8 @@ class UserAdmin(admin.ModelAdmin):
 
     def total_debt_display(self, obj):
         """Display total debt with color coding"""
-        debt = obj.total_debt
+        # The stored balance, so no per-row query against the fee ledger
+        debt = obj.outstanding_balance
         if debt > 0:
             return format_html(
                 '<span style="color: red; font-weight: bold;">${:.2f}</span>',
@@ -41,17 +150,20 @@ class UserAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: green;">$0.00</span>')
     total_debt_display.short_description = "Total Debt"
+    total_debt_display.admin_order_field = "outstanding_balance"
 
 
 @admin.register(Fee)
-class FeeAdmin(admin.ModelAdmin):
+class FeeAdmin(BoundedCountAdmin):
     list_display = (
         "id", "user", "description", "amount", 
         "is_paid", "due_date", "paid_date", "created_at"
     )
     list_filter = ("is_paid", "created_at", "due_date")
+    list_select_related = ("user",)
     search_fields = ("user__username", "user__email", "description")
     readonly_fields = ("created_at", "updated_at", "created_by")
+    autocomplete_fields = ("user",)
     date_hierarchy = "created_at"
     
     fieldsets = (
@@ -74,17 +186,19 @@ class FeeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
+class DocumentAdmin(BoundedCountAdmin):
     list_display = (
         "id", "title", "document_type", "owner", 
         "file_size_display", "is_verified", "uploaded_at"
     )
     list_filter = ("document_type", "is_verified", "uploaded_at")
+    list_select_related = ("owner",)
     search_fields = ("title", "owner__username", "owner__email")
     readonly_fields = (
         "uploaded_at", "updated_at", "verified_by", 
         "verified_at", "file_size", "file_preview"
     )
+    autocomplete_fields = ("owner",)
     date_hierarchy = "uploaded_at"
     
     fieldsets = (
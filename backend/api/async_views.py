@@ -0,0 +1,85 @@
+"""
+Async versions of the login and register endpoints for ASGI deployments.
+
+Password hashing runs on ``api.hashing.hashing_pool`` instead of the event
+loop, and requests are refused with 429 when that pool's queue is full.
+Enabled in ``api/urls.py`` when ``AUTH_ASYNC_VIEWS`` is set.
+"""
+import json
+
+from django.http import HttpResponse
+from rest_framework import status
+
+from .hashing import PoolOverloaded, hashing_pool
+from .renderers import FastJSONRenderer
+from .serializers import LoginSerializer, RegisterSerializer
+from .views import auth_payload
+
+
+def _json_response(data, status_code):
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json"
+    )
+
+
+def _parse_body(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    return request.POST
+
+
+async def _run_hashing(request, serializer_class, on_valid):
+    if request.method != "POST":
+        return _json_response(
+            {"detail": f'Method "{request.method}" not allowed.'},
+            status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+    data = _parse_body(request)
+    if data is None:
+        return _json_response({"detail": "JSON parse error."}, status.HTTP_400_BAD_REQUEST)
+
+    serializer = serializer_class(data=data, context={'request': request})
+    try:
+        result = await hashing_pool.run(on_valid, serializer)
+    except PoolOverloaded:
+        response = _json_response(
+            {"detail": "Too many authentication requests. Try again shortly."},
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response["Retry-After"] = "1"
+        return response
+    if result is None:
+        return _json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    return result
+
+
+def _login(serializer):
+    if not serializer.is_valid():
+        return None
+    return _json_response(auth_payload(serializer.validated_data['user']), status.HTTP_200_OK)
+
+
+def _register(serializer):
+    if not serializer.is_valid():
+        return None
+    return _json_response(auth_payload(serializer.save()), status.HTTP_201_CREATED)
+
+
+async def login(request):
+    """Login and get JWT tokens"""
+    return await _run_hashing(request, LoginSerializer, _login)
+
+
+async def register(request):
+    """Register a new user (alumni or student)"""
+    return await _run_hashing(request, RegisterSerializer, _register)
+
+
+# Token endpoints take no session; mirror the DRF views they replace
+login.csrf_exempt = True
+register.csrf_exempt = True
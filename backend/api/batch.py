@@ -0,0 +1,191 @@
+"""
+In-process dispatch of ``/api/batch/`` sub-requests.
+
+Each sub-request is resolved against the project URLconf and handed
+straight to its view as the batch's already authenticated user, so it
+skips the middleware stack and a second token check. The view sees an
+ordinary request: the batch's headers (minus body and conditional headers)
+with the sub-request's method, path, query string and JSON body.
+
+Sub-requests run in order, except that a run of consecutive GETs is spread
+over up to ``BATCH_MAX_WORKERS`` threads, each with its own database
+connection. Inside a transaction the threads could not see, everything
+runs in the request thread. DRF response data is embedded as is, without
+being rendered and parsed again. Streamed responses (exports, downloads)
+and downloads handed off to the web server cannot be batched. Each
+sub-request is recorded in ``api.metrics`` under its own route.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_to_bytes, urlsplit
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+
+# Describe the batch request itself, not its sub-requests
+EXCLUDED_META = (
+    "CONTENT_TYPE", "CONTENT_LENGTH", "HTTP_IF_NONE_MATCH", "HTTP_IF_MATCH",
+    "HTTP_IF_MODIFIED_SINCE", "HTTP_IF_UNMODIFIED_SINCE",
+)
+FORWARDED_HEADERS = ("ETag", "Location", "Retry-After")
+# The web server sends the file named by these; the body is empty
+OFFLOADED_HEADERS = ("X-Accel-Redirect", "X-Sendfile")
+
+logger = logging.getLogger(__name__)
+
+
+def build_request(request, item):
+    """A request for ``item`` carrying the authentication of ``request``"""
+    url = urlsplit(item["path"])
+    body = json.dumps(item["body"]).encode() if "body" in item else b""
+    environ = {key: value for key, value in request.META.items() if key not in EXCLUDED_META}
+    environ.update({
+        "REQUEST_METHOD": item["method"],
+        # WSGI paths are unquoted bytes spelled as latin-1
+        "PATH_INFO": unquote_to_bytes(url.path).decode("iso-8859-1"),
+        "QUERY_STRING": url.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+    })
+    sub = WSGIRequest(environ)
+    sub.user = request.user
+    if hasattr(request._request, "session"):
+        sub.session = request._request.session
+    # DRF authenticates these instead of reading the token again
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def close_response(response):
+    """
+    Release what ``response`` holds open, such as a streamed file. Unlike
+    ``response.close()`` this does not send ``request_finished``, whose
+    handlers would close the connections the batch is still using.
+    """
+    for closer in response._resource_closers:
+        try:
+            closer()
+        except Exception:
+            logger.exception("Closing a batched response failed")
+    response._resource_closers.clear()
+    response.closed = True
+
+
+def response_payload(response):
+    payload = {"status": response.status_code}
+    headers = {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)}
+    if headers:
+        payload["headers"] = headers
+    if response.streaming or any(response.has_header(name) for name in OFFLOADED_HEADERS):
+        payload["status"] = status.HTTP_400_BAD_REQUEST
+        payload["body"] = {"detail": "File responses cannot be batched; request this path directly."}
+    elif isinstance(response, Response):
+        payload["body"] = response.data
+    elif response.get("Content-Type", "").startswith("application/json"):
+        payload["body"] = json.loads(response.content)
+    else:
+        payload["body"] = response.content.decode(response.charset)
+    return payload
+
+
+def dispatch(request, item):
+    """Run one sub-request and return its status, headers and body"""
+    sub = build_request(request, item)
+    if not metrics.enabled():
+        return _respond(sub, item)
+
+    recorder = metrics.QueryRecorder()
+    start = time.perf_counter()
+    with metrics.recording_queries(recorder):
+        payload = _respond(sub, item)
+    metrics.registry.observe(
+        metrics.route_name(sub), sub.method, payload["status"],
+        time.perf_counter() - start, recorder.count, recorder.seconds
+    )
+    return payload
+
+
+def _respond(sub, item):
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return {"status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+    sub.resolver_match = match
+    if match.view_name == "batch":
+        return {"status": status.HTTP_400_BAD_REQUEST, "body": {"detail": "Batches cannot be nested."}}
+
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        view = async_to_sync(view)
+    try:
+        response = view(sub, *match.args, **match.kwargs)
+    except Exception:
+        # One failing sub-request must not lose the others' results
+        logger.exception("Batched %s %s failed", item["method"], item["path"])
+        return {"status": status.HTTP_500_INTERNAL_SERVER_ERROR, "body": {"detail": "Server error."}}
+    try:
+        return response_payload(response)
+    finally:
+        close_response(response)
+
+
+def _dispatch_in_thread(request, item):
+    try:
+        return dispatch(request, item)
+    finally:
+        connections.close_all()
+
+
+def _groups(items, concurrent):
+    """Indexes of ``items`` split into runs of GETs and single other requests"""
+    group = []
+    for index, item in enumerate(items):
+        joins = concurrent and group and item["method"] == "GET" and items[group[0]]["method"] == "GET"
+        if group and not joins:
+            yield group
+            group = []
+        group.append(index)
+    if group:
+        yield group
+
+
+def run_batch(request, items):
+    """Dispatch every item in order; returns their payloads in the same order"""
+    workers = settings.BATCH_MAX_WORKERS
+    concurrent = workers > 1 and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    results = [None] * len(items)
+    pool = None
+    try:
+        for group in _groups(items, concurrent):
+            if len(group) == 1:
+                results[group[0]] = dispatch(request, items[group[0]])
+                continue
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+            futures = [
+                (index, pool.submit(
+                    contextvars.copy_context().run, _dispatch_in_thread, request, items[index]
+                ))
+                for index in group
+            ]
+            for index, future in futures:
+                results[index] = future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
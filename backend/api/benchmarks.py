@@ -0,0 +1,8 @@
+"""Helpers shared by the benchmark and load-test management commands."""
+import math
+
+
+def percentile(samples, p):
+    """Nearest-rank ``p``-th percentile (0-100) of ``samples``"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
@@ -0,0 +1,59 @@
+"""
+Helpers shared by the caches in ``api``: the JWT user cache, the
+debt-status cache and the replica pins.
+
+Each of them is only correct if a delete made by one worker process is seen
+by every other, so their ``CACHE_ALIAS`` must name a cache shared across
+processes. ``check_shared_caches`` reports a process-local one under
+``manage.py check --deploy``.
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+
+
+PROCESS_LOCAL_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def invalidate(cache_alias, keys, local=None):
+    """
+    Delete ``keys`` from the ``cache_alias`` cache (and from the in-process
+    ``local`` layer, if any) now and again when the current transaction
+    commits, so a read racing the write cannot re-cache the pre-commit value.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+
+    def drop():
+        if local is not None:
+            local.delete_many(keys)
+        caches[cache_alias].delete_many(keys)
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def _shared_cache_users():
+    from . import debt_cache, replicas, user_cache
+
+    yield "JWT_USER_CACHE", user_cache._config("CACHE_ALIAS")
+    yield "DEBT_STATUS_CACHE", debt_cache._config("CACHE_ALIAS")
+    if replicas._config("ALIASES"):
+        yield "READ_REPLICAS", replicas._config("CACHE_ALIAS")
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    errors = []
+    for setting, alias in _shared_cache_users():
+        backend = settings.CACHES.get(alias, {}).get("BACKEND")
+        if backend in PROCESS_LOCAL_BACKENDS:
+            errors.append(checks.Warning(
+                f"{setting} uses the process-local '{alias}' cache, so its "
+                "invalidations do not reach other worker processes.",
+                hint="Set REDIS_URL, or point CACHE_ALIAS at a shared cache.",
+                id="api.W001",
+            ))
+    return errors
@@ -0,0 +1,140 @@
+"""
+Conditional GET for the endpoints the dashboard polls.
+
+Each response carries an ``ETag`` derived from a cheap validator instead of
+the serialized body: the user's version stamp for the profile, the row (and
+its related users) for a detail view, and the rows of the page being served
+for a list, together with the page's row count or next/previous state. List
+validators therefore cost no query beyond the page itself, and cursor pages
+stay free of any ``COUNT(*)``. A request whose ``If-None-Match`` still
+matches gets ``304 Not Modified`` without anything being serialized.
+
+With ``CONDITIONAL_RESPONSE_CACHE["ENABLED"]`` the serialized data of full
+responses is also cached per user, keyed by the ETag. Any write that
+changes what a response would contain moves its validator, so stale entries
+are never looked up again and simply age out after ``TTL`` seconds.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+DEFAULTS = {
+    "ENABLED": False,
+    "CACHE_ALIAS": "default",
+    "TTL": 300,
+}
+
+
+def _config(name):
+    return getattr(settings, "CONDITIONAL_RESPONSE_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def make_etag(request, *parts):
+    """
+    Strong ETag over the validator ``parts`` plus everything else the
+    response depends on: the requesting user, the URL and the renderer.
+    """
+    raw = "|".join(str(part) for part in (
+        request.user.pk,
+        request.user.role,
+        request.accepted_renderer.format,
+        request.build_absolute_uri(),
+        *parts
+    ))
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def instance_validator(instance, relations=()):
+    """
+    ``updated_at`` of a loaded row and of the related users loaded with it;
+    relations that were not joined are represented by their id, and those
+    left out of the response (deferred) not at all.
+    """
+    parts = [instance.pk, instance.updated_at]
+    deferred = instance.get_deferred_fields()
+    for relation in relations:
+        field = instance._meta.get_field(relation)
+        if field.is_cached(instance):
+            related = getattr(instance, relation)
+            parts.append(related.updated_at if related is not None else None)
+        elif field.attname not in deferred:
+            parts.append(getattr(instance, field.attname))
+    return parts
+
+
+def page_validator(rows, paginator, relations=()):
+    """
+    Validator for a list response: its rows, plus the total for page-number
+    pages or whether there are neighbouring pages for cursor pages
+    """
+    parts = [instance_validator(row, relations) for row in rows]
+    page = getattr(paginator, "page", None)
+    if hasattr(page, "paginator"):
+        parts.append(page.paginator.count)
+    elif paginator is not None:
+        parts += [getattr(paginator, "has_next", None), getattr(paginator, "has_previous", None)]
+    return parts
+
+
+def conditional_response(request, etag, build):
+    """
+    Answer 304 if the client already holds ``etag``; otherwise return the
+    cached data for it or call ``build()`` for a fresh response.
+    """
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = None
+        cache = caches[_config("CACHE_ALIAS")] if _config("ENABLED") else None
+        key = "response:%s:%s" % (request.user.pk, etag.strip('"'))
+        if cache is not None:
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+        if response is None:
+            response = build()
+            if cache is not None and response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, _config("TTL"))
+
+    response["ETag"] = etag
+    # Clients may keep a copy but must revalidate it; shared caches may not
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/304 handling (and the optional response cache) to ``list`` and
+    ``retrieve``. ``validator_relations`` names the foreign keys to users
+    that the serializer embeds, so changes to those users count too.
+    """
+    validator_relations = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        paginator = None if page is None else self.paginator
+        etag = make_etag(request, page_validator(rows, paginator, self.validator_relations))
+
+        def build():
+            serializer = self.get_serializer(rows, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        return conditional_response(request, etag, build)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = make_etag(request, instance_validator(instance, self.validator_relations))
+        return conditional_response(
+            request, etag, lambda: Response(self.get_serializer(instance).data)
+        )
@@ -0,0 +1,104 @@
+"""
+Cached answer to "does this user have unpaid fees?" for DebtClearForDownload.
+
+Lookups go through a small in-process LRU, then Django's cache framework,
+and only then the fee ledger. Every path that changes fee rows ends in
+``adjust_outstanding_balance`` or ``recompute_outstanding_balances`` in
+``api.models``, and both call ``invalidate`` for the users they touch, so
+entries are dropped as part of the write (and again once its transaction
+commits). Entries also expire after a TTL as a safety net.
+
+The in-process layer cannot see invalidations made by other worker
+processes, so it is kept to a short TTL; set ``LOCAL_SIZE`` to 0 to rely on
+the shared cache alone.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import caching
+
+
+DEFAULTS = {
+    "CACHE_ALIAS": "default",
+    "TTL": 300,
+    "LOCAL_SIZE": 10000,
+    "LOCAL_TTL": 5,
+}
+
+_MISSING = object()
+
+
+def _config(name):
+    return getattr(settings, "DEBT_STATUS_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def _key(user_id):
+    return f"debt-status:{user_id}"
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size, ttl):
+        if size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalLRU()
+
+
+def owes_fees(user_id):
+    """Whether the user has any unpaid fee, from cache when possible"""
+    key = _key(user_id)
+    value = local_cache.get(key)
+    if value is not _MISSING:
+        return value
+
+    shared = caches[_config("CACHE_ALIAS")]
+    value = shared.get(key)
+    if value is None:
+        from .models import Fee
+        value = Fee.objects.filter(user_id=user_id, is_paid=False).exists()
+        shared.set(key, value, _config("TTL"))
+
+    local_cache.set(key, value, _config("LOCAL_SIZE"), _config("LOCAL_TTL"))
+    return value
+
+
+def invalidate(user_ids):
+    """Forget the cached status of ``user_ids`` (see ``caching.invalidate``)"""
+    caching.invalidate(_config("CACHE_ALIAS"), map(_key, user_ids), local=local_cache)
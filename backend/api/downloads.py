@@ -0,0 +1,206 @@
+import mimetypes
+import os
+import re
+import secrets
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+
+
+DJANGO = "django"
+NGINX = "nginx"
+APACHE = "apache"
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 20
+CHUNK_SIZE = 64 * 1024
+
+_range_spec = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def get_download_backend():
+    backend = getattr(settings, "DOCUMENT_DOWNLOAD_BACKEND", DJANGO)
+    if backend not in (DJANGO, NGINX, APACHE):
+        raise ImproperlyConfigured(
+            f"DOCUMENT_DOWNLOAD_BACKEND must be one of "
+            f"{DJANGO!r}, {NGINX!r} or {APACHE!r}, not {backend!r}"
+        )
+    return backend
+
+
+def document_etag(doc):
+    """
+    Strong validator for the file: its content digest when stored
+    content-addressed, otherwise one that changes with the row and size
+    """
+    if doc.sha256:
+        return f'"{doc.sha256}"'
+    return f'"{doc.pk}-{int(doc.updated_at.timestamp() * 1000000)}-{doc.file_size or 0}"'
+
+
+def parse_range_header(header, size):
+    """
+    Parse a ``Range: bytes=...`` header against a file of ``size`` bytes.
+
+    Returns a list of inclusive ``(start, end)`` pairs, an empty list if no
+    range is satisfiable, or ``None`` if the header should be ignored
+    (absent, malformed or asking for too many ranges).
+    """
+    units, _, specs = (header or "").partition("=")
+    if units.strip().lower() != "bytes" or not specs:
+        return None
+    specs = specs.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        match = _range_spec.match(spec)
+        if not match or match.groups() == ("", ""):
+            return None
+        first, last = match.groups()
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return parse_etags(if_range) == [etag]
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read_range(path, start, end):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _range_response(path, ranges, size, content_type):
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            _read_range(path, start, end), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+        return response
+
+    boundary = secrets.token_hex(16)
+    heads = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    tail = f"--{boundary}--\r\n".encode()
+
+    def parts():
+        for head, (start, end) in zip(heads, ranges):
+            yield head
+            yield from _read_range(path, start, end)
+            yield b"\r\n"
+        yield tail
+
+    length = sum(len(head) + end - start + 1 + 2 for head, (start, end) in zip(heads, ranges))
+    response = StreamingHttpResponse(
+        parts(), status=206, content_type=f"multipart/byteranges; boundary={boundary}"
+    )
+    response["Content-Length"] = str(length + len(tail))
+    return response
+
+
+def document_file_response(request, doc):
+    """
+    Build the response that delivers a document's file.
+
+    ``If-None-Match`` / ``If-Modified-Since`` are answered with 304 from the
+    database row alone, without touching the file. With the ``django``
+    backend the file is streamed by Django itself, honouring single and
+    multi-part ``Range`` requests. The ``nginx`` and ``apache`` backends
+    return an empty response carrying an ``X-Accel-Redirect`` or
+    ``X-Sendfile`` header; the web server then sends the bytes (and handles
+    ranges) and the worker is released as soon as the checks are done.
+    """
+    if not doc.file:
+        raise Http404("Document file not found")
+
+    etag = document_etag(doc)
+    last_modified = int(doc.updated_at.timestamp())
+    validators = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Accept-Ranges": "bytes",
+    }
+
+    def with_validators(response):
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return with_validators(conditional)
+
+    path = doc.file.path
+    if not os.path.exists(path):
+        raise Http404("Document file not found on server")
+
+    filename = doc.download_filename
+    content_type, encoding = mimetypes.guess_type(filename)
+    content_type = content_type or "application/octet-stream"
+    backend = get_download_backend()
+
+    if backend == DJANGO:
+        size = doc.file_size if doc.file_size is not None else os.path.getsize(path)
+        ranges = None
+        if _if_range_passes(request, etag, last_modified):
+            ranges = parse_range_header(request.META.get("HTTP_RANGE"), size)
+
+        if ranges is None:
+            response = FileResponse(open(path, "rb"), filename=filename, as_attachment=True)
+        elif not ranges:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        else:
+            response = _range_response(path, ranges, size, content_type)
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+        return with_validators(response)
+
+    response = HttpResponse(content_type=content_type)
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    with_validators(response)
+
+    if backend == NGINX:
+        prefix = settings.DOCUMENT_DOWNLOAD_ACCEL_PREFIX.rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(doc.file.name)}"
+    else:
+        response["X-Sendfile"] = path
+    return response
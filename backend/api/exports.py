@@ -0,0 +1,184 @@
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from rest_framework.negotiation import BaseContentNegotiation
+
+from .models import Document, Fee, User
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Each export is one query: (header, lookup) pairs read with values_list(),
+# so the related user columns come from a join instead of per-row queries
+EXPORTS = {
+    "fees": {
+        "queryset": lambda: Fee.objects.order_by("id"),
+        "user_prefix": "user__",
+        "columns": (
+            ("id", "id"),
+            ("user_id", "user_id"),
+            ("username", "user__username"),
+            ("student_id", "user__student_id"),
+            ("email", "user__email"),
+            ("role", "user__role"),
+            ("graduation_year", "user__graduation_year"),
+            ("description", "description"),
+            ("amount", "amount"),
+            ("is_paid", "is_paid"),
+            ("due_date", "due_date"),
+            ("paid_date", "paid_date"),
+            ("created_at", "created_at"),
+            ("created_by", "created_by__username"),
+        ),
+    },
+    "users": {
+        "queryset": lambda: User.objects.order_by("id"),
+        "user_prefix": "",
+        "columns": (
+            ("id", "id"),
+            ("username", "username"),
+            ("email", "email"),
+            ("first_name", "first_name"),
+            ("last_name", "last_name"),
+            ("role", "role"),
+            ("student_id", "student_id"),
+            ("graduation_year", "graduation_year"),
+            ("phone_number", "phone_number"),
+            ("owes_fees", "owes_fees"),
+            ("outstanding_balance", "outstanding_balance"),
+            ("date_joined", "date_joined"),
+        ),
+    },
+    "documents": {
+        "queryset": lambda: Document.objects.order_by("id"),
+        "user_prefix": "owner__",
+        "columns": (
+            ("id", "id"),
+            ("title", "title"),
+            ("document_type", "document_type"),
+            ("original_filename", "original_filename"),
+            ("file_size", "file_size"),
+            ("sha256", "sha256"),
+            ("owner_id", "owner_id"),
+            ("username", "owner__username"),
+            ("student_id", "owner__student_id"),
+            ("role", "owner__role"),
+            ("graduation_year", "owner__graduation_year"),
+            ("is_verified", "is_verified"),
+            ("verified_by", "verified_by__username"),
+            ("verified_at", "verified_at"),
+            ("uploaded_at", "uploaded_at"),
+        ),
+    },
+}
+
+# Spreadsheets evaluate a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+def export_rows(dataset, filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Header tuple and a lazy row iterator for ``dataset``, narrowed by the
+    validated ``filters`` (see ``ExportFilterSerializer``). Rows are fetched
+    ``chunk_size`` at a time, so memory stays flat however large the table.
+    """
+    export = EXPORTS[dataset]
+    queryset = export["queryset"]()
+    prefix = export["user_prefix"]
+
+    if "is_paid" in filters:
+        queryset = queryset.filter(is_paid=filters["is_paid"])
+    if "due_date_after" in filters:
+        queryset = queryset.filter(due_date__gte=filters["due_date_after"])
+    if "due_date_before" in filters:
+        queryset = queryset.filter(due_date__lte=filters["due_date_before"])
+    if "role" in filters:
+        queryset = queryset.filter(**{f"{prefix}role": filters["role"]})
+    if "graduation_year" in filters:
+        queryset = queryset.filter(**{f"{prefix}graduation_year": filters["graduation_year"]})
+
+    headers = tuple(header for header, _ in export["columns"])
+    lookups = [lookup for _, lookup in export["columns"]]
+    return headers, queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # A leading quote makes spreadsheets show user-entered text as text
+        return "'" + value
+    return value
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        # Amounts stay exact, as the API's serializers send them
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _LineBuffer:
+    """File-like object for csv.writer that hands back each written line"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_LineBuffer())
+    # The header goes out before the query runs, so the first byte is immediate
+    yield writer.writerow(headers)
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow([_text(value) for value in row]))
+        if len(lines) >= chunk_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def iter_ndjson(headers, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    # No header line in NDJSON; an empty chunk lets the response headers go
+    # out before the query runs
+    yield ""
+    lines = []
+    for row in rows:
+        record = {header: _json_value(value) for header, value in zip(headers, row)}
+        lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if len(lines) >= chunk_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def iter_export(dataset, file_format, filters, chunk_size=EXPORT_CHUNK_SIZE):
+    headers, rows = export_rows(dataset, filters, chunk_size)
+    writer = iter_csv if file_format == "csv" else iter_ndjson
+    return writer(headers, rows, chunk_size)
+
+
+class IgnoreAcceptNegotiation(BaseContentNegotiation):
+    """
+    Export actions stream their own content type, so an ``Accept: text/csv``
+    header must not be refused with 406; errors still render as JSON.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
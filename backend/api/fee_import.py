@@ -0,0 +1,163 @@
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from .models import (
+    User, Fee, add_fee_summary_delta, apply_fee_summary_deltas,
+    recompute_outstanding_balances, summary_bucket
+)
+
+
+IMPORT_COLUMNS = ("student_id", "description", "amount", "due_date")
+MAX_REPORTED_ERRORS = 1000
+
+_description_length = Fee._meta.get_field("description").max_length
+_amount_field = Fee._meta.get_field("amount")
+_max_amount = Decimal(10) ** (_amount_field.max_digits - _amount_field.decimal_places)
+
+
+def _parse_row(row):
+    """Validate one CSV row, returning (values, errors)"""
+    errors = {}
+    values = {}
+
+    student_id = (row.get("student_id") or "").strip()
+    if not student_id:
+        errors["student_id"] = "This field is required."
+    values["student_id"] = student_id
+
+    description = (row.get("description") or "").strip()
+    if not description:
+        errors["description"] = "This field is required."
+    elif len(description) > _description_length:
+        errors["description"] = f"Ensure this field has no more than {_description_length} characters."
+    values["description"] = description
+
+    try:
+        amount = Decimal((row.get("amount") or "").strip())
+        if not amount.is_finite():
+            raise InvalidOperation
+        amount = amount.quantize(Decimal("0.01"))
+        if amount < Decimal("0.01") or amount >= _max_amount:
+            errors["amount"] = f"Amount must be between 0.01 and {_max_amount - Decimal('0.01')}."
+        values["amount"] = amount
+    except InvalidOperation:
+        errors["amount"] = "A valid number is required."
+
+    due_date = (row.get("due_date") or "").strip()
+    try:
+        values["due_date"] = date.fromisoformat(due_date) if due_date else None
+    except ValueError:
+        errors["due_date"] = "Date has wrong format. Use YYYY-MM-DD."
+
+    return values, errors
+
+
+def _import_chunk(rows, first_row, created_by, result, user_ids, summary):
+    parsed = []
+    for number, row in enumerate(rows, start=first_row):
+        if None in row:
+            _report(result, number, {"row": "Row has more values than the header."})
+            continue
+        values, errors = _parse_row(row)
+        if errors:
+            _report(result, number, errors)
+            continue
+        parsed.append((number, values))
+
+    # One lookup per chunk resolves every student id in it
+    students = {
+        student_id: (user_id, role, graduation_year)
+        for student_id, user_id, role, graduation_year in User.objects.filter(
+            student_id__in={values["student_id"] for _, values in parsed}
+        ).values_list("student_id", "id", "role", "graduation_year")
+    }
+
+    fees = []
+    for number, values in parsed:
+        student = students.get(values["student_id"])
+        if student is None:
+            _report(result, number, {"student_id": "No user with this student ID."})
+            continue
+        user_id, role, graduation_year = student
+        user_ids.add(user_id)
+        add_fee_summary_delta(
+            summary, summary_bucket(role, graduation_year, values["due_date"]),
+            values["amount"], False, 1
+        )
+        fees.append(Fee(
+            user_id=user_id,
+            description=values["description"],
+            amount=values["amount"],
+            due_date=values["due_date"],
+            created_by=created_by,
+        ))
+
+    Fee.objects.bulk_create(fees)
+    result["created"] += len(fees)
+
+
+def _read_rows(reader):
+    """The reader's rows, with malformed CSV raised as ValueError naming the row"""
+    number = 0
+    try:
+        for number, row in enumerate(reader, start=1):
+            yield row
+    except csv.Error as exc:
+        raise ValueError(f"Row {number + 1} is not valid CSV: {exc}") from exc
+
+
+def _report(result, number, errors):
+    result["error_count"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append({"row": number, "errors": errors})
+
+
+def import_fees(stream, created_by=None, chunk_size=1000):
+    """
+    Create fees from a CSV text stream with the columns
+    ``student_id, description, amount, due_date``.
+
+    Rows are read, validated and bulk inserted ``chunk_size`` at a time, so
+    memory stays flat however long the file is. Invalid rows are skipped and
+    reported by data row number (the header is not counted). Balances for
+    every billed user, and the FeeSummary totals, are updated once at the end,
+    in the same transaction. Malformed CSV (e.g. an over-long field) raises
+    ValueError and nothing is imported.
+    """
+    reader = csv.DictReader(stream)
+    try:
+        fieldnames = reader.fieldnames
+    except csv.Error as exc:
+        raise ValueError(f"The header is not valid CSV: {exc}") from exc
+    missing = set(IMPORT_COLUMNS) - set(fieldnames or ())
+    if missing:
+        raise ValueError("Missing CSV columns: " + ", ".join(sorted(missing)))
+
+    result = {"created": 0, "error_count": 0, "errors": []}
+    user_ids = set()
+    summary = {}
+
+    data_rows = _read_rows(reader)
+    with transaction.atomic():
+        first_row = 1
+        while True:
+            rows = list(islice(data_rows, chunk_size))
+            if not rows:
+                break
+            _import_chunk(rows, first_row, created_by, result, user_ids, summary)
+            first_row += len(rows)
+
+        # Keep the IN list well under backend parameter limits
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), chunk_size):
+            recompute_outstanding_balances(
+                User.objects.filter(pk__in=user_ids[start:start + chunk_size])
+            )
+        apply_fee_summary_deltas(summary)
+
+    result["errors"].sort(key=lambda error: error["row"])
+    return result
@@ -0,0 +1,48 @@
+"""
+Server-side filtering, ordering and grouped counts for the fee and document
+lists, driven by the query string and validated by a ``ListFilterSerializer``.
+"""
+from django.db.models import Count
+from rest_framework.response import Response
+
+
+class ListFilterMixin:
+    """
+    Applies ``filter_serializer_class`` to ``list``: filter parameters narrow
+    the rows, ``?ordering=`` sorts them by a whitelisted field, and
+    ``?group_by=`` answers with the number of matching rows per value in one
+    query instead of the rows themselves.
+    """
+    filter_serializer_class = None
+
+    def get_list_filters(self):
+        if not hasattr(self, "_list_filters"):
+            filters = self.filter_serializer_class(
+                data=self.request.query_params.dict(),
+                context={"request": self.request}
+            )
+            filters.is_valid(raise_exception=True)
+            self._list_filters = filters
+        return self._list_filters
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != "list":
+            return queryset
+        filters = self.get_list_filters()
+        return filters.order_queryset(filters.filter_queryset(queryset))
+
+    def list(self, request, *args, **kwargs):
+        group_by = self.get_list_filters().validated_data.get("group_by")
+        if not group_by:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = list(
+            queryset.order_by(group_by).values(group_by).annotate(count=Count("pk"))
+        )
+        return Response({
+            "group_by": group_by,
+            "count": sum(row["count"] for row in rows),
+            "results": rows,
+        })
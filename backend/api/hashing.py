@@ -0,0 +1,69 @@
+"""
+Bounded executor for password hashing work (``authenticate()``,
+``create_user()``) so async views never hash on the event loop.
+
+Django's PBKDF2 hasher runs in ``hashlib``, which releases the GIL, so a
+thread pool hashes in parallel while keeping the configured authentication
+backends and signals in play. Once ``AUTH_HASHING_WORKERS`` jobs are running
+and ``AUTH_HASHING_QUEUE_SIZE`` more are waiting, further calls are refused
+with ``PoolOverloaded`` so the view can shed load with a 429.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self):
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return settings.AUTH_HASHING_WORKERS
+
+    @property
+    def capacity(self):
+        return self.workers + settings.AUTH_HASHING_QUEUE_SIZE
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="auth-hashing"
+                )
+            return self._executor
+
+    @staticmethod
+    def _call(fn, args, kwargs):
+        # Pool threads live outside the request cycle, so manage their
+        # DB connections the way request_started/finished would
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def run(self, fn, *args, **kwargs):
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise PoolOverloaded()
+            self._pending += 1
+        try:
+            future = executor.submit(self._call, fn, args, kwargs)
+            return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+hashing_pool = HashingPool()
@@ -0,0 +1,328 @@
+import io
+import json
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from itertools import count
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.authentication import VersionedRefreshToken
+from api.benchmarks import percentile
+from api.models import Document, Fee, UploadSession, User
+from api.synthetic import generate_dataset, placeholder_blobs
+from api.uploads import open_session, write_chunk
+
+
+PASSWORD = "benchmark-password"
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every API endpoint in process through the test client and report "
+        "p50/p95/p99 latency, queries per request and peak memory as JSON "
+        "(all writes are rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200,
+                            help="Synthetic users to generate first (default: 200)")
+        parser.add_argument("--fees", type=int, default=5,
+                            help="Fees per synthetic user (default: 5)")
+        parser.add_argument("--documents", type=int, default=2,
+                            help="Documents per synthetic user (default: 2)")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Random seed for the synthetic data (default: 0)")
+        parser.add_argument("--existing", action="store_true",
+                            help="Benchmark against the rows already in the database "
+                                 "instead of generating any")
+        parser.add_argument("--iterations", type=int, default=30,
+                            help="Timed requests per endpoint (default: 30)")
+        parser.add_argument("--warmup", type=int, default=3,
+                            help="Untimed requests per endpoint first (default: 3)")
+        parser.add_argument("--only", default="",
+                            help="Comma-separated substrings; run matching endpoints only")
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+        parser.add_argument("--baseline",
+                            help="Report from an earlier run; fail on regressions against it")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Allowed p95 growth over the baseline (default: 0.25)")
+        parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                            help="Ignore p95 growth smaller than this (default: 2.0)")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        only = [part for part in options["only"].split(",") if part]
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as fh:
+                baseline = json.load(fh)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+        ):
+            with transaction.atomic():
+                dataset = None
+                if not options["existing"]:
+                    dataset = generate_dataset(
+                        options["users"], fees_per_user=options["fees"],
+                        documents_per_user=options["documents"],
+                        seed=options["seed"], prefix="benchmark",
+                    )
+                self.setup_actors()
+                endpoints = {}
+                for scenario in self.scenarios():
+                    name = scenario[0]
+                    if only and not any(part in name for part in only):
+                        continue
+                    endpoints[name] = self.measure(*scenario, **options)
+                transaction.set_rollback(True)
+
+        covered = {name.split(" ", 1)[1].split("?")[0] for name in self.scenario_names}
+        report = {
+            "dataset": dataset or "existing",
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "endpoints": endpoints,
+            "uncovered_routes": sorted(set(route_names(api_urls.urlpatterns)) - covered),
+        }
+        regressions = self.compare(baseline, endpoints, options) if baseline else []
+        if baseline:
+            report["regressions"] = regressions
+
+        body = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(body + "\n")
+        self.stdout.write(body)
+        if regressions:
+            regressed = {regression["endpoint"] for regression in regressions}
+            raise CommandError(f"{len(regressed)} endpoint(s) regressed against the baseline.")
+
+    def setup_actors(self):
+        """An admin and a debt-free alumnus with documents, fees and an upload"""
+        self.admin = User.objects.create_user(
+            "benchmark-actor-admin", password=PASSWORD, role=User.Roles.ADMIN
+        )
+        self.alumni = User.objects.create_user(
+            "benchmark-actor-alumni", password=PASSWORD, role=User.Roles.ALUMNI,
+            student_id="BENCH-ALUMNI", graduation_year=2020,
+        )
+        self.blob = placeholder_blobs(count=1)[0]
+        self.documents = [self.new_document() for _ in range(20)]
+        self.fees = [self.new_fee(is_paid=True) for _ in range(20)]
+        self.student_ids = list(
+            User.objects.exclude(student_id=None).values_list("student_id", flat=True)[:100]
+        )
+        self.tokens = {
+            user.pk: str(VersionedRefreshToken.for_user(user).access_token)
+            for user in (self.admin, self.alumni)
+        }
+        self.sequence = count()
+
+    def new_document(self):
+        name, digest, size = self.blob
+        return Document.objects.create(
+            owner=self.alumni, title="Benchmark transcript", file=name,
+            document_type=Document.DocumentType.TRANSCRIPT, file_size=size,
+        )
+
+    def new_fee(self, is_paid=False):
+        return Fee.objects.create(
+            user=self.alumni, created_by=self.admin, description="Benchmark fee",
+            amount=Decimal("10.00"), due_date=timezone.now().date(), is_paid=is_paid,
+        )
+
+    def new_upload(self, complete=False):
+        session = UploadSession.objects.create(
+            owner=self.alumni, title="Benchmark upload", filename="upload.pdf", total_size=4,
+        )
+        open_session(session)
+        if complete:
+            write_chunk(session, io.BytesIO(b"%PDF"), 0, 4)
+        return session
+
+    def import_csv(self):
+        rows = "".join(
+            f"{student_id},Benchmark import,12.50,2025-01-31\n" for student_id in self.student_ids
+        )
+        return SimpleUploadedFile(
+            "fees.csv", ("student_id,description,amount,due_date\n" + rows).encode(),
+            content_type="text/csv"
+        )
+
+    def scenarios(self):
+        """
+        (name, actor, method, prepare) per endpoint; ``prepare()`` runs
+        untimed before each request and returns its path and client kwargs
+        """
+        admin, alumni = self.admin, self.alumni
+        doc, fee = self.documents[0].pk, self.fees[0].pk
+        docs = [document.pk for document in self.documents]
+
+        def fixed(path, **kwargs):
+            return lambda: (path, kwargs)
+
+        scenarios = [
+            ("POST register", None, "post", lambda: ("/api/auth/register/", {"data": {
+                "username": f"benchmark-new-{next(self.sequence)}", "email": "new@example.com",
+                "password": PASSWORD, "password_confirm": PASSWORD, "role": "ALUMNI",
+            }, "format": "json"})),
+            ("POST login", None, "post", fixed("/api/auth/login/", data={
+                "username": alumni.username, "password": PASSWORD}, format="json")),
+            ("GET profile", alumni, "get", fixed("/api/auth/profile/")),
+            ("PATCH update_profile", alumni, "patch", fixed(
+                "/api/auth/profile/update/", data={"phone_number": "555-0100"}, format="json")),
+            ("GET api-root", admin, "get", fixed("/api/")),
+            ("POST batch", alumni, "post", fixed("/api/batch/", data={"requests": [
+                {"path": "/api/auth/profile/"},
+                {"path": "/api/documents/?document_type=TRANSCRIPT&page_size=100"},
+                {"path": "/api/documents/?document_type=CERTIFICATE,DIPLOMA&page_size=100"},
+                {"path": "/api/documents/?document_type=OTHER&page_size=100"},
+            ]}, format="json")),
+
+            ("GET documents-list", alumni, "get", fixed("/api/documents/")),
+            ("GET documents-list?admin", admin, "get", fixed("/api/documents/")),
+            ("GET documents-list?group_by", alumni, "get", fixed("/api/documents/?group_by=document_type")),
+            ("POST documents-list", alumni, "post", lambda: ("/api/documents/", {"data": {
+                "title": "Benchmark upload", "document_type": "OTHER",
+                "file": SimpleUploadedFile("upload.pdf", b"%PDF-1.4 benchmark"),
+            }, "format": "multipart"})),
+            ("GET documents-detail", alumni, "get", fixed(f"/api/documents/{doc}/")),
+            ("PATCH documents-detail", alumni, "patch", fixed(
+                f"/api/documents/{doc}/", data={"title": "Renamed"}, format="json")),
+            ("DELETE documents-detail", alumni, "delete",
+             lambda: (f"/api/documents/{self.new_document().pk}/", {})),
+            ("GET documents-download", alumni, "get", fixed(f"/api/documents/{doc}/download/")),
+            ("POST documents-verify", admin, "post", fixed(f"/api/documents/{doc}/verify/")),
+            ("POST documents-unverify", admin, "post", fixed(f"/api/documents/{doc}/unverify/")),
+            ("GET documents-verification-queue", admin, "get", fixed(
+                "/api/documents/verification_queue/")),
+            ("POST documents-bulk-verify", admin, "post", fixed(
+                "/api/documents/bulk_verify/", data={"ids": docs}, format="json")),
+            ("POST documents-bulk-unverify", admin, "post", fixed(
+                "/api/documents/bulk_unverify/", data={"ids": docs}, format="json")),
+            ("GET documents-export", admin, "get", fixed("/api/documents/export/")),
+
+            ("GET users-list", admin, "get", fixed("/api/users/")),
+            ("GET users-detail", admin, "get", fixed(f"/api/users/{alumni.pk}/")),
+            ("GET users-documents", admin, "get", fixed(f"/api/users/{alumni.pk}/documents/")),
+            ("GET users-fees", admin, "get", fixed(f"/api/users/{alumni.pk}/fees/")),
+            ("GET users-export", admin, "get", fixed("/api/users/export/")),
+
+            ("GET fees-list", alumni, "get", fixed("/api/fees/")),
+            ("GET fees-list?admin", admin, "get", fixed("/api/fees/")),
+            ("GET fees-list?filtered", admin, "get", fixed("/api/fees/?is_paid=false&ordering=-amount")),
+            ("POST fees-list", admin, "post", fixed("/api/fees/", data={
+                "user_id": alumni.pk, "description": "Benchmark fee", "amount": "10.00",
+                "is_paid": True}, format="json")),
+            ("GET fees-detail", alumni, "get", fixed(f"/api/fees/{fee}/")),
+            ("PATCH fees-detail", admin, "patch", fixed(
+                f"/api/fees/{fee}/", data={"description": "Renamed"}, format="json")),
+            ("DELETE fees-detail", admin, "delete", lambda: (f"/api/fees/{self.new_fee().pk}/", {})),
+            ("POST fees-mark-paid", admin, "post", fixed(f"/api/fees/{fee}/mark_paid/")),
+            ("POST fees-mark-unpaid", admin, "post", fixed(f"/api/fees/{fee}/mark_unpaid/")),
+            ("POST fees-bulk-mark-paid", admin, "post", fixed(
+                "/api/fees/bulk_mark_paid/", data={"user_id": alumni.pk}, format="json")),
+            ("POST fees-bulk-mark-unpaid", admin, "post", fixed(
+                "/api/fees/bulk_mark_unpaid/", data={"user_id": alumni.pk}, format="json")),
+            ("GET fees-summary", admin, "get", fixed("/api/fees/summary/")),
+            ("GET fees-export", admin, "get", fixed("/api/fees/export/")),
+            ("POST fees-import-csv", admin, "post", lambda: ("/api/fees/import_csv/", {
+                "data": {"file": self.import_csv()}, "format": "multipart"})),
+
+            ("POST uploads-list", alumni, "post", fixed("/api/uploads/", data={
+                "title": "Benchmark upload", "filename": "upload.pdf", "total_size": 4},
+                format="json")),
+            ("GET uploads-detail", alumni, "get", lambda: (f"/api/uploads/{self.new_upload().pk}/", {})),
+            ("PUT uploads-detail", alumni, "put", lambda: (f"/api/uploads/{self.new_upload().pk}/", {
+                "data": b"%PDF", "content_type": "application/octet-stream",
+                "HTTP_CONTENT_RANGE": "bytes 0-3/4"})),
+            ("DELETE uploads-detail", alumni, "delete",
+             lambda: (f"/api/uploads/{self.new_upload().pk}/", {})),
+            ("POST uploads-finalize", alumni, "post",
+             lambda: (f"/api/uploads/{self.new_upload(complete=True).pk}/finalize/", {})),
+
+            ("GET metrics", admin, "get", fixed("/metrics")),
+        ]
+        self.scenario_names = [scenario[0] for scenario in scenarios]
+        return scenarios
+
+    def request(self, actor, method, prepare):
+        """One request, body included, with ``prepare()`` kept out of the timing"""
+        client = APIClient()
+        if actor is not None:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens[actor.pk]}")
+        path, kwargs = prepare()
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        if response.streaming:
+            # Fully consumed, the client closes the response itself
+            b"".join(response.streaming_content)
+        elapsed = time.perf_counter() - start
+        return response.status_code, elapsed
+
+    def measure(self, name, actor, method, prepare, **options):
+        for _ in range(options["warmup"]):
+            self.request(actor, method, prepare)
+
+        timings, statuses = [], set()
+        for _ in range(options["iterations"]):
+            status, elapsed = self.request(actor, method, prepare)
+            timings.append(elapsed * 1000)
+            statuses.add(status)
+
+        # Queries and memory from one more request, traced separately so
+        # tracemalloc's overhead stays out of the latency figures
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                status, _ = self.request(actor, method, prepare)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        statuses.add(status)
+
+        return {
+            "statuses": sorted(statuses),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "queries": len(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+    def compare(self, baseline, endpoints, options):
+        regressions = []
+        for name, result in endpoints.items():
+            before = baseline.get("endpoints", {}).get(name)
+            if before is None:
+                continue
+            growth = result["p95_ms"] - before["p95_ms"]
+            if growth > options["min_delta_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + options["tolerance"]):
+                regressions.append({"endpoint": name, "metric": "p95_ms",
+                                    "baseline": before["p95_ms"], "current": result["p95_ms"]})
+            if result["queries"] > before["queries"]:
+                regressions.append({"endpoint": name, "metric": "queries",
+                                    "baseline": before["queries"], "current": result["queries"]})
+        return regressions
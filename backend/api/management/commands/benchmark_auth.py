@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.authentication import CachedJWTAuthentication, VersionedRefreshToken
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare authenticated requests per second for JWTAuthentication "
+        "and CachedJWTAuthentication (runs in a rolled-back transaction)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000,
+                            help="Requests to authenticate per class (default: 2000)")
+
+    def handle(self, *args, **options):
+        results = {}
+        with transaction.atomic():
+            user = User.objects.create_user("benchmark-auth", role="ALUMNI")
+            access = str(VersionedRefreshToken.for_user(user).access_token)
+            factory = RequestFactory()
+
+            for authentication_class in (JWTAuthentication, CachedJWTAuthentication):
+                authenticator = authentication_class()
+                # One warm-up request fills the cache for the cached class
+                authenticator.authenticate(
+                    Request(factory.get("/", HTTP_AUTHORIZATION=f"Bearer {access}"))
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(options["requests"]):
+                        request = Request(factory.get("/", HTTP_AUTHORIZATION=f"Bearer {access}"))
+                        authenticator.authenticate(request)
+                    elapsed = time.perf_counter() - start
+                results[authentication_class.__name__] = {
+                    "requests_per_second": round(options["requests"] / elapsed, 1),
+                    "queries_per_request": round(len(queries) / options["requests"], 3),
+                }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(results, indent=2))
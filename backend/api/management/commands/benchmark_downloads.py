@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from api.downloads import DJANGO, NGINX, APACHE, document_file_response
+from api.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long a worker is occupied per document download "
+        "with each DOCUMENT_DOWNLOAD_BACKEND"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=float, default=5.0,
+                            help="Size of the document to serve (default: 5)")
+        parser.add_argument("--client-kbps", type=int, default=2000,
+                            help="Simulated client bandwidth in KB/s (default: 2000)")
+        parser.add_argument("--iterations", type=int, default=3,
+                            help="Downloads per backend (default: 3)")
+
+    def handle(self, *args, **options):
+        size = int(options["size_mb"] * 1024 * 1024)
+        bytes_per_second = options["client_kbps"] * 1024
+        results = {}
+
+        with tempfile.TemporaryDirectory() as media_root:
+            os.makedirs(os.path.join(media_root, "documents"))
+            with open(os.path.join(media_root, "documents", "bench.pdf"), "wb") as fh:
+                fh.write(os.urandom(size))
+            doc = Document(
+                pk=1, title="Benchmark", file="documents/bench.pdf",
+                file_size=size, updated_at=timezone.now()
+            )
+
+            for backend in (DJANGO, NGINX, APACHE):
+                timings = []
+                with override_settings(MEDIA_ROOT=media_root, DOCUMENT_DOWNLOAD_BACKEND=backend):
+                    for _ in range(options["iterations"]):
+                        timings.append(self.occupancy(doc, bytes_per_second))
+                results[backend] = {
+                    "worker_seconds_per_download": round(sum(t for t, _ in timings) / len(timings), 4),
+                    "bytes_sent_by_worker": timings[0][1],
+                }
+
+        self.stdout.write(json.dumps({
+            "file_bytes": size,
+            "client_bytes_per_second": bytes_per_second,
+            "backends": results,
+        }, indent=2))
+
+    def occupancy(self, doc, bytes_per_second):
+        """
+        Time from building the response until the worker has written its
+        last byte, with writes paced at the client's bandwidth.
+        """
+        start = time.perf_counter()
+        request = RequestFactory().get(f"/api/documents/{doc.pk}/download/")
+        response = document_file_response(request, doc)
+        sent = 0
+        if response.streaming:
+            for chunk in response.streaming_content:
+                sent += len(chunk)
+                time.sleep(len(chunk) / bytes_per_second)
+        else:
+            sent = len(response.content)
+        response.close()
+        return time.perf_counter() - start, sent
@@ -0,0 +1,102 @@
+import io
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.models import Document, Fee, User
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.serializers import DocumentSerializer, FeeSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSONRenderer/JSONParser with FastJSONRenderer/FastJSONParser on "
+        "fee and document list pages (runs in a rolled-back transaction)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20,
+                            help="Rows per payload, i.e. the page size (default: 20)")
+        parser.add_argument("--iterations", type=int, default=2000,
+                            help="Renders and parses per payload and class (default: 2000)")
+
+    def handle(self, *args, **options):
+        rows, iterations = options["rows"], options["iterations"]
+        with transaction.atomic():
+            payloads = self.build_payloads(rows)
+            transaction.set_rollback(True)
+
+        results = {}
+        for name, data in payloads.items():
+            body = JSONRenderer().render(data)
+            results[name] = {"bytes": len(body)}
+            for label, renderer_class, parser_class in (
+                ("stdlib", JSONRenderer, JSONParser),
+                ("fast", FastJSONRenderer, FastJSONParser),
+            ):
+                renderer, parser = renderer_class(), parser_class()
+                if renderer.render(data) != body:
+                    raise AssertionError(f"{renderer_class.__name__} output differs for {name}")
+
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    renderer.render(data)
+                render_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    parser.parse(io.BytesIO(body))
+                parse_seconds = time.perf_counter() - start
+
+                results[name][label] = {
+                    "render_us": round(render_seconds / iterations * 1e6, 1),
+                    "parse_us": round(parse_seconds / iterations * 1e6, 1),
+                }
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def build_payloads(self, rows):
+        admin = User.objects.create_user("benchmark-json-admin", role="ADMIN")
+        alumni = User.objects.create_user(
+            "benchmark-json", role="ALUMNI", first_name="Zoë", graduation_year=2019
+        )
+        Fee.objects.bulk_create([
+            Fee(
+                user=alumni, created_by=admin, description=f"Tuition term {i}",
+                amount=Decimal("1250.00") + i, due_date=timezone.now().date()
+            )
+            for i in range(rows)
+        ])
+        Document.objects.bulk_create([
+            Document(
+                owner=alumni, verified_by=admin, title=f"Transcript {i}",
+                file=f"documents/benchmark{i}.pdf", file_size=250000 + i,
+                is_verified=True, verified_at=timezone.now()
+            )
+            for i in range(rows)
+        ])
+
+        payloads = {}
+        for expand in ("", "user,created_by"):
+            request = Request(RequestFactory().get("/api/fees/", {"expand": expand}))
+            fees = Fee.objects.filter(user=alumni).select_related("user", "created_by")
+            payloads[f"fees{'_expanded' if expand else ''}"] = FeeSerializer(
+                fees, many=True, context={"request": request}
+            ).data
+        for expand in ("", "owner,verified_by"):
+            request = Request(RequestFactory().get("/api/documents/", {"expand": expand}))
+            documents = Document.objects.filter(owner=alumni).select_related("owner", "verified_by")
+            payloads[f"documents{'_expanded' if expand else ''}"] = DocumentSerializer(
+                documents, many=True, context={"request": request}
+            ).data
+        return payloads
+
@@ -0,0 +1,92 @@
+import os
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Document, discard_blob
+from api.storage import blob_name, get_document_storage, hash_file, link_or_copy
+
+
+class Command(BaseCommand):
+    help = (
+        "Move document files stored under MEDIA_ROOT/documents into the "
+        "content-addressed blob store, merging duplicates"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without touching files or rows",
+        )
+
+    def handle(self, *args, **options):
+        storage = get_document_storage()
+        dry_run = options["dry_run"]
+        converted = missing = 0
+        reclaimed = 0
+        seen = set()
+
+        pending = Document.objects.filter(sha256="").exclude(file="").only(
+            "id", "file", "file_size", "original_filename"
+        )
+        for doc in pending.iterator(chunk_size=500):
+            path = storage.path(doc.file.name)
+            if not os.path.exists(path):
+                missing += 1
+                self.stderr.write(f"Document {doc.pk}: {doc.file.name} not found")
+                continue
+
+            size = os.path.getsize(path)
+            digest = hash_file(path)
+            if digest in seen or storage.exists(blob_name(digest)):
+                reclaimed += size
+            seen.add(digest)
+            converted += 1
+            if dry_run:
+                continue
+
+            original_filename = doc.original_filename or os.path.basename(doc.file.name)
+            self.convert(storage, doc, path, digest, size, original_filename[:255])
+
+        if not dry_run:
+            self.remove_empty_dirs(storage.path("documents"))
+
+        prefix = "Would convert" if dry_run else "Converted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {converted} document(s), reclaiming {reclaimed} byte(s) "
+            f"from duplicates; {missing} file(s) missing."
+        ))
+
+    def convert(self, storage, doc, path, digest, size, original_filename):
+        """
+        Point the row at the blob and take its reference in one transaction.
+        A staged link is what moves into the store, and the old file is only
+        removed once that commits, so a failure leaves the document as it was.
+        """
+        staged = f"{path}.{uuid.uuid4().hex}"
+        link_or_copy(path, staged)
+        try:
+            with transaction.atomic():
+                name = storage.adopt(staged, digest)
+                Document.objects.filter(pk=doc.pk).update(
+                    file=name,
+                    sha256=digest,
+                    file_size=size,
+                    original_filename=original_filename,
+                )
+                transaction.on_commit(lambda: os.remove(path))
+        except Exception:
+            discard_blob(digest)
+            raise
+        finally:
+            if os.path.exists(staged):
+                os.remove(staged)
+
+    def remove_empty_dirs(self, root):
+        for directory, _, _ in sorted(os.walk(root), reverse=True):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, EXPORTS, iter_export
+from api.serializers import ExportFilterSerializer
+
+
+class Command(BaseCommand):
+    help = "Stream fees, users or documents to a CSV or NDJSON file (or stdout)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(EXPORTS))
+        parser.add_argument("--output", choices=sorted(EXPORT_FORMATS), default="csv",
+                            help="File format (default: csv)")
+        parser.add_argument("--path", help="File to write (default: stdout)")
+        parser.add_argument("--is-paid", choices=("true", "false"))
+        parser.add_argument("--due-date-after", help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--due-date-before", help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--role")
+        parser.add_argument("--graduation-year", type=int)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f"Rows fetched and written per batch (default: {EXPORT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        names = ("is_paid", "due_date_after", "due_date_before", "role", "graduation_year")
+        filters = ExportFilterSerializer(
+            data={name: options[name] for name in names if options[name] is not None},
+            context={"dataset": options["dataset"]},
+        )
+        if not filters.is_valid():
+            raise CommandError(
+                "; ".join(f"{name}: {' '.join(errors)}" for name, errors in filters.errors.items())
+            )
+
+        chunks = iter_export(
+            options["dataset"], options["output"], filters.validated_data, options["chunk_size"]
+        )
+        if options["path"]:
+            with open(options["path"], "w", encoding="utf-8", newline="") as stream:
+                stream.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
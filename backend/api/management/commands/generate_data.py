@@ -0,0 +1,46 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic import generate_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a reproducible synthetic dataset: users across roles and "
+        "graduation years, with fees and placeholder documents for each"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000,
+                            help="Users to create (default: 1000)")
+        parser.add_argument("--fees", type=int, default=5,
+                            help="Fees per user (default: 5)")
+        parser.add_argument("--documents", type=int, default=2,
+                            help="Documents per user (default: 2)")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Random seed; the same seed gives the same rows (default: 0)")
+        parser.add_argument("--prefix", default="synthetic",
+                            help="Username prefix, also the users' password (default: synthetic)")
+        parser.add_argument("--file-bytes", type=int, default=2048,
+                            help="Size of each placeholder document file (default: 2048)")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows per INSERT (default: 1000)")
+
+    def handle(self, *args, **options):
+        if min(options["users"], options["fees"], options["documents"]) < 0:
+            raise CommandError("--users, --fees and --documents must not be negative.")
+
+        start = time.perf_counter()
+        result = generate_dataset(
+            options["users"],
+            fees_per_user=options["fees"],
+            documents_per_user=options["documents"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+            file_bytes=options["file_bytes"],
+            batch_size=options["batch_size"],
+        )
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fee_import import import_fees
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Bulk create fees from a CSV of student_id, description, amount, due_date"
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Path to the CSV file")
+        parser.add_argument(
+            "--created-by",
+            help="Username of the admin recorded as creating the fees",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Rows validated and inserted per batch (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options["created_by"]:
+            try:
+                created_by = User.objects.get(username=options["created_by"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['created_by']!r}")
+
+        try:
+            with open(options["csv_path"], encoding="utf-8-sig", newline="") as stream:
+                result = import_fees(
+                    stream,
+                    created_by=created_by,
+                    chunk_size=options["chunk_size"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result["errors"]:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} fee(s), skipped {result['error_count']} row(s)."
+        ))
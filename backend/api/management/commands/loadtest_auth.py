@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory, RequestFactory
+
+from api import async_views, views
+from api.benchmarks import percentile
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire a burst of logins at the sync and async login views and report "
+        "throughput and latency percentiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Logins per view (default: 200)")
+        parser.add_argument("--concurrency", type=int, default=32,
+                            help="Logins in flight at once (default: 32)")
+        parser.add_argument("--allow-writes", action="store_true",
+                            help="Confirm that the run may write to this database")
+
+    def handle(self, *args, **options):
+        # Logins run on worker threads with their own connections, so the
+        # writes cannot be rolled back the way benchmark_api rolls back its own
+        if not options["allow_writes"]:
+            raise CommandError(
+                "loadtest_auth creates a throwaway user and logs it in (updating "
+                "last_login) on the configured database; pass --allow-writes to proceed."
+            )
+        username = f"loadtest-auth-{uuid.uuid4().hex[:12]}"
+        password = "Loadtest-Passw0rd!"
+        User.objects.create_user(username, password=password, role="ALUMNI")
+        body = json.dumps({"username": username, "password": password})
+        try:
+            results = {
+                "sync": self.run_sync(body, options["requests"], options["concurrency"]),
+                "async": asyncio.run(
+                    self.run_async(body, options["requests"], options["concurrency"])
+                ),
+            }
+        finally:
+            User.objects.filter(username=username).delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def summarize(self, timings, statuses, elapsed):
+        return {
+            "requests_per_second": round(len(timings) / elapsed, 1),
+            "p50_ms": round(percentile(timings, 50) * 1000, 1),
+            "p99_ms": round(percentile(timings, 99) * 1000, 1),
+            "status_codes": dict(Counter(statuses)),
+        }
+
+    def run_sync(self, body, requests, concurrency):
+        factory = RequestFactory()
+
+        def one(_):
+            request = factory.post("/api/auth/login/", body, content_type="application/json")
+            start = time.perf_counter()
+            response = views.login(request)
+            response.render()
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+        return self.summarize([t for t, _ in outcomes], [s for _, s in outcomes], elapsed)
+
+    async def run_async(self, body, requests, concurrency):
+        factory = AsyncRequestFactory()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with gate:
+                request = factory.post("/api/auth/login/", body, content_type="application/json")
+                start = time.perf_counter()
+                response = await async_views.login(request)
+                return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        return self.summarize([t for t, _ in outcomes], [s for _, s in outcomes], elapsed)
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from api.models import SUMMARY_TOTALS, FeeSummary, ledger_fee_summary, rebuild_fee_summary
+
+
+def _key(row):
+    return (row.role, row.graduation_year, row.due_month)
+
+
+def _totals(row):
+    return tuple(getattr(row, name) for name in SUMMARY_TOTALS)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FeeSummary table from the fee ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report buckets that differ from the ledger, do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            count = rebuild_fee_summary()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} summary bucket(s)."))
+            return
+
+        ledger = {_key(row): _totals(row) for row in ledger_fee_summary()}
+        # Emptied buckets are left in place by incremental updates
+        stored = {
+            _key(row): _totals(row) for row in FeeSummary.objects.all()
+            if any(_totals(row))
+        }
+        empty = (0, 0, 0, 0)
+
+        mismatches = sorted(
+            key for key in ledger.keys() | stored.keys()
+            if ledger.get(key, empty) != stored.get(key, empty)
+        )
+        for key in mismatches:
+            self.stdout.write(
+                f"{key}: stored {stored.get(key, empty)}, ledger {ledger.get(key, empty)}"
+            )
+
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f"{len(mismatches)} bucket(s) out of sync."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Fee summary matches the ledger."))
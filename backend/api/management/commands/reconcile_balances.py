@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from api.models import User, ledger_balance, ledger_owes, recompute_outstanding_balances
+
+
+class Command(BaseCommand):
+    help = "Check stored user balances against the fee ledger and repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report mismatched users, do not repair them",
+        )
+
+    def handle(self, *args, **options):
+        drifted = User.objects.annotate(
+            ledger_balance=ledger_balance(),
+            ledger_owes=ledger_owes(),
+        ).filter(
+            ~Q(outstanding_balance=F("ledger_balance"))
+            | ~Q(owes_fees=F("ledger_owes"))
+        )
+
+        mismatches = list(drifted.values_list(
+            "id", "username", "outstanding_balance", "ledger_balance"
+        ))
+        for user_id, username, stored, ledger in mismatches:
+            self.stdout.write(
+                f"{username} (id={user_id}): stored {stored}, ledger {ledger}"
+            )
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All balances match the ledger."))
+            return
+
+        if options["check"]:
+            self.stdout.write(self.style.WARNING(
+                f"{len(mismatches)} user(s) out of sync."
+            ))
+            return
+
+        with transaction.atomic():
+            repaired = recompute_outstanding_balances(
+                User.objects.filter(pk__in=[row[0] for row in mismatches])
+            )
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} user(s)."))
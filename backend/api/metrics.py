@@ -0,0 +1,285 @@
+"""
+Per-route request metrics, aggregated in process and served in Prometheus
+text format on ``/metrics``.
+
+``RequestMetricsMiddleware`` times every request and, through a database
+execute wrapper, counts the queries it runs and the time spent in them.
+Samples are keyed by the resolved route name (``fees-list``,
+``documents-download``...), never the raw path, and folded into fixed-bucket
+histograms under one lock, so recording a request costs a few dict updates.
+Streamed bodies (exports, downloads) are timed up to the first byte.
+Sub-requests of ``/api/batch/`` skip the middleware; ``api.batch`` records
+them under their own routes, and the batch itself under ``batch``.
+
+Each worker process keeps its own registry; scrape every worker (or run the
+metrics-enabled process singly) to see the whole picture. Counters reset
+when the process restarts, which Prometheus' ``rate()`` already allows for.
+
+The middleware runs natively under ASGI as well. There the query wrappers
+go on the connections of the thread ``sync_to_async`` runs the request's
+database work on, so queries made on other threads (the async auth views'
+hashing pool) are not counted.
+
+With ``SLOW_REQUEST_SECONDS`` set, requests that take at least that long are
+logged to ``api.metrics`` with their SQL (statements only, not parameters).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import BaseRenderer
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "LATENCY_BUCKETS": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    "QUERY_BUCKETS": (0, 1, 2, 5, 10, 20, 50, 100),
+    "SLOW_REQUEST_SECONDS": None,
+    "SLOW_REQUEST_MAX_QUERIES": 100,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _config(name):
+    return getattr(settings, "REQUEST_METRICS", {}).get(name, DEFAULTS[name])
+
+
+def enabled():
+    return _config("ENABLED")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels):
+    pairs = (
+        '%s="%s"' % (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels.items()
+    )
+    return "{%s}" % ",".join(pairs)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``buckets`` are the inclusive upper bounds"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, **labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            le = bound if bound == "+Inf" else _number(bound)
+            yield f"{name}_bucket{_labels(**labels, le=le)} {cumulative}"
+        yield f"{name}_sum{_labels(**labels)} {_number(self.sum)}"
+        yield f"{name}_count{_labels(**labels)} {self.count}"
+
+
+class MetricsRegistry:
+    """Thread-safe per-route request, latency, query and DB-time aggregates"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = {}
+            self._latency = {}
+            self._queries = {}
+            self._db_seconds = {}
+
+    def observe(self, route, method, status, seconds, queries, db_seconds):
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            latency = self._latency.get((route, method))
+            if latency is None:
+                latency = self._latency[(route, method)] = Histogram(_config("LATENCY_BUCKETS"))
+            latency.observe(seconds)
+
+            query_counts = self._queries.get(route)
+            if query_counts is None:
+                query_counts = self._queries[route] = Histogram(_config("QUERY_BUCKETS"))
+            query_counts.observe(queries)
+
+            self._db_seconds[route] = self._db_seconds.get(route, 0.0) + db_seconds
+
+    def render(self):
+        """The current aggregates in Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests handled, by route, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (route, method, status), count in sorted(self._requests.items()):
+                lines.append(
+                    f"http_requests_total{_labels(route=route, method=method, status=status)} {count}"
+                )
+
+            lines += [
+                "# HELP http_request_duration_seconds Time to produce the response.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (route, method), histogram in sorted(self._latency.items()):
+                lines.extend(histogram.samples(
+                    "http_request_duration_seconds", route=route, method=method
+                ))
+
+            lines += [
+                "# HELP http_request_db_queries Database queries run per request.",
+                "# TYPE http_request_db_queries histogram",
+            ]
+            for route, histogram in sorted(self._queries.items()):
+                lines.extend(histogram.samples("http_request_db_queries", route=route))
+
+            lines += [
+                "# HELP http_request_db_duration_seconds_total Time spent in database queries.",
+                "# TYPE http_request_db_duration_seconds_total counter",
+            ]
+            for route, seconds in sorted(self._db_seconds.items()):
+                lines.append(
+                    f"http_request_db_duration_seconds_total{_labels(route=route)} {_number(seconds)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """Database execute wrapper counting and timing the queries of one request"""
+
+    def __init__(self, capture_sql=False, max_statements=0):
+        self.count = 0
+        self.seconds = 0.0
+        self.capture_sql = capture_sql
+        self.max_statements = max_statements
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self.capture_sql and len(self.statements) < self.max_statements:
+                self.statements.append((elapsed, sql))
+
+
+@contextmanager
+def recording_queries(recorder):
+    """Run the block with ``recorder`` wrapping the queries of every connection"""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+@asynccontextmanager
+async def arecording_queries(recorder):
+    """``recording_queries`` for async code, on the thread sync_to_async runs queries on"""
+    with ExitStack() as stack:
+        await sync_to_async(stack.enter_context)(recording_queries(recorder))
+        yield recorder
+
+
+def route_name(request):
+    """Name of the route that handled ``request``; bounded label cardinality"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route or "unnamed"
+
+
+class RequestMetricsMiddleware:
+    """Records latency, query count and DB time for every request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not enabled():
+            return self.get_response(request)
+
+        recorder = self.make_recorder()
+        start = time.perf_counter()
+        with recording_queries(recorder):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+
+        recorder = self.make_recorder()
+        start = time.perf_counter()
+        async with arecording_queries(recorder):
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    def make_recorder(self):
+        return QueryRecorder(
+            capture_sql=_config("SLOW_REQUEST_SECONDS") is not None,
+            max_statements=_config("SLOW_REQUEST_MAX_QUERIES"),
+        )
+
+    def record(self, request, response, elapsed, recorder):
+        slow_after = _config("SLOW_REQUEST_SECONDS")
+        route = route_name(request)
+        registry.observe(
+            route, request.method, response.status_code,
+            elapsed, recorder.count, recorder.seconds
+        )
+        if slow_after is not None and elapsed >= slow_after:
+            self.log_slow_request(request, route, response, elapsed, recorder)
+
+    def log_slow_request(self, request, route, response, elapsed, recorder):
+        statements = "\n".join(
+            f"  {seconds * 1000:.1f}ms {sql}" for seconds, sql in recorder.statements
+        )
+        logger.warning(
+            "Slow request %s %s (%s) -> %s in %.3fs, %d queries in %.3fs\n%s",
+            request.method, request.path, route, response.status_code,
+            elapsed, recorder.count, recorder.seconds, statements
+        )
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    media_type = "text/plain; version=0.0.4"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Error responses (401/403) carry a {"detail": ...} dict
+        return str(data.get("detail", data) if isinstance(data, dict) else data).encode(self.charset)
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:01
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_outstanding_balance(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Fee = apps.get_model('api', 'Fee')
+    unpaid = Fee.objects.filter(user=OuterRef('pk'), is_paid=False)
+    ledger_total = unpaid.order_by().values('user').annotate(
+        total=Sum('amount')
+    ).values('total')
+    User.objects.update(
+        outstanding_balance=Coalesce(
+            Subquery(ledger_total),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        owes_fees=Exists(unpaid),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_fee_updated_at_alter_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='outstanding_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_outstanding_balance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_outstanding_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', '-uploaded_at'], name='doc_owner_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['uploaded_at', 'id'], name='doc_unverified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='doc_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['user', 'amount'], name='fee_unpaid_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['due_date'], name='fee_unpaid_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['user', '-created_at'], name='fee_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['-created_at', '-id'], name='fee_created_idx'),
+        ),
+    ]
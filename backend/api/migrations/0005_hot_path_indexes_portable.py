@@ -0,0 +1,50 @@
+# Replaces 0005_hot_path_indexes, which fails on MySQL: Django emits the
+# partial indexes' WHERE clause there. Databases that applied 0005 keep it
+# and treat this as applied; new ones run this instead, which creates the
+# partial indexes only where the backend supports them.
+
+from django.db import migrations, models
+
+from ._partial_indexes import AddPartialIndex
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('api', '0005_hot_path_indexes'),
+    ]
+
+    dependencies = [
+        ('api', '0004_user_outstanding_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', '-uploaded_at'], name='doc_owner_uploaded_idx'),
+        ),
+        AddPartialIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['uploaded_at', 'id'], name='doc_unverified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='doc_uploaded_idx'),
+        ),
+        AddPartialIndex(
+            model_name='fee',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['user', 'amount'], name='fee_unpaid_user_idx'),
+        ),
+        AddPartialIndex(
+            model_name='fee',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['due_date'], name='fee_unpaid_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['user', '-created_at'], name='fee_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['-created_at', '-id'], name='fee_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:10
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='original_filename',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(storage=api.storage.get_document_storage, upload_to='documents/%Y/%m/%d/'),
+        ),
+    ]
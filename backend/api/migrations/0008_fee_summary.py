@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:34
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_fee_summary(apps, schema_editor):
+    Fee = apps.get_model('api', 'Fee')
+    FeeSummary = apps.get_model('api', 'FeeSummary')
+    rows = (
+        Fee.objects.order_by()
+        .values('user__role', 'user__graduation_year', month=TruncMonth('due_date'))
+        .annotate(
+            outstanding_amount=Sum('amount', filter=Q(is_paid=False), default=Decimal('0.00')),
+            outstanding_count=Count('id', filter=Q(is_paid=False)),
+            collected_amount=Sum('amount', filter=Q(is_paid=True), default=Decimal('0.00')),
+            collected_count=Count('id', filter=Q(is_paid=True)),
+        )
+    )
+    totals = {}
+    for row in rows:
+        key = (
+            row['user__role'],
+            row['user__graduation_year'] or 0,
+            row['month'].strftime('%Y-%m') if row['month'] else '',
+        )
+        bucket = totals.setdefault(key, [Decimal('0.00'), 0, Decimal('0.00'), 0])
+        bucket[0] += row['outstanding_amount']
+        bucket[1] += row['outstanding_count']
+        bucket[2] += row['collected_amount']
+        bucket[3] += row['collected_count']
+    FeeSummary.objects.bulk_create([
+        FeeSummary(
+            role=role, graduation_year=year, due_month=month,
+            outstanding_amount=bucket[0], outstanding_count=bucket[1],
+            collected_amount=bucket[2], collected_count=bucket[3],
+        )
+        for (role, year, month), bucket in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('STUDENT', 'Student'), ('ALUMNI', 'Alumni'), ('ADMIN', 'Admin')], max_length=10)),
+                ('graduation_year', models.IntegerField(default=0)),
+                ('due_month', models.CharField(blank=True, default='', max_length=7)),
+                ('outstanding_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('outstanding_count', models.IntegerField(default=0)),
+                ('collected_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('collected_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['role', 'graduation_year', 'due_month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feesummary',
+            constraint=models.UniqueConstraint(fields=('role', 'graduation_year', 'due_month'), name='fee_summary_bucket_uniq'),
+        ),
+        migrations.RunPython(backfill_fee_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_fee_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', 'document_type', '-uploaded_at'], name='doc_owner_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['document_type', '-uploaded_at'], name='doc_type_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['due_date', 'id'], name='fee_due_idx'),
+        ),
+    ]
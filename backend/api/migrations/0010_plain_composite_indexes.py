@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+from ._partial_indexes import RemovePartialIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_list_filter_indexes'),
+    ]
+
+    operations = [
+        RemovePartialIndex(
+            model_name='document',
+            name='doc_unverified_idx',
+        ),
+        RemovePartialIndex(
+            model_name='fee',
+            name='fee_unpaid_user_idx',
+        ),
+        RemovePartialIndex(
+            model_name='fee',
+            name='fee_unpaid_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['is_verified', 'uploaded_at', 'id'], name='doc_verified_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['user', 'is_paid', 'amount'], name='fee_user_paid_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['is_paid', 'due_date'], name='fee_paid_due_idx'),
+        ),
+    ]
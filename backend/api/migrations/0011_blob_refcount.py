@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:24
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_blob_references(apps, schema_editor):
+    Blob = apps.get_model('api', 'Blob')
+    Document = apps.get_model('api', 'Document')
+    rows = (
+        Document.objects.exclude(sha256='').order_by()
+        .values('sha256').annotate(refcount=Count('id'))
+    )
+    Blob.objects.bulk_create(
+        [Blob(digest=row['sha256'], refcount=row['refcount']) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_plain_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_blob_references, migrations.RunPython.noop),
+    ]
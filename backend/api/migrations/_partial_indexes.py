@@ -0,0 +1,26 @@
+"""
+Index operations for the partial indexes 0005 once created.
+
+MySQL has no partial indexes and Django emits their ``WHERE`` clause
+regardless, so these operations only touch the database where the backend
+supports them; elsewhere they just keep the migration state in step.
+"""
+from django.db import migrations
+
+
+class _PartialIndexMixin:
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.features.supports_partial_indexes:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.features.supports_partial_indexes:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddPartialIndex(_PartialIndexMixin, migrations.AddIndex):
+    pass
+
+
+class RemovePartialIndex(_PartialIndexMixin, migrations.RemoveIndex):
+    pass
@@ -1,9 +1,19 @@
-from django.db import models
+import os
+import uuid
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from django.utils import timezone
 
+from . import debt_cache, user_cache
+from .storage import blob_name, digest_from_name, get_document_storage
+
 
 class User(AbstractUser):
     class Roles(models.TextChoices):
@@ -13,6 +23,12 @@ class User(AbstractUser):
 
     role = models.CharField(max_length=10, choices=Roles.choices, default=Roles.STUDENT)
     owes_fees = models.BooleanField(default=False)
+    outstanding_balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     graduation_year = models.IntegerField(blank=True, null=True)
     student_id = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -24,17 +40,69 @@ class User(AbstractUser):
 
     @property
     def total_debt(self):
-        """Calculate total outstanding debt"""
-        from django.db.models import Sum
+        """Total outstanding debt, read from the stored balance"""
+        return self.outstanding_balance
+
+    def ledger_debt(self):
+        """Calculate total outstanding debt from the fee ledger"""
         result = self.fees.filter(is_paid=False).aggregate(
             total=Sum('amount')
         )
         return result['total'] if result['total'] is not None else Decimal('0.00')
 
+    @property
+    def version_stamp(self):
+        """Changes whenever the user row is saved; embedded in access tokens"""
+        return int(self.updated_at.timestamp() * 1000000) if self.updated_at else 0
+
     def has_outstanding_debt(self):
         """Check if user has any outstanding debt"""
         return self.fees.filter(is_paid=False).exists()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The FeeSummary bucket this user's fees were counted under
+        if 'role' in field_names and 'graduation_year' in field_names:
+            instance._loaded_summary_key = (instance.role, instance.graduation_year)
+        return instance
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def move_fee_summary(sender, instance, created, **kwargs):
+    """Re-bucket a user's fees in FeeSummary when their role or year changes"""
+    current = (instance.role, instance.graduation_year)
+    previous = getattr(instance, '_loaded_summary_key', current)
+    instance._loaded_summary_key = current
+    if created or previous == current:
+        return
+
+    deltas = {}
+    totals = (
+        instance.fees.order_by().values('due_date', 'is_paid')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    for row in totals:
+        for (role, year), sign in ((previous, -1), (current, 1)):
+            add_fee_summary_delta(
+                deltas, summary_bucket(role, year, row['due_date']),
+                row['total'], row['is_paid'], sign, count=row['count']
+            )
+    apply_fee_summary_deltas(deltas)
+
+
+def forget_cached_users(user_ids):
+    """Drop cached per-user state after fee balances change"""
+    user_ids = list(user_ids)
+    debt_cache.invalidate(user_ids)
+    user_cache.invalidate(user_ids)
+
 
 class Fee(models.Model):
     """Track individual fees/debts for users"""
@@ -64,29 +132,352 @@ class Fee(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unpaid fees per user (covering): balances, has_outstanding_debt().
+            # Plain rather than partial indexes, which MySQL lacks
+            models.Index(fields=['user', 'is_paid', 'amount'], name='fee_user_paid_amount_idx'),
+            # Overdue scans
+            models.Index(fields=['is_paid', 'due_date'], name='fee_paid_due_idx'),
+            # A user's fees in default order
+            models.Index(fields=['user', '-created_at'], name='fee_user_created_idx'),
+            # ?due_date_after/before= and ?ordering=due_date across all fees
+            models.Index(fields=['due_date', 'id'], name='fee_due_idx'),
+            # Default list ordering
+            models.Index(fields=['-created_at', '-id'], name='fee_created_idx'),
+        ]
 
     def __str__(self):
         status = "Paid" if self.is_paid else "Outstanding"
         return f"{self.user.username} - {self.description} ({status})"
 
+    LEDGER_FIELDS = ('user_id', 'amount', 'is_paid', 'due_date')
+
+    @property
+    def outstanding_amount(self):
+        """Amount this fee adds to its user's outstanding balance"""
+        return Decimal('0.00') if self.is_paid else Decimal(self.amount)
+
+    def _ledger_state(self):
+        due_date = Fee._meta.get_field('due_date').to_python(self.due_date)
+        return (self.user_id, Decimal(self.amount), self.is_paid, due_date)
+
+    def _stored_ledger(self):
+        """
+        (user_id, amount, is_paid, due_date) stored for this row, read under
+        a row lock: the loaded instance may be stale, and concurrent saves of
+        the same fee must each see the other's result. Call in a transaction.
+        """
+        if self.pk is None or self._state.adding:
+            return None
+        return (
+            Fee.objects.select_for_update().filter(pk=self.pk)
+            .values_list(*self.LEDGER_FIELDS).first()
+        )
+
     def save(self, *args, **kwargs):
-        # Check if this is a new fee or if payment status changed
-        is_new = self.pk is None
-        if not is_new:
-            try:
-                old_instance = Fee.objects.get(pk=self.pk)
-                payment_changed = old_instance.is_paid != self.is_paid
-            except Fee.DoesNotExist:
-                payment_changed = True
-        else:
-            payment_changed = True
-        
-        super().save(*args, **kwargs)
-        
-        # Update user's owes_fees flag only if payment status changed
-        if payment_changed:
-            self.user.owes_fees = self.user.has_outstanding_debt()
-            self.user.save(update_fields=['owes_fees'])
+        new = self._ledger_state()
+        user = self.user if Fee.user.is_cached(self) else None
+
+        with transaction.atomic():
+            old = self._stored_ledger()
+            super().save(*args, **kwargs)
+
+            # Apply only the difference to the stored balance(s)
+            old_debt = None if old is None else (old[0], Decimal('0.00') if old[2] else old[1])
+            new_debt = (new[0], self.outstanding_amount)
+            if old_debt is not None and old_debt[0] != new_debt[0]:
+                adjust_outstanding_balance(old_debt[0], -old_debt[1])
+                adjust_outstanding_balance(new_debt[0], new_debt[1], user=user)
+            else:
+                delta = new_debt[1] - (old_debt[1] if old_debt is not None else Decimal('0.00'))
+                adjust_outstanding_balance(new_debt[0], delta, user=user)
+
+            if old != new:
+                deltas = {}
+                if old is not None:
+                    add_fee_ledger_delta(deltas, old, -1, user=user)
+                add_fee_ledger_delta(deltas, new, 1, user=user)
+                apply_fee_summary_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Fee)
+def lock_deleted_fee(sender, instance, origin=None, **kwargs):
+    """Read what the row being deleted contributes; the instance may be stale"""
+    if origin is None or origin is instance:
+        # Sent inside the deletion's transaction, which keeps the lock
+        instance._deleted_ledger = instance._stored_ledger()
+    else:
+        # Queryset delete or cascade (e.g. from a user): every pre_delete is
+        # sent before the first post_delete, so gather the rows the collector
+        # loaded and let release_deleted_fees settle them in one pass
+        origin.__dict__.setdefault('_deleted_fee_ledgers', []).append(instance._ledger_state())
+
+
+@receiver(post_delete, sender=Fee)
+def release_fee_debt(sender, instance, **kwargs):
+    """Remove a deleted fee's contribution from its user's balance"""
+    ledger = getattr(instance, '_deleted_ledger', None)
+    if ledger is not None and not ledger[2]:
+        adjust_outstanding_balance(ledger[0], -ledger[1])
+
+
+@receiver(post_delete, sender=Fee)
+def release_fee_summary(sender, instance, **kwargs):
+    """Remove a deleted fee from the FeeSummary totals"""
+    ledger = getattr(instance, '_deleted_ledger', None)
+    if ledger is not None:
+        deltas = {}
+        add_fee_ledger_delta(deltas, ledger, -1)
+        apply_fee_summary_deltas(deltas)
+
+
+@receiver(post_delete, sender=Fee)
+def release_deleted_fees(sender, instance, origin=None, **kwargs):
+    """
+    Remove the fees of a queryset or cascading delete from their users'
+    balances and the FeeSummary totals, once for the whole deletion.
+    """
+    ledgers = origin.__dict__.pop('_deleted_fee_ledgers', None) if origin is not None else None
+    if not ledgers:
+        return
+    debtors = {user_id for user_id, amount, is_paid, due_date in ledgers if not is_paid}
+    if debtors:
+        # The deleted rows are already gone from the ledger
+        recompute_outstanding_balances(User.objects.filter(pk__in=debtors))
+
+    keys = {
+        pk: (role, graduation_year)
+        for pk, role, graduation_year in User.objects.filter(
+            pk__in={ledger[0] for ledger in ledgers}
+        ).values_list('pk', 'role', 'graduation_year')
+    }
+    deltas = {}
+    for user_id, amount, is_paid, due_date in ledgers:
+        # Users already deleted are left for rebuild_fee_summary
+        if user_id in keys:
+            add_fee_summary_delta(deltas, summary_bucket(*keys[user_id], due_date), amount, is_paid, -1)
+    apply_fee_summary_deltas(deltas)
+
+
+def adjust_outstanding_balance(user_id, delta, user=None):
+    """
+    Shift a user's stored balance by ``delta`` in a single UPDATE.
+    ``owes_fees`` is derived from the resulting balance in the same statement.
+    If the loaded ``user`` instance is passed, it is kept in step in memory.
+    """
+    if not delta:
+        return
+    forget_cached_users([user_id])
+    now = timezone.now()
+    User.objects.filter(pk=user_id).update(
+        # owes_fees is assigned first so it sees the pre-update balance on
+        # backends that evaluate SET clauses left to right (MySQL)
+        owes_fees=Case(
+            When(outstanding_balance__gt=-delta, then=Value(True)),
+            default=Value(False),
+        ),
+        outstanding_balance=F('outstanding_balance') + delta,
+        # The balance is part of the serialized user, so it counts as a change
+        # for version stamps and conditional GET validators
+        updated_at=now,
+    )
+    if user is not None:
+        user.outstanding_balance = user.outstanding_balance + delta
+        user.owes_fees = user.outstanding_balance > 0
+        user.updated_at = now
+
+
+def ledger_balance(user_ref='pk'):
+    """Expression: sum of unpaid fee amounts for the user at ``user_ref``"""
+    ledger_total = Fee.objects.filter(
+        user=OuterRef(user_ref), is_paid=False
+    ).order_by().values('user').annotate(total=Sum('amount')).values('total')
+    return Coalesce(
+        Subquery(ledger_total),
+        Value(Decimal('0.00')),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def ledger_owes(user_ref='pk'):
+    """Expression: whether the user at ``user_ref`` has any unpaid fee"""
+    return Exists(Fee.objects.filter(user=OuterRef(user_ref), is_paid=False))
+
+
+def recompute_outstanding_balances(users=None):
+    """
+    Rebuild ``outstanding_balance`` and ``owes_fees`` from the fee ledger
+    for the given users (a queryset, defaults to everyone) in one UPDATE.
+    Returns the number of users updated.
+    """
+    if users is None:
+        users = User.objects.all()
+    forget_cached_users(users.values_list('pk', flat=True))
+    return users.update(
+        outstanding_balance=ledger_balance(),
+        owes_fees=ledger_owes(),
+        updated_at=timezone.now(),
+    )
+
+
+
+def settle_fees(fees, is_paid, limit=None):
+    """
+    Mark every fee in the ``fees`` queryset paid or unpaid with one UPDATE,
+    then recompute the affected users' balances in one set-based pass.
+    Fees already in the requested state are left untouched.
+    Returns the ids of the fees that changed. Raises ValueError, changing
+    nothing, when more than ``limit`` fees would change.
+    """
+    with transaction.atomic():
+        changed = (
+            fees.filter(is_paid=not is_paid)
+            .select_for_update()
+            .order_by()
+            .values_list('id', 'user_id')
+        )
+        changed = list(changed if limit is None else changed[:limit + 1])
+        if not changed:
+            return []
+        if limit is not None and len(changed) > limit:
+            raise ValueError(f'More than {limit} fees match; narrow the selection.')
+        fee_ids = [fee_id for fee_id, _ in changed]
+        user_ids = {user_id for _, user_id in changed}
+
+        # Move the settled amounts between outstanding and collected
+        deltas = {}
+        totals = (
+            Fee.objects.filter(pk__in=fee_ids).order_by()
+            .values('user__role', 'user__graduation_year', 'due_date')
+            .annotate(total=Sum('amount'), count=Count('id'))
+        )
+        for row in totals:
+            bucket = summary_bucket(row['user__role'], row['user__graduation_year'], row['due_date'])
+            add_fee_summary_delta(deltas, bucket, row['total'], not is_paid, -1, count=row['count'])
+            add_fee_summary_delta(deltas, bucket, row['total'], is_paid, 1, count=row['count'])
+
+        Fee.objects.filter(pk__in=fee_ids).update(
+            is_paid=is_paid,
+            paid_date=timezone.now().date() if is_paid else None,
+            updated_at=timezone.now(),
+        )
+        recompute_outstanding_balances(User.objects.filter(pk__in=user_ids))
+        apply_fee_summary_deltas(deltas)
+    return fee_ids
+
+class FeeSummary(models.Model):
+    """
+    Outstanding and collected fee totals per (role, graduation year, due
+    month) bucket. Every Fee write path applies its difference here, so
+    analytics read a handful of rows instead of the ledger;
+    ``rebuild_fee_summary`` recomputes the table from scratch. A missing
+    graduation year or due date is stored as 0 / '' so buckets stay unique.
+    """
+    role = models.CharField(max_length=10, choices=User.Roles.choices)
+    graduation_year = models.IntegerField(default=0)
+    due_month = models.CharField(max_length=7, blank=True, default='')
+    outstanding_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    outstanding_count = models.IntegerField(default=0)
+    collected_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    collected_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['role', 'graduation_year', 'due_month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['role', 'graduation_year', 'due_month'],
+                name='fee_summary_bucket_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.role} {self.graduation_year or '-'} {self.due_month or '-'}"
+
+
+SUMMARY_TOTALS = ('outstanding_amount', 'outstanding_count', 'collected_amount', 'collected_count')
+
+
+def summary_bucket(role, graduation_year, due_date):
+    """FeeSummary key for a fee with this user role/year and due date"""
+    return (role, graduation_year or 0, due_date.strftime('%Y-%m') if due_date else '')
+
+
+def add_fee_summary_delta(deltas, bucket, amount, is_paid, sign, count=1):
+    """Accumulate ``sign`` x (amount, count) into the outstanding or collected totals of ``bucket``"""
+    totals = deltas.setdefault(bucket, [Decimal('0.00'), 0, Decimal('0.00'), 0])
+    offset = 2 if is_paid else 0
+    totals[offset] += sign * amount
+    totals[offset + 1] += sign * count
+
+
+def add_fee_ledger_delta(deltas, ledger, sign, user=None):
+    """Accumulate one fee's ``_ledger_state()``, looking up its user's role and year"""
+    user_id, amount, is_paid, due_date = ledger
+    if user is not None and user.pk == user_id:
+        key = (user.role, user.graduation_year)
+    else:
+        key = User.objects.filter(pk=user_id).values_list('role', 'graduation_year').first()
+        if key is None:
+            # Left for rebuild_fee_summary to account for
+            return
+    add_fee_summary_delta(deltas, summary_bucket(*key, due_date), amount, is_paid, sign)
+
+
+def apply_fee_summary_deltas(deltas):
+    """Add accumulated deltas to FeeSummary with one UPDATE per bucket (INSERT when new)"""
+    for (role, year, month), totals in deltas.items():
+        if not any(totals):
+            continue
+        bucket = FeeSummary.objects.filter(role=role, graduation_year=year, due_month=month)
+        changes = {name: F(name) + value for name, value in zip(SUMMARY_TOTALS, totals)}
+        if bucket.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                FeeSummary.objects.create(
+                    role=role, graduation_year=year, due_month=month,
+                    **dict(zip(SUMMARY_TOTALS, totals))
+                )
+        except IntegrityError:
+            # Created concurrently since the UPDATE above
+            bucket.update(**changes)
+
+
+def ledger_fee_summary():
+    """FeeSummary rows computed from the fee ledger with one grouped query"""
+    rows = (
+        Fee.objects.order_by()
+        .values('user__role', 'user__graduation_year', month=TruncMonth('due_date'))
+        .annotate(
+            outstanding_amount=Sum('amount', filter=Q(is_paid=False), default=Decimal('0.00')),
+            outstanding_count=Count('id', filter=Q(is_paid=False)),
+            collected_amount=Sum('amount', filter=Q(is_paid=True), default=Decimal('0.00')),
+            collected_count=Count('id', filter=Q(is_paid=True)),
+        )
+    )
+    summary = {}
+    for row in rows:
+        # NULL and 0 graduation years share a bucket
+        key = summary_bucket(row['user__role'], row['user__graduation_year'], row['month'])
+        totals = summary.setdefault(key, [Decimal('0.00'), 0, Decimal('0.00'), 0])
+        for index, name in enumerate(SUMMARY_TOTALS):
+            totals[index] += row[name]
+    return [
+        FeeSummary(
+            role=role, graduation_year=year, due_month=month,
+            **dict(zip(SUMMARY_TOTALS, totals))
+        )
+        for (role, year, month), totals in summary.items()
+    ]
+
+
+def rebuild_fee_summary():
+    """Replace the FeeSummary table with totals from the ledger; returns the row count"""
+    rows = ledger_fee_summary()
+    with transaction.atomic():
+        FeeSummary.objects.all().delete()
+        FeeSummary.objects.bulk_create(rows)
+    return len(rows)
 
 
 class Document(models.Model):
@@ -107,8 +498,11 @@ class Document(models.Model):
         choices=DocumentType.choices,
         default=DocumentType.OTHER
     )
-    file = models.FileField(upload_to="documents/%Y/%m/%d/")
+    file = models.FileField(upload_to="documents/%Y/%m/%d/", storage=get_document_storage)
     file_size = models.PositiveIntegerField(blank=True, null=True)
+    # SHA-256 of the file content; names the shared blob in storage
+    sha256 = models.CharField(max_length=64, blank=True, default="", db_index=True, editable=False)
+    original_filename = models.CharField(max_length=255, blank=True, default="")
     uploaded_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     is_verified = models.BooleanField(default=False)
@@ -124,11 +518,229 @@ class Document(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Owner's document list in default order
+            models.Index(fields=['owner', '-uploaded_at'], name='doc_owner_uploaded_idx'),
+            # ?document_type= on an owner's documents, and their grouped counts
+            models.Index(
+                fields=['owner', 'document_type', '-uploaded_at'],
+                name='doc_owner_type_idx'
+            ),
+            # ?document_type= across all documents (admins)
+            models.Index(fields=['document_type', '-uploaded_at'], name='doc_type_uploaded_idx'),
+            # Verification queue, oldest first
+            models.Index(fields=['is_verified', 'uploaded_at', 'id'], name='doc_verified_uploaded_idx'),
+            # Default list ordering
+            models.Index(fields=['-uploaded_at', '-id'], name='doc_uploaded_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.owner.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'sha256' in field_names:
+            instance._loaded_sha256 = instance.sha256
+        return instance
+
+    @property
+    def download_filename(self):
+        return self.original_filename or os.path.basename(self.file.name)
+
     def save(self, *args, **kwargs):
-        if self.file and not self.file_size:
-            self.file_size = self.file.size
-        super().save(*args, **kwargs)
+        stored = bool(self.file) and not self.file._committed
+        digest = digest_from_name(self.file.name) if self.file else ""
+        if not stored and digest == getattr(self, '_loaded_sha256', ''):
+            # Same blob as loaded: no references change
+            if self.file and not self.file_size:
+                self.file_size = self.file.size
+            self.sha256 = digest
+            return super().save(*args, **kwargs)
+
+        written = ''
+        try:
+            with transaction.atomic():
+                if stored:
+                    # Store the upload first so its digest is known for this
+                    # row; storing takes the row's reference to the blob
+                    self.original_filename = os.path.basename(self.file.name)[:255]
+                    self.file.save(self.file.name, self.file.file, save=False)
+                    self.file_size = self.file.size
+                    digest = written = digest_from_name(self.file.name)
+                elif digest:
+                    acquire_blob(digest)
+                if self.file and not self.file_size:
+                    self.file_size = self.file.size
+                self.sha256 = digest
+
+                # The blob the stored row refers to; the loaded instance may be stale
+                previous = None
+                if self.pk is not None and not self._state.adding:
+                    previous = (
+                        Document.objects.select_for_update().filter(pk=self.pk)
+                        .values_list('sha256', flat=True).first()
+                    )
+                super().save(*args, **kwargs)
+                if previous:
+                    release_blob(previous)
+        except Exception:
+            if written:
+                # The rollback undid the reference but not the file
+                discard_blob(written)
+            raise
+        self._loaded_sha256 = self.sha256
+
+
+def set_documents_verified(documents, verified_by=None):
+    """
+    Verify every document in the ``documents`` queryset on behalf of
+    ``verified_by``, or unverify them when it is None, with one UPDATE.
+    Documents already in the requested state are left untouched.
+    Returns the ids of the documents that changed.
+    """
+    is_verified = verified_by is not None
+    with transaction.atomic():
+        doc_ids = list(
+            documents.filter(is_verified=not is_verified)
+            .select_for_update()
+            .order_by()
+            .values_list('id', flat=True)
+        )
+        if not doc_ids:
+            return []
+        now = timezone.now()
+        Document.objects.filter(pk__in=doc_ids).update(
+            is_verified=is_verified,
+            verified_by=verified_by,
+            verified_at=now if is_verified else None,
+            updated_at=now,
+        )
+    return doc_ids
+
+
+class Blob(models.Model):
+    """
+    How many Document rows refer to one content-addressed blob in storage.
+    Counts change with UPDATEs, whose row lock keeps a blob from being
+    deleted while another transaction is taking a reference to it.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.digest} ({self.refcount})"
+
+
+def acquire_blob(digest):
+    """
+    Take a reference to the blob for ``digest``, locking its row until the
+    transaction ends. Call in a transaction, before storing or reusing the
+    blob, so a release running concurrently cannot delete it in between.
+    """
+    blob = Blob.objects.filter(pk=digest)
+    if blob.update(refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(digest=digest, refcount=1)
+    except IntegrityError:
+        # Created concurrently since the UPDATE above
+        blob.update(refcount=F('refcount') + 1)
+
+
+def release_blob(digest):
+    """
+    Drop a reference to the blob for ``digest``; once the transaction
+    commits, the blob is deleted if nothing refers to it any more.
+    """
+    Blob.objects.filter(pk=digest, refcount__gt=0).update(refcount=F('refcount') - 1)
+    transaction.on_commit(lambda: delete_unused_blob(digest))
+
+
+def discard_blob(digest):
+    """
+    Delete the blob for ``digest`` once this commits if no row refers to it,
+    e.g. after the transaction that stored it was rolled back.
+    """
+    with transaction.atomic():
+        acquire_blob(digest)
+        release_blob(digest)
+
+
+def delete_unused_blob(digest):
+    with transaction.atomic():
+        # The DELETE locks the row, so a concurrent acquire_blob() waits and
+        # then stores the blob afresh
+        if Blob.objects.filter(pk=digest, refcount=0).delete()[0]:
+            get_document_storage().delete(blob_name(digest))
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance, **kwargs):
+    """Drop the deleted document's reference to its blob"""
+    if instance.sha256:
+        release_blob(instance.sha256)
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload that becomes a Document when finalized"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        User,
+        related_name="upload_sessions",
+        on_delete=models.CASCADE
+    )
+    title = models.CharField(max_length=255)
+    document_type = models.CharField(
+        max_length=20,
+        choices=Document.DocumentType.choices,
+        default=Document.DocumentType.OTHER
+    )
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    # Sorted, merged [start, end) byte ranges written so far
+    received = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} - {self.owner.username} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def part_path(self):
+        return os.path.join(get_document_storage().path("uploads"), f"{self.pk}.part")
+
+    @property
+    def received_bytes(self):
+        return sum(end - start for start, end in self.received)
+
+    @property
+    def is_complete(self):
+        return self.received == [[0, self.total_size]]
+
+    def add_range(self, start, end):
+        """Record that bytes [start, end) have been written"""
+        merged = []
+        for first, last in sorted(self.received + [[start, end]]):
+            if merged and first <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.received = merged
+
+    def delete(self, *args, **kwargs):
+        # Before the delete, which clears the pk the path is built from
+        part_path = self.part_path
+        result = super().delete(*args, **kwargs)
+
+        def remove_part():
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        # Kept until then, so a finalize that rolls back can be retried
+        transaction.on_commit(remove_part)
+        return result
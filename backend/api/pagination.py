@@ -0,0 +1,60 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CountedPageNumberPagination(PageNumberPagination):
+    """Page-number pagination with a client-chosen ``?page_size=`` (up to 100)"""
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the queryset's explicit ordering (``?ordering=``)
+    or else the model's ``Meta.ordering``, with the primary key as a
+    tie-breaker. Pages are fetched with a ``WHERE`` on the last seen
+    position instead of an ``OFFSET``, and no ``COUNT(*)`` is run.
+    """
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering or ("-pk",)
+        )
+        position = ordering[0].lstrip("-")
+        if position != "pk" and queryset.model._meta.get_field(position).null:
+            # Rows with no value would fall out of every "after X" filter
+            raise ValidationError({
+                "ordering": "Cursor pagination cannot order by a field that may be empty."
+            })
+        # Break ties between equal timestamps in the same direction
+        tie_breaker = "-id" if ordering[0].startswith("-") else "id"
+        if tie_breaker not in ordering:
+            ordering.append(tie_breaker)
+        return tuple(ordering)
+
+
+class OptionalCursorPaginationMixin:
+    """
+    Lets clients opt into ``KeysetPagination`` with ``?pagination=cursor``
+    (or by following a ``?cursor=`` link); other requests keep the
+    project's default page-number pagination.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def uses_cursor_pagination(self):
+        params = self.request.query_params
+        return (
+            params.get("pagination") == "cursor"
+            or KeysetPagination.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.uses_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
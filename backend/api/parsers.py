@@ -0,0 +1,26 @@
+"""
+Drop-in replacement for DRF's ``JSONParser`` backed by ``orjson``, which
+rejects ``NaN`` and ``Infinity`` just like the parser in strict mode. Bodies
+in a charset other than UTF-8, and every body when ``orjson`` is not
+installed, go through the stock parser.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read() if stream is not None else b'')
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission
 
+from . import debt_cache
+
 
 class IsAdmin(BasePermission):
     """Permission class to check if user is an admin"""
@@ -67,7 +69,8 @@ class DebtClearForDownload(BasePermission):
         # For alumni, check if they have outstanding debt
         if request.user.role == "ALUMNI":
             # Check both the owes_fees flag and actual outstanding fees
-            if request.user.owes_fees or request.user.has_outstanding_debt():
+            # (the latter from the debt-status cache)
+            if request.user.owes_fees or debt_cache.owes_fees(request.user.id):
                 return False
         
         return True
@@ -0,0 +1,48 @@
+"""
+Drop-in replacement for DRF's ``JSONRenderer`` backed by ``orjson``.
+
+Output is byte-for-byte what ``JSONRenderer`` produces for API payloads:
+compact separators, UTF-8 rather than ``\\u`` escapes, ``\\u2028``/``\\u2029``
+escaped, and every type ``orjson`` does not handle the same way (datetimes,
+``Decimal``, lazy strings, querysets...) converted by DRF's own
+``JSONEncoder``. Floats are the one difference: ``orjson`` spells very large
+or small floats without ``+`` or leading-zero exponents (``1e16`` rather than
+``1e+16``), and writes NaN as ``null`` instead of refusing it. Serializers
+send decimals as strings, so API responses are not affected.
+
+Without ``orjson`` installed, when indented output is requested, or when
+``UNICODE_JSON``/``COMPACT_JSON`` are turned off, the stock renderer is used.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        # Escaped by JSONRenderer so the output is also valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,295 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+``ReplicaMiddleware`` lets the reads of safe-method requests (GET, HEAD,
+OPTIONS) go to one of the ``READ_REPLICAS["ALIASES"]`` databases;
+``ReplicaRouter`` sends everything else, and every write, to ``default``.
+A request keeps to the primary once it has written anything or opened a
+transaction there, so it always reads its own changes.
+
+After a user makes a write, they stay pinned to the primary for
+``STICKY_SECONDS``. The pin is a cache entry, so point ``CACHE_ALIAS`` at a
+cache shared by all workers. Writes to the database cache itself do not
+count. Before the view runs, pins are looked up by the user id in the
+session or in the bearer token's claims (decoded, not verified: it only
+picks where reads go). They are set for the user the view authenticated.
+
+Each replica is checked at most every ``CHECK_INTERVAL`` seconds per process.
+A replica that cannot be reached, or lags by more than ``MAX_LAG_SECONDS``,
+is skipped for ``RETRY_SECONDS``. So is a replica on which a request fails
+with a database error; if the request has not written anything, its view
+then runs again on the primary. With no usable replica, reads go to the
+primary.
+
+The middleware runs natively under ASGI too; the request state lives in a
+context variable, which ``sync_to_async`` carries into sync views.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.state import token_backend
+
+
+DEFAULTS = {
+    "ALIASES": [],
+    "STICKY_SECONDS": 10,
+    "MAX_LAG_SECONDS": 5,
+    "CHECK_INTERVAL": 5,
+    "RETRY_SECONDS": 30,
+    "CACHE_ALIAS": "default",
+}
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+logger = logging.getLogger(__name__)
+
+
+def _config(name):
+    return getattr(settings, "READ_REPLICAS", {}).get(name, DEFAULTS[name])
+
+
+class _RequestState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.alias = None
+        self.chosen = False
+        self.wrote = False
+
+
+_state = contextvars.ContextVar("replica_state", default=None)
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside this block, whatever the request"""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    use_replica = state.use_replica
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = use_replica
+
+
+# Replica health, per process: alias -> (usable, monotonic time of next check)
+_health = {}
+_health_lock = threading.Lock()
+
+
+def reset_health():
+    with _health_lock:
+        _health.clear()
+
+
+def mark_down(alias):
+    """Skip ``alias`` for ``RETRY_SECONDS``"""
+    with _health_lock:
+        _health[alias] = (False, time.monotonic() + _config("RETRY_SECONDS"))
+
+
+def replica_lag(connection):
+    """
+    Seconds the replica behind ``connection`` trails its primary, or None
+    when the backend cannot tell; either way the connection is exercised.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # An idle primary leaves the replay timestamp behind, so a replica
+            # that has replayed everything it received counts as current
+            cursor.execute(
+                "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )
+            lag = cursor.fetchone()[0]
+            return None if lag is None else float(lag)
+        if connection.vendor == "mysql":
+            cursor.execute("SHOW REPLICA STATUS")
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            columns = [column[0] for column in cursor.description]
+            lag = dict(zip(columns, row)).get("Seconds_Behind_Source")
+            return None if lag is None else float(lag)
+        cursor.execute("SELECT 1")
+        return None
+
+
+def is_available(alias):
+    now = time.monotonic()
+    with _health_lock:
+        entry = _health.get(alias)
+    if entry is not None and now < entry[1]:
+        return entry[0]
+
+    try:
+        lag = replica_lag(connections[alias])
+    except DatabaseError as exc:
+        logger.warning("Read replica %s is unavailable: %s", alias, exc)
+        usable = False
+    else:
+        usable = lag is None or lag <= _config("MAX_LAG_SECONDS")
+        if not usable:
+            logger.warning("Read replica %s lags by %.1fs", alias, lag)
+    with _health_lock:
+        _health[alias] = (usable, now + _config("CHECK_INTERVAL" if usable else "RETRY_SECONDS"))
+    return usable
+
+
+def choose_replica():
+    """Alias the current request reads from, or None for the primary"""
+    state = _state.get()
+    if state is None or not state.use_replica or state.wrote:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    if not state.chosen:
+        # One replica per request, so its reads see a single snapshot
+        candidates = [alias for alias in _config("ALIASES") if is_available(alias)]
+        state.alias = random.choice(candidates) if candidates else None
+        state.chosen = True
+    return state.alias
+
+
+class ReplicaRouter:
+    """Reads to a replica when the request allows it; writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        # The database cache holds pins and invalidations; a lagging replica
+        # would serve them stale
+        if model._meta.app_label == "django_cache":
+            return DEFAULT_DB_ALIAS
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        # Refreshing a cache entry is not a write the user must read back
+        if state is not None and model._meta.app_label != "django_cache":
+            state.wrote = True
+        # Explicit, or Django would write back to the database an instance
+        # was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *_config("ALIASES")}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        if db in _config("ALIASES"):
+            return False
+        return None
+
+
+def _pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def request_user_id(request):
+    """The requesting user's id from the session or bearer token, if any"""
+    session = getattr(request, "session", None)
+    if session is not None and settings.SESSION_COOKIE_NAME in request.COOKIES:
+        user_id = session.get(SESSION_KEY)
+        if user_id is not None:
+            return user_id
+
+    parts = request.META.get(jwt_settings.AUTH_HEADER_NAME, "").split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        # Claims only; the view authenticates the user properly
+        claims = token_backend.decode(parts[1], verify=False)
+    except TokenBackendError:
+        return None
+    return claims.get(jwt_settings.USER_ID_CLAIM)
+
+
+class ReplicaMiddleware:
+    """Routes safe-method requests to replicas unless the user is pinned"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _config("ALIASES"):
+            return self.get_response(request)
+
+        state = _RequestState(self.use_replica(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        self.pin(request, state)
+        return response
+
+    async def __acall__(self, request):
+        if not _config("ALIASES"):
+            return await self.get_response(request)
+
+        # The cache may be the database cache, and request.user may load
+        # the session's user, so both run where database access is allowed
+        state = _RequestState(await sync_to_async(self.use_replica)(request))
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        await sync_to_async(self.pin)(request, state)
+        return response
+
+    def use_replica(self, request):
+        if request.method not in SAFE_METHODS:
+            return False
+        user_id = request_user_id(request)
+        return user_id is None or not caches[_config("CACHE_ALIAS")].get(_pin_key(user_id))
+
+    def pin(self, request, state):
+        """Keep a user who wrote on the primary for STICKY_SECONDS"""
+        if state.wrote or request.method not in SAFE_METHODS:
+            # The authenticated user, never the unverified token claim
+            # (DRF sets the user on the request too)
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                caches[_config("CACHE_ALIAS")].set(
+                    _pin_key(user.pk), True, _config("STICKY_SECONDS")
+                )
+
+    def process_exception(self, request, exception):
+        state = _state.get()
+        if not (isinstance(exception, DatabaseError) and state is not None and state.alias):
+            return None
+        logger.warning("Read replica %s failed a request: %s", state.alias, exception)
+        mark_down(state.alias)
+        if state.wrote:
+            return None
+        match = request.resolver_match
+        if iscoroutinefunction(match.func):
+            return None
+        # Nothing was written, so the view can run again on the primary
+        state.use_replica = False
+        return match.func(request, *match.args, **match.kwargs)
@@ -1,10 +1,110 @@
+from datetime import datetime, time, timedelta
+
 from rest_framework import serializers
-from .models import User, Document, Fee
+from django.conf import settings
+from django.utils import timezone
+from .models import User, Document, Fee, UploadSession
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
+from django.core.exceptions import FieldDoesNotExist
+
+
+def _query_list(request, name):
+    value = request.query_params.get(name, "")
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+def load_ordering_columns(queryset):
+    """
+    Keep the columns ``queryset`` is ordered by among those ``.only()``
+    loads: cursor pagination reads them from every row, and a deferred
+    column costs a query per row.
+    """
+    names, defer = queryset.query.deferred_loading
+    if defer or not names:
+        return queryset
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    columns = {
+        name.lstrip('-') for name in ordering if isinstance(name, str) and name != '?'
+    } - {'pk'}
+    if columns <= names:
+        return queryset
+    return queryset.only(*names, *columns)
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients shape responses with query parameters:
+
+    - ``?fields=id,amount`` returns only those fields (reads only; writes
+      always see every field).
+    - ``?expand=user`` replaces a related object's id with the nested
+      serializer named in ``expandable_fields``.
+
+    Only the top-level serializer of a request reacts to the parameters;
+    expanded objects are rendered in full. ``trim_queryset`` narrows a
+    queryset to the columns and joins the resulting fields need.
+    """
+    expandable_fields = {}
+    # Model columns read by fields that are not backed by a column of their own
+    field_sources = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self._is_root():
+            return fields
+
+        for name in _query_list(request, 'expand') & set(self.expandable_fields):
+            fields[name] = self.expandable_fields[name](read_only=True)
+
+        requested = _query_list(request, 'fields')
+        if requested and request.method in ('GET', 'HEAD', 'OPTIONS'):
+            fields = {
+                name: field for name, field in fields.items()
+                if name in requested or field.write_only
+            }
+        return fields
 
+    def model_columns(self):
+        """Model field names the readable fields load from"""
+        model = self.Meta.model
+        columns = set()
+        for name, field in self.fields.items():
+            if field.write_only or isinstance(field, serializers.BaseSerializer):
+                continue
+            for source in self.field_sources.get(name, (field.source,)):
+                try:
+                    model._meta.get_field(source)
+                except FieldDoesNotExist:
+                    continue
+                columns.add(source)
+        return columns
 
-class UserSerializer(serializers.ModelSerializer):
+    def trim_queryset(self, queryset):
+        """Load only what this serializer will output, joining expanded relations"""
+        columns = self.model_columns() | {'updated_at'}
+        related = []
+        for name, field in self.fields.items():
+            if isinstance(field, SparseFieldsMixin) and not field.write_only:
+                related.append(field.source)
+                columns.update(
+                    f"{field.source}__{column}"
+                    for column in field.model_columns() | {'updated_at'}
+                )
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return load_ordering_columns(queryset.only(*columns))
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     total_debt = serializers.DecimalField(
         max_digits=10, 
         decimal_places=2, 
@@ -21,6 +121,8 @@ class UserSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "date_joined", "created_at", "owes_fees", "total_debt")
 
+    field_sources = {"total_debt": ("outstanding_balance",)}
+
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -93,10 +195,12 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
 
-class FeeSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class FeeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
     user_id = serializers.IntegerField(write_only=True, required=False)
-    created_by = UserSerializer(read_only=True)
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    expandable_fields = {"user": UserSerializer, "created_by": UserSerializer}
 
     class Meta:
         model = Fee
@@ -112,22 +216,258 @@ class FeeSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class DocumentSerializer(serializers.ModelSerializer):
-    owner = UserSerializer(read_only=True)
+class BulkFeeSettlementSerializer(serializers.Serializer):
+    """Selects the fees for a bulk mark paid/unpaid request"""
+    # Also the most fees a filter may select
+    MAX_FEES = 10000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_FEES
+    )
+    user_id = serializers.IntegerField(required=False)
+    due_date_before = serializers.DateField(required=False)
+    due_date_after = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError(
+                'Provide "ids" or at least one filter.'
+            )
+        return attrs
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'ids' in data:
+            queryset = queryset.filter(pk__in=data['ids'])
+        if 'user_id' in data:
+            queryset = queryset.filter(user_id=data['user_id'])
+        if 'due_date_before' in data:
+            queryset = queryset.filter(due_date__lte=data['due_date_before'])
+        if 'due_date_after' in data:
+            queryset = queryset.filter(due_date__gte=data['due_date_after'])
+        return queryset
+
+
+class BulkDocumentVerificationSerializer(serializers.Serializer):
+    """Selects the documents for a bulk verify/unverify request"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+
+    def validate_ids(self, value):
+        # Keeps the per-id result in request order, one entry per document
+        return list(dict.fromkeys(value))
+
+
+class ExportFilterSerializer(serializers.Serializer):
+    """Validates the filters of a fee, user or document export"""
+    FEE_ONLY = ('is_paid', 'due_date_after', 'due_date_before')
+
+    is_paid = serializers.BooleanField(required=False)
+    due_date_after = serializers.DateField(required=False)
+    due_date_before = serializers.DateField(required=False)
+    role = serializers.ChoiceField(choices=User.Roles.choices, required=False)
+    graduation_year = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if self.context.get('dataset') != 'fees':
+            unsupported = sorted(set(attrs) & set(self.FEE_ONLY))
+            if unsupported:
+                raise serializers.ValidationError({
+                    name: "Only fee exports can be filtered by this field."
+                    for name in unsupported
+                })
+        return attrs
+
+
+class ChoiceListField(serializers.Field):
+    """Comma-separated subset of ``choices``, e.g. ``?document_type=CERTIFICATE,DIPLOMA``"""
+
+    def __init__(self, choices, **kwargs):
+        self.choices = dict(choices)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        values = [value.strip() for value in str(data).split(',') if value.strip()]
+        unknown = sorted(set(values) - set(self.choices))
+        if not values or unknown:
+            raise serializers.ValidationError(
+                f"Choose from: {', '.join(self.choices)}."
+            )
+        return values
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class ListFilterSerializer(serializers.Serializer):
+    """
+    Validates the query-string filters of a list endpoint. Subclasses set
+    ``ORDERING`` (the sortable fields), ``GROUP_BY`` (the fields a grouped
+    count may use) and ``ADMIN_ONLY`` (filters non-admins may not send).
+    """
+    ORDERING = ()
+    GROUP_BY = ()
+    ADMIN_ONLY = ()
+
+    ordering = serializers.CharField(required=False)
+    group_by = serializers.CharField(required=False)
+
+    def validate_ordering(self, value):
+        if value.lstrip('-') not in self.ORDERING:
+            raise serializers.ValidationError(
+                f"Order by one of: {', '.join(self.ORDERING)} (prefix with - to reverse)."
+            )
+        return value
+
+    def validate_group_by(self, value):
+        if value not in self.GROUP_BY:
+            raise serializers.ValidationError(f"Group by one of: {', '.join(self.GROUP_BY)}.")
+        return value
+
+    def validate(self, attrs):
+        request = self.context.get('request')
+        if request is not None and request.user.role != 'ADMIN':
+            forbidden = sorted(set(attrs) & set(self.ADMIN_ONLY))
+            if forbidden:
+                raise serializers.ValidationError({
+                    name: "Only administrators can filter by this field."
+                    for name in forbidden
+                })
+        return attrs
+
+    def filter_queryset(self, queryset):
+        raise NotImplementedError
+
+    def order_queryset(self, queryset):
+        ordering = self.validated_data.get('ordering')
+        if not ordering:
+            return queryset
+        # Ties are broken by id in the same direction, so pages are stable
+        tie_breaker = '-id' if ordering.startswith('-') else 'id'
+        return load_ordering_columns(queryset.order_by(ordering, tie_breaker))
+
+
+class FeeFilterSerializer(ListFilterSerializer):
+    """Filters for ``/api/fees/``"""
+    ORDERING = ('created_at', 'due_date', 'amount')
+    GROUP_BY = ('is_paid',)
+    ADMIN_ONLY = ('user',)
+
+    is_paid = serializers.BooleanField(required=False)
+    due_date_after = serializers.DateField(required=False)
+    due_date_before = serializers.DateField(required=False)
+    user = serializers.IntegerField(required=False)
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'is_paid' in data:
+            queryset = queryset.filter(is_paid=data['is_paid'])
+        if 'due_date_after' in data:
+            queryset = queryset.filter(due_date__gte=data['due_date_after'])
+        if 'due_date_before' in data:
+            queryset = queryset.filter(due_date__lte=data['due_date_before'])
+        if 'user' in data:
+            queryset = queryset.filter(user_id=data['user'])
+        return queryset
+
+
+class DocumentFilterSerializer(ListFilterSerializer):
+    """Filters for ``/api/documents/``"""
+    ORDERING = ('uploaded_at', 'title', 'document_type')
+    GROUP_BY = ('document_type', 'is_verified')
+    ADMIN_ONLY = ('owner',)
+
+    document_type = ChoiceListField(choices=Document.DocumentType.choices, required=False)
+    is_verified = serializers.BooleanField(required=False)
+    uploaded_after = serializers.DateField(required=False)
+    uploaded_before = serializers.DateField(required=False)
+    owner = serializers.IntegerField(required=False)
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'document_type' in data:
+            queryset = queryset.filter(document_type__in=data['document_type'])
+        if 'is_verified' in data:
+            queryset = queryset.filter(is_verified=data['is_verified'])
+        # Whole days in the current time zone, as ranges on the indexed column
+        if 'uploaded_after' in data:
+            queryset = queryset.filter(uploaded_at__gte=_start_of_day(data['uploaded_after']))
+        if 'uploaded_before' in data:
+            queryset = queryset.filter(
+                uploaded_at__lt=_start_of_day(data['uploaded_before'] + timedelta(days=1))
+            )
+        if 'owner' in data:
+            queryset = queryset.filter(owner_id=data['owner'])
+        return queryset
+
+
+class FeeSummaryQuerySerializer(serializers.Serializer):
+    """Validates ``?group_by=`` for the fee summary"""
+    DIMENSIONS = ('role', 'graduation_year', 'due_month')
+
+    group_by = serializers.CharField(required=False)
+
+    def validate_group_by(self, value):
+        dimensions = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = sorted(set(dimensions) - set(self.DIMENSIONS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown dimension(s): {', '.join(unknown)}. "
+                f"Choose from: {', '.join(self.DIMENSIONS)}."
+            )
+        # Keep the canonical order so the grouping is stable
+        return [name for name in self.DIMENSIONS if name in dimensions]
+
+    @property
+    def dimensions(self):
+        return self.validated_data.get('group_by') or list(self.DIMENSIONS)
+
+
+class FeeSummaryRowSerializer(serializers.Serializer):
+    """One bucket of outstanding and collected fee totals"""
+    role = serializers.CharField(required=False, allow_null=True)
+    graduation_year = serializers.IntegerField(required=False, allow_null=True)
+    due_month = serializers.CharField(required=False, allow_null=True)
+    outstanding_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    outstanding_count = serializers.IntegerField()
+    collected_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    collected_count = serializers.IntegerField()
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only the grouped dimensions appear in a row
+        for name in FeeSummaryQuerySerializer.DIMENSIONS:
+            if name not in instance:
+                data.pop(name, None)
+        return data
+
+
+class DocumentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    owner = serializers.PrimaryKeyRelatedField(read_only=True)
     file_size = serializers.IntegerField(read_only=True)
-    verified_by = UserSerializer(read_only=True)
+    verified_by = serializers.PrimaryKeyRelatedField(read_only=True)
     file_url = serializers.SerializerMethodField()
 
+    expandable_fields = {"owner": UserSerializer, "verified_by": UserSerializer}
+    field_sources = {"file_url": ("file",)}
+
     class Meta:
         model = Document
         fields = (
             "id", "title", "document_type", "file", "file_url", 
-            "file_size", "owner", "uploaded_at", "updated_at",
+            "file_size", "sha256", "owner", "uploaded_at", "updated_at",
             "is_verified", "verified_by", "verified_at"
         )
         read_only_fields = (
             "id", "owner", "uploaded_at", "updated_at", 
-            "file_size", "verified_by", "verified_at"
+            "file_size", "sha256", "verified_by", "verified_at"
         )
 
     def get_file_url(self, obj):
@@ -139,4 +479,58 @@ class DocumentSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class UploadSessionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    received_bytes = serializers.IntegerField(read_only=True)
+    is_complete = serializers.BooleanField(read_only=True)
+
+    field_sources = {
+        "received_bytes": ("received",),
+        "is_complete": ("received", "total_size"),
+    }
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            "id", "title", "document_type", "filename", "total_size",
+            "received", "received_bytes", "is_complete",
+            "created_at", "updated_at"
+        )
+        read_only_fields = ("id", "received", "created_at", "updated_at")
+
+    def validate_total_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Uploads must not be empty.")
+        if value > settings.DOCUMENT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Uploads may be at most {settings.DOCUMENT_UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """One sub-request of a batch"""
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'), default='GET'
+    )
+    path = serializers.CharField(max_length=2048)
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/'):
+            raise serializers.ValidationError('Only /api/ paths can be batched.')
+        return value
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """The sub-requests of a ``/api/batch/`` call"""
+    requests = serializers.ListField(child=BatchItemSerializer(), allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'A batch may hold at most {settings.BATCH_MAX_REQUESTS} requests.'
+            )
+        return value
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+BLOB_DIR = "blobs"
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(digest):
+    """Storage name of the blob holding content with this SHA-256 digest"""
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def digest_from_name(name):
+    """The SHA-256 digest encoded in a blob name, or "" for other names"""
+    if name and name.startswith(BLOB_DIR + "/"):
+        return os.path.basename(name)
+    return ""
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one blob per SHA-256 digest.
+
+    Uploads are hashed while they are streamed to a temporary file next to
+    the blobs, then moved to ``blobs/ab/cd/<digest>``. If that blob already
+    exists the new copy is discarded, so re-uploading identical content
+    costs no extra space. Storing a blob takes a reference to it in
+    ``api.models.Blob``; ``release_blob`` deletes it with the last one.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen from the content in _save()
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, "temporary_file_path"):
+            # Large uploads are already on disk: hash in place, then move
+            path = content.temporary_file_path()
+            return self.adopt(path, hash_file(path))
+
+        staging = self.path(os.path.join(BLOB_DIR, "tmp"))
+        os.makedirs(staging, exist_ok=True)
+        sha256 = hashlib.sha256()
+
+        fd, temp_path = tempfile.mkstemp(dir=staging)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    sha256.update(chunk)
+                    out.write(chunk)
+            return self.adopt(temp_path, sha256.hexdigest())
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def adopt(self, path, digest):
+        """
+        Move the file at ``path`` (on the same file system) into the blob
+        for ``digest``, or drop it if that blob already exists. Takes a
+        reference to the blob first, held locked until the caller's
+        transaction ends. Returns the blob's storage name.
+        """
+        from .models import acquire_blob
+
+        name = blob_name(digest)
+        with transaction.atomic():
+            acquire_blob(digest)
+            self._move_into(path, self.path(name))
+        return name
+
+    def _move_into(self, path, full_path):
+        if os.path.exists(full_path):
+            os.remove(path)
+            return
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            # link() refuses to overwrite, so a concurrent upload of the
+            # same content keeps whichever copy landed first
+            os.link(path, full_path)
+            os.remove(path)
+        except FileExistsError:
+            os.remove(path)
+        except OSError:
+            # Hard links unsupported or across devices
+            file_move_safe(path, full_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def link_or_copy(source, target):
+    """Hard-link ``source`` to ``target``, copying where links are unsupported"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def get_document_storage():
+    return ContentAddressedStorage()
@@ -0,0 +1,158 @@
+"""
+Reproducible synthetic datasets for load tests and benchmarks.
+
+``generate_dataset`` bulk-inserts users spread over roles and graduation
+years, with fees and documents for each. The same seed always produces the
+same rows. Dates are anchored to ``EPOCH`` rather than today, so
+overdue/paid ratios do not drift between runs. Documents point at a small
+pool of placeholder blobs in document storage, shared the way
+content-addressed uploads are, so no per-row file is written. The pool
+keeps a reference of its own to each placeholder, so they outlive the
+documents.
+"""
+import random
+from collections import Counter
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Blob, Document, Fee, User, add_fee_summary_delta, apply_fee_summary_deltas,
+    recompute_outstanding_balances, summary_bucket
+)
+from .storage import digest_from_name, get_document_storage
+
+
+EPOCH = datetime(2024, 9, 1).date()
+ROLES = ((User.Roles.STUDENT, 6), (User.Roles.ALUMNI, 4))
+FEE_DESCRIPTIONS = (
+    "Tuition", "Library fine", "Laboratory fee", "Examination fee",
+    "Hostel fee", "Graduation fee", "Transcript fee", "Sports levy",
+)
+DOCUMENT_TITLES = {
+    Document.DocumentType.TRANSCRIPT: "Academic transcript",
+    Document.DocumentType.CERTIFICATE: "Certificate of completion",
+    Document.DocumentType.DIPLOMA: "Diploma",
+    Document.DocumentType.OTHER: "Recommendation letter",
+}
+PLACEHOLDER_FILES = 16
+
+
+def placeholder_blobs(count=PLACEHOLDER_FILES, size=2048):
+    """Store ``count`` distinct placeholder PDFs; returns (name, sha256, size) for each"""
+    storage = get_document_storage()
+    blobs = []
+    for index in range(count):
+        content = b"%%PDF-1.4\n%% synthetic placeholder %d\n" % index
+        content = content.ljust(max(size, len(content)), b" ")
+        name = storage.save(f"placeholder-{index}.pdf", ContentFile(content))
+        blobs.append((name, digest_from_name(name), len(content)))
+    return blobs
+
+
+def _batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def generate_dataset(users, fees_per_user=5, documents_per_user=2, seed=0,
+                     prefix="synthetic", file_bytes=2048, batch_size=1000):
+    """
+    Insert ``users`` users named ``<prefix>-user-NNNNNN`` with
+    ``fees_per_user`` fees and ``documents_per_user`` documents each, in one
+    transaction. Running it again with the same prefix appends further users.
+    Balances and the fee summary are brought up to date before returning
+    the row counts.
+    """
+    rng = random.Random(seed)
+    # Hashed once: every generated user logs in with the prefix as password
+    password = make_password(prefix)
+
+    with transaction.atomic():
+        admin, _ = User.objects.get_or_create(
+            username=f"{prefix}-admin",
+            defaults={"role": User.Roles.ADMIN, "password": password},
+        )
+        start = User.objects.filter(username__startswith=f"{prefix}-user-").count()
+        names = [f"{prefix}-user-{index:06d}" for index in range(start, start + users)]
+
+        created = []
+        for batch in _batches(names, batch_size):
+            rows = []
+            for username in batch:
+                role = rng.choices([role for role, _ in ROLES], [weight for _, weight in ROLES])[0]
+                if role == User.Roles.STUDENT:
+                    year = EPOCH.year + rng.randint(0, 4)
+                else:
+                    year = EPOCH.year - rng.randint(1, 30)
+                rows.append(User(
+                    username=username, password=password, role=role,
+                    email=f"{username}@example.com",
+                    first_name=username.rsplit("-", 1)[-1],
+                    graduation_year=year,
+                    student_id=f"{prefix.upper()}{username.rsplit('-', 1)[-1]}",
+                ))
+            User.objects.bulk_create(rows)
+            # bulk_create does not return ids on every backend
+            created.extend(
+                User.objects.filter(username__in=batch).order_by("username")
+                .values_list("id", "role", "graduation_year")
+            )
+
+        summary = {}
+        fees = []
+        for user_id, role, year in created:
+            for _ in range(fees_per_user):
+                due_date = EPOCH + timedelta(days=rng.randint(-365, 180))
+                is_paid = rng.random() < 0.4
+                amount = Decimal(rng.randrange(1000, 250000)) / 100
+                fees.append(Fee(
+                    user_id=user_id, created_by=admin, amount=amount,
+                    description=rng.choice(FEE_DESCRIPTIONS),
+                    due_date=due_date, is_paid=is_paid,
+                    paid_date=due_date - timedelta(days=rng.randint(0, 30)) if is_paid else None,
+                ))
+                add_fee_summary_delta(summary, summary_bucket(role, year, due_date), amount, is_paid, 1)
+        for batch in _batches(fees, batch_size):
+            Fee.objects.bulk_create(batch)
+
+        blobs = placeholder_blobs(size=file_bytes) if documents_per_user else []
+        documents = []
+        for user_id, _, _ in created:
+            for _ in range(documents_per_user):
+                document_type = rng.choice(list(DOCUMENT_TITLES))
+                name, digest, size = rng.choice(blobs)
+                is_verified = rng.random() < 0.5
+                uploaded_at = timezone.make_aware(datetime.combine(
+                    EPOCH - timedelta(days=rng.randint(0, 720)), time(rng.randint(8, 17))
+                ))
+                documents.append(Document(
+                    owner_id=user_id, title=DOCUMENT_TITLES[document_type],
+                    document_type=document_type, file=name, sha256=digest,
+                    file_size=size, original_filename=f"{document_type.lower()}.pdf",
+                    uploaded_at=uploaded_at, is_verified=is_verified,
+                    verified_by=admin if is_verified else None,
+                    verified_at=uploaded_at + timedelta(days=1) if is_verified else None,
+                ))
+        for batch in _batches(documents, batch_size):
+            Document.objects.bulk_create(batch)
+        # bulk_create() skips Document.save(), which counts blob references
+        for digest, references in Counter(document.sha256 for document in documents).items():
+            Blob.objects.filter(pk=digest).update(refcount=F("refcount") + references)
+
+        ids = [user_id for user_id, _, _ in created]
+        for batch in _batches(ids, batch_size):
+            recompute_outstanding_balances(User.objects.filter(pk__in=batch))
+        apply_fee_summary_deltas(summary)
+
+    return {
+        "users": len(created),
+        "fees": len(fees),
+        "documents": len(documents),
+        "admin": admin.username,
+    }
@@ -1,3 +1,2264 @@
-from django.test import TestCase
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from contextlib import closing
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+
+from django.contrib.admin import site as admin_site
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.core.signals import request_finished
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count, F, Sum
+from django.http import HttpResponse, QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.test import (
+    AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import AuthenticationFailed, ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .admin import BoundedCountPaginator
+from .benchmarks import percentile
+from .models import (
+    Blob, User, Fee, Document, FeeSummary, UploadSession,
+    ledger_balance, ledger_fee_summary, ledger_owes, rebuild_fee_summary
+)
+from .storage import ContentAddressedStorage, blob_name
+from .uploads import finalize_session, purge_expired_sessions
+from .permissions import DebtClearForDownload
+from .authentication import CachedJWTAuthentication, VersionedRefreshToken
+from . import async_views, batch, caching, debt_cache, metrics, replicas, user_cache, views
+from .hashing import HashingPool, PoolOverloaded
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer, orjson
+from .serializers import BulkFeeSettlementSerializer, DocumentSerializer, FeeSerializer
+from .views import FeeViewSet, DocumentViewSet
+
+
+class QueryCountMixin:
+    """
+    Seed ``ROWS`` fees and documents per user and assert that every endpoint
+    runs the same number of queries whatever the row count.
+    Subclasses set ``ROWS``; the expected counts are shared.
+    """
+    ROWS = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        User.objects.bulk_create([
+            User(username=f"user{i}", role="STUDENT", student_id=f"S{i}")
+            for i in range(cls.ROWS)
+        ])
+        Fee.objects.bulk_create([
+            Fee(
+                user=cls.alumni, created_by=cls.admin,
+                description=f"Fee {i}", amount=Decimal("10.00")
+            )
+            for i in range(cls.ROWS)
+        ])
+        Document.objects.bulk_create([
+            Document(
+                owner=cls.alumni, verified_by=cls.admin, title=f"Doc {i}",
+                file=f"documents/doc{i}.pdf", file_size=1
+            )
+            for i in range(cls.ROWS)
+        ])
+        rebuild_fee_summary()
+        cls.fee = Fee.objects.first()
+        cls.document = Document.objects.first()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def assertQueries(self, num, user, path, method="get"):
+        client = self.client_for(user)
+        with self.assertNumQueries(num):
+            response = getattr(client, method)(path)
+        self.assertLess(response.status_code, 300, response.content)
+        return response
+
+    def test_users_list(self):
+        self.assertQueries(2, self.admin, "/api/users/")
+
+    def test_users_retrieve(self):
+        self.assertQueries(1, self.admin, f"/api/users/{self.alumni.pk}/")
+
+    def test_user_fees(self):
+        response = self.assertQueries(2, self.admin, f"/api/users/{self.alumni.pk}/fees/")
+        self.assertEqual(len(response.data), self.ROWS)
+
+    def test_user_documents(self):
+        response = self.assertQueries(2, self.admin, f"/api/users/{self.alumni.pk}/documents/")
+        self.assertEqual(len(response.data), self.ROWS)
+
+    def test_fees_list(self):
+        self.assertQueries(2, self.admin, "/api/fees/")
+        self.assertQueries(2, self.alumni, "/api/fees/")
+
+    def test_fees_retrieve(self):
+        self.assertQueries(1, self.alumni, f"/api/fees/{self.fee.pk}/")
+
+    def test_fees_mark_paid(self):
+        # select, savepoint, lock stored row, update fee, update balance,
+        # update summary, release
+        self.assertQueries(7, self.admin, f"/api/fees/{self.fee.pk}/mark_paid/", "post")
+
+    def test_documents_list(self):
+        self.assertQueries(2, self.admin, "/api/documents/")
+        self.assertQueries(2, self.alumni, "/api/documents/")
+
+    def test_fees_list_cursor(self):
+        # The page alone; its rows are the ETag validator
+        response = self.assertQueries(1, self.admin, "/api/fees/?pagination=cursor")
+        self.assertNotIn("count", response.data)
+
+    def test_documents_retrieve(self):
+        self.assertQueries(1, self.alumni, f"/api/documents/{self.document.pk}/")
+
+    def test_documents_verify(self):
+        self.assertQueries(2, self.admin, f"/api/documents/{self.document.pk}/verify/", "post")
+
+
+class QueryCount10Tests(QueryCountMixin, TestCase):
+    ROWS = 10
+
+
+class QueryCount100Tests(QueryCountMixin, TestCase):
+    ROWS = 100
+
+
+class QueryCount1000Tests(QueryCountMixin, TestCase):
+    ROWS = 1000
+
+
+class BulkSettlementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        cls.student = User.objects.create_user("student", password="x", role="STUDENT")
+        cls.fees = [
+            Fee.objects.create(user=user, description="Tuition", amount=Decimal("25.00"))
+            for user in (cls.alumni, cls.alumni, cls.student)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_mark_paid_by_ids(self):
+        ids = [fee.pk for fee in self.fees[:2]]
+        response = self.client.post("/api/fees/bulk_mark_paid/", {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data["ids"]), sorted(ids))
+        self.alumni.refresh_from_db()
+        self.assertEqual(self.alumni.outstanding_balance, Decimal("0.00"))
+        self.assertFalse(self.alumni.owes_fees)
+        self.assertTrue(Fee.objects.get(pk=ids[0]).paid_date)
+
+    def test_bulk_mark_unpaid_by_filter(self):
+        Fee.objects.filter(user=self.student).update(is_paid=True)
+        response = self.client.post(
+            "/api/fees/bulk_mark_unpaid/", {"user_id": self.student.pk}, format="json"
+        )
+        self.assertEqual(response.data["updated"], 1)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.outstanding_balance, Decimal("25.00"))
+        self.assertTrue(self.student.owes_fees)
+
+    def test_bulk_filter_selection_is_capped(self):
+        with mock.patch.object(BulkFeeSettlementSerializer, "MAX_FEES", 1):
+            response = self.client.post(
+                "/api/fees/bulk_mark_paid/", {"user_id": self.alumni.pk}, format="json"
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Fee.objects.filter(is_paid=True).exists())
+
+        response = self.client.post(
+            "/api/fees/bulk_mark_paid/", {"user_id": self.alumni.pk}, format="json"
+        )
+        self.assertEqual(response.data["updated"], 2)
+
+    def test_bulk_requires_selection(self):
+        response = self.client.post("/api/fees/bulk_mark_paid/", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_is_admin_only(self):
+        self.client.force_authenticate(self.alumni)
+        response = self.client.post(
+            "/api/fees/bulk_mark_paid/", {"ids": [self.fees[0].pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class DocumentVerificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        start = timezone.make_aware(timezone.datetime(2024, 3, 1, 12))
+        Document.objects.bulk_create([
+            Document(owner=cls.alumni, title=f"Doc {index}", file=f"documents/{index}.pdf",
+                     uploaded_at=start + timedelta(days=index % 3), is_verified=index == 4)
+            for index in range(6)
+        ])
+        cls.documents = list(Document.objects.order_by("id"))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_queue_is_oldest_first_by_keyset(self):
+        seen = []
+        url = "/api/documents/verification_queue/?page_size=2&fields=id,title"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen.extend(response.data["results"])
+            url = response.data["next"]
+        expected = sorted(
+            (doc for doc in self.documents if not doc.is_verified),
+            key=lambda doc: (doc.uploaded_at, doc.pk)
+        )
+        self.assertEqual([row["id"] for row in seen], [doc.pk for doc in expected])
+        self.assertEqual(set(seen[0]), {"id", "title"})
+
+    def test_bulk_verify_in_one_update(self):
+        ids = [doc.pk for doc in self.documents[3:]] + [999999]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/documents/bulk_verify/", {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            [row["status"] for row in response.data["results"]],
+            ["verified", "unchanged", "verified", "not_found"]
+        )
+        self.assertEqual(
+            sum(query["sql"].startswith("UPDATE") for query in queries.captured_queries), 1
+        )
+        doc = Document.objects.get(pk=ids[0])
+        self.assertEqual(doc.verified_by, self.admin)
+        self.assertIsNotNone(doc.verified_at)
+
+    def test_bulk_unverify(self):
+        verified = self.documents[4]
+        response = self.client.post(
+            "/api/documents/bulk_unverify/", {"ids": [verified.pk, self.documents[0].pk]}, format="json"
+        )
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["results"][0], {"id": verified.pk, "status": "unverified"})
+        verified.refresh_from_db()
+        self.assertFalse(verified.is_verified)
+        self.assertIsNone(verified.verified_by)
+
+    def test_bulk_verify_validation_and_permissions(self):
+        response = self.client.post("/api/documents/bulk_verify/", {"ids": []}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.alumni)
+        response = self.client.post(
+            "/api/documents/bulk_verify/", {"ids": [self.documents[0].pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get("/api/documents/verification_queue/")
+        self.assertEqual(response.status_code, 403)
+
+
+class BalanceMaintenanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        cls.student = User.objects.create_user("student", password="x", role="STUDENT")
+
+    def setUp(self):
+        self.fee = Fee.objects.create(user=self.alumni, description="Tuition", amount=Decimal("5.00"))
+
+    def assertBalancesMatchLedger(self):
+        users = User.objects.annotate(ledger=ledger_balance(), owes=ledger_owes())
+        for user in users:
+            self.assertEqual(user.outstanding_balance, user.ledger, user.username)
+            self.assertEqual(user.owes_fees, user.owes, user.username)
+        self.assertEqual(
+            {(row.role, row.graduation_year, row.due_month): row.outstanding_amount
+             for row in FeeSummary.objects.all() if row.outstanding_count},
+            {(row.role, row.graduation_year, row.due_month): row.outstanding_amount
+             for row in ledger_fee_summary() if row.outstanding_count},
+        )
+
+    def test_create_and_update(self):
+        self.alumni.refresh_from_db()
+        self.assertEqual(self.alumni.outstanding_balance, Decimal("5.00"))
+        self.assertTrue(self.alumni.owes_fees)
+        self.fee.amount = Decimal("7.50")
+        self.fee.save()
+        self.assertBalancesMatchLedger()
+
+    def test_stale_instances_of_one_fee(self):
+        # Two copies loaded before either saves, as with a double-clicked mark_paid
+        first, second = Fee.objects.get(pk=self.fee.pk), Fee.objects.get(pk=self.fee.pk)
+        first.is_paid = second.is_paid = True
+        first.save()
+        second.save()
+        self.alumni.refresh_from_db()
+        self.assertEqual(self.alumni.outstanding_balance, Decimal("0.00"))
+        self.assertFalse(self.alumni.owes_fees)
+        self.assertBalancesMatchLedger()
+
+        second.delete()
+        self.assertBalancesMatchLedger()
+
+    def test_reassignment(self):
+        self.fee.user = self.student
+        self.fee.save()
+        self.alumni.refresh_from_db()
+        self.student.refresh_from_db()
+        self.assertEqual(self.alumni.outstanding_balance, Decimal("0.00"))
+        self.assertEqual(self.student.outstanding_balance, Decimal("5.00"))
+        self.assertBalancesMatchLedger()
+
+    def test_delete(self):
+        stale = Fee.objects.get(pk=self.fee.pk)
+        self.fee.is_paid = True
+        self.fee.save()
+        Fee.objects.create(user=self.alumni, description="Library", amount=Decimal("2.00"))
+        # The stale copy still thinks the fee is unpaid
+        stale.delete()
+        self.alumni.refresh_from_db()
+        self.assertEqual(self.alumni.outstanding_balance, Decimal("2.00"))
+        self.assertBalancesMatchLedger()
+
+    def test_reconcile_balances(self):
+        User.objects.filter(pk=self.alumni.pk).update(
+            outstanding_balance=Decimal("99.00"), owes_fees=False
+        )
+        out = io.StringIO()
+        call_command("reconcile_balances", "--check", stdout=out)
+        self.assertIn("1 user(s) out of sync", out.getvalue())
+        self.alumni.refresh_from_db()
+        self.assertEqual(self.alumni.outstanding_balance, Decimal("99.00"))
+
+        call_command("reconcile_balances", stdout=out)
+        self.assertIn("Repaired 1 user(s)", out.getvalue())
+        self.assertBalancesMatchLedger()
+
+
+class FeeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.student = User.objects.create_user(
+            "student", password="x", role="STUDENT", student_id="S1"
+        )
+
+    def test_import_csv(self):
+        csv_file = SimpleUploadedFile("fees.csv", (
+            b"student_id,description,amount,due_date\n"
+            b"S1,Tuition,100.00,2025-01-31\n"
+            b"S1,Library,5.50,\n"
+            b"S2,Tuition,100.00,2025-01-31\n"
+            b"S1,,abc,31/01/2025\n"
+        ), content_type="text/csv")
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post("/api/fees/import_csv/", {"file": csv_file})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 4])
+        self.assertEqual(
+            set(response.data["errors"][1]["errors"]), {"description", "amount", "due_date"}
+        )
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.outstanding_balance, Decimal("105.50"))
+        self.assertTrue(self.student.owes_fees)
+        self.assertEqual(Fee.objects.filter(created_by=self.admin).count(), 2)
+
+    def test_import_malformed_csv(self):
+        csv_file = SimpleUploadedFile("fees.csv", (
+            b"student_id,description,amount,due_date\n"
+            b"S1,Tuition,100.00,2025-01-31\n"
+            b"S1," + b"x" * (csv.field_size_limit() + 1) + b",5.00,\n"
+        ), content_type="text/csv")
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post("/api/fees/import_csv/", {"file": csv_file})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Row 2", response.data["file"])
+        self.assertFalse(Fee.objects.exists())
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        created_at = timezone.now()
+        # Equal timestamps force the id tie-breaker to keep pages stable
+        Fee.objects.bulk_create([
+            Fee(user=cls.admin, description=f"Fee {i}", amount=Decimal("1.00"),
+                created_at=created_at)
+            for i in range(45)
+        ])
+
+    def test_cursor_pages_cover_every_fee_once(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        seen = []
+        url = "/api/fees/?pagination=cursor"
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(fee["id"] for fee in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, sorted(Fee.objects.values_list("id", flat=True), reverse=True))
+
+    def test_page_number_pagination_is_default(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get("/api/fees/")
+        self.assertEqual(response.data["count"], 45)
+
+
+@skipUnless(connection.vendor == "sqlite", "query plans are checked on SQLite")
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the ORM queries behind each endpoint and assert they are served
+    by an index rather than a full scan or a temporary sort.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+
+    def view_queryset(self, viewset, user, query=""):
+        request = SimpleNamespace(user=user, method="GET", query_params=QueryDict(query))
+        view = viewset(request=request, action="list")
+        return view.filter_queryset(view.get_queryset())
+
+    def assertUsesIndex(self, queryset, index_name=r"\w+"):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"USING (COVERING )?INDEX {index_name}\b", plan)
+        self.assertNotRegex(plan, r"(?m)SCAN \w+$", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def count_plan(self, queryset):
+        """EXPLAIN QUERY PLAN of the COUNT(*) page-number pagination runs"""
+        with CaptureQueriesContext(connection) as queries:
+            queryset.count()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + queries.captured_queries[-1]["sql"])
+            return "\n".join(row[-1] for row in cursor.fetchall())
+
+    def test_fee_list_for_admin(self):
+        queryset = self.view_queryset(FeeViewSet, self.admin)
+        self.assertUsesIndex(queryset[:20], "fee_created_idx")
+
+    def test_list_counts_read_an_index(self):
+        # The page count is the only query a list runs besides the page
+        for viewset in (FeeViewSet, DocumentViewSet):
+            for user in (self.alumni, self.admin):
+                plan = self.count_plan(self.view_queryset(viewset, user))
+                self.assertRegex(plan, r"USING (COVERING )?INDEX", plan)
+                self.assertNotRegex(plan, r"(?m)SCAN \w+$", plan)
+
+    def test_fee_list_cursor_page(self):
+        queryset = self.view_queryset(FeeViewSet, self.admin)
+        page = queryset.filter(created_at__lt=timezone.now()).order_by("-created_at", "-id")
+        self.assertUsesIndex(page[:20], "fee_created_idx")
+
+    def test_fee_list_for_owner(self):
+        queryset = self.view_queryset(FeeViewSet, self.alumni)
+        self.assertUsesIndex(queryset[:20], "fee_user_created_idx")
+
+    def test_user_fees_action(self):
+        self.assertUsesIndex(self.alumni.fees.all(), "fee_user_created_idx")
+
+    # SQLite spells is_paid=False as NOT is_paid, which it cannot seek, so
+    # these settle for any index; MySQL and PostgreSQL use the composites
+
+    def test_outstanding_debt(self):
+        unpaid = self.alumni.fees.filter(is_paid=False).order_by()
+        self.assertUsesIndex(unpaid)
+        self.assertUsesIndex(unpaid.values("user").annotate(total=Sum("amount")))
+
+    def test_balance_recompute(self):
+        queryset = User.objects.annotate(balance=ledger_balance(), owes=ledger_owes())
+        plan = queryset.explain()
+        self.assertEqual(plan.count("USING COVERING INDEX fee_user_paid_amount_idx"), 2, plan)
+
+    def test_overdue_scan(self):
+        overdue = Fee.objects.filter(
+            is_paid=False, due_date__lt=timezone.now().date()
+        ).order_by("due_date")
+        self.assertUsesIndex(overdue)
+
+    def test_document_list_for_admin(self):
+        queryset = self.view_queryset(DocumentViewSet, self.admin)
+        self.assertUsesIndex(queryset[:20], "doc_uploaded_idx")
+
+    def test_document_list_for_owner(self):
+        queryset = self.view_queryset(DocumentViewSet, self.alumni)
+        self.assertUsesIndex(queryset[:20], "doc_owner_uploaded_idx")
+
+    def test_verification_queue(self):
+        queue = Document.objects.filter(is_verified=False).order_by("uploaded_at", "id")
+        self.assertUsesIndex(queue[:20])
+
+    def test_document_type_filter_for_owner(self):
+        queryset = self.view_queryset(DocumentViewSet, self.alumni, "document_type=TRANSCRIPT")
+        self.assertUsesIndex(queryset[:20], "doc_owner_type_idx")
+        self.assertUsesIndex(
+            queryset.order_by("document_type").values("document_type").annotate(n=Count("pk")),
+            "doc_owner_type_idx"
+        )
+
+    def test_document_type_filter_for_admin(self):
+        queryset = self.view_queryset(DocumentViewSet, self.admin, "document_type=DIPLOMA")
+        self.assertUsesIndex(queryset[:20], "doc_type_uploaded_idx")
+
+    def test_fee_status_filter_for_owner(self):
+        # A user's fees are few; the per-user index narrows them enough
+        queryset = self.view_queryset(FeeViewSet, self.alumni, "is_paid=true")
+        self.assertUsesIndex(queryset[:20], "fee_user_created_idx")
+
+    def test_fee_due_date_range_for_admin(self):
+        queryset = self.view_queryset(
+            FeeViewSet, self.admin, "due_date_after=2024-01-01&due_date_before=2024-12-31&ordering=due_date"
+        )
+        self.assertUsesIndex(queryset[:20], "fee_due_idx")
+
+
+class DocumentDownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.document = Document.objects.create(
+            owner=self.alumni, title="Transcript",
+            file=SimpleUploadedFile("transcript.pdf", b"%PDF-1.4 transcript")
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.alumni)
+        self.url = f"/api/documents/{self.document.pk}/download/"
+
+    def test_django_backend_streams_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 transcript")
+
+    @override_settings(DOCUMENT_DOWNLOAD_BACKEND="nginx", DOCUMENT_DOWNLOAD_ACCEL_PREFIX="/protected/")
+    def test_nginx_backend_offloads_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{self.document.file.name}")
+        self.assertEqual(response.content, b"")
+
+    @override_settings(DOCUMENT_DOWNLOAD_BACKEND="apache")
+    def test_apache_backend_offloads_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Sendfile"], self.document.file.path)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=9-18")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 9-18/19")
+        self.assertEqual(b"".join(response.streaming_content), b"transcript")
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-6")
+        self.assertEqual(b"".join(response.streaming_content), b"script")
+
+    def test_multipart_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-3,9-12")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges"))
+        body = b"".join(response.streaming_content)
+        self.assertEqual(len(body), int(response["Content-Length"]))
+        self.assertIn(b"Content-Range: bytes 0-3/19\r\n\r\n%PDF\r\n", body)
+        self.assertIn(b"Content-Range: bytes 9-12/19\r\n\r\ntran\r\n", body)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */19")
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since_returns_not_modified(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_duplicate_upload_shares_blob(self):
+        duplicate = Document.objects.create(
+            owner=self.alumni, title="Copy",
+            file=SimpleUploadedFile("copy.pdf", b"%PDF-1.4 transcript")
+        )
+        self.assertEqual(duplicate.file.name, self.document.file.name)
+        self.assertEqual(duplicate.sha256, self.document.sha256)
+
+        response = self.client.get(f"/api/documents/{duplicate.pk}/download/")
+        self.assertEqual(response["ETag"], f'"{duplicate.sha256}"')
+        self.assertIn('filename="copy.pdf"', response["Content-Disposition"])
+        response.close()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            duplicate.delete()
+        self.assertTrue(os.path.exists(self.document.file.path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document.delete()
+        self.assertFalse(os.path.exists(duplicate.file.path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_blob_refcount(self):
+        def refcounts():
+            return dict(Blob.objects.values_list("digest", "refcount"))
+
+        original = self.document.sha256
+        copy = Document.objects.create(owner=self.alumni, title="Copy", file=self.document.file.name)
+        self.assertEqual(refcounts(), {original: 2})
+
+        stale = Document.objects.get(pk=copy.pk)
+        copy.file = SimpleUploadedFile("second.pdf", b"%PDF-1.4 second")
+        copy.save()
+        second = copy.sha256
+        self.assertEqual(refcounts(), {original: 1, second: 1})
+        # A stale instance releases the blob the row refers to now
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.file = SimpleUploadedFile("third.pdf", b"%PDF-1.4 third")
+            stale.save()
+        self.assertEqual(refcounts(), {original: 1, stale.sha256: 1})
+
+        # Uploading the same content again keeps a single reference
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document.file = SimpleUploadedFile("transcript.pdf", b"%PDF-1.4 transcript")
+            self.document.save()
+        self.assertEqual(refcounts()[original], 1)
+        self.assertTrue(os.path.exists(self.document.file.path))
+
+    def test_upload_during_release_keeps_blob(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.document.delete()
+        move_into = ContentAddressedStorage._move_into
+
+        def release_meanwhile(storage, path, full_path):
+            # The delete commits after an identical upload reused the blob
+            # but before its document row exists
+            move_into(storage, path, full_path)
+            for callback in callbacks:
+                callback()
+
+        with mock.patch.object(ContentAddressedStorage, "_move_into", release_meanwhile):
+            duplicate = Document.objects.create(
+                owner=self.alumni, title="Copy",
+                file=SimpleUploadedFile("copy.pdf", b"%PDF-1.4 transcript")
+            )
+        self.assertTrue(os.path.exists(duplicate.file.path))
+        self.assertEqual(Blob.objects.get(pk=duplicate.sha256).refcount, 1)
+
+    def test_failed_save_removes_new_blob(self):
+        document = Document(
+            owner=self.alumni, title="New",
+            file=SimpleUploadedFile("new.pdf", b"%PDF-1.4 new content")
+        )
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(Document, "save_base", side_effect=DatabaseError("boom")), \
+                self.assertRaises(DatabaseError):
+            document.save()
+        self.assertFalse(os.path.exists(document.file.path))
+        self.assertFalse(Blob.objects.filter(pk=document.sha256).exists())
+
+        # A blob other rows still use is kept
+        duplicate = Document(
+            owner=self.alumni, title="Copy",
+            file=SimpleUploadedFile("copy.pdf", b"%PDF-1.4 transcript")
+        )
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(Document, "save_base", side_effect=DatabaseError("boom")), \
+                self.assertRaises(DatabaseError):
+            duplicate.save()
+        self.assertTrue(os.path.exists(self.document.file.path))
+        self.assertEqual(Blob.objects.get(pk=self.document.sha256).refcount, 1)
+
+    def test_outstanding_debt_blocks_download(self):
+        Fee.objects.create(user=self.alumni, description="Tuition", amount=Decimal("10.00"))
+        self.alumni.refresh_from_db()
+        self.client.force_authenticate(self.alumni)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ConvertDocumentStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.path = os.path.join(media_root.name, "documents", "legacy.pdf")
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "wb") as fh:
+            fh.write(b"%PDF-1.4 legacy")
+        Document.objects.bulk_create([
+            Document(owner=self.alumni, title="Legacy", file="documents/legacy.pdf")
+        ])
+        self.digest = hashlib.sha256(b"%PDF-1.4 legacy").hexdigest()
+
+    def convert(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("convert_document_storage", stdout=io.StringIO())
+
+    def test_converts_to_blob(self):
+        self.convert()
+        document = Document.objects.get()
+        self.assertEqual((document.file.name, document.sha256), (blob_name(self.digest), self.digest))
+        self.assertTrue(os.path.exists(document.file.path))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(Blob.objects.get(pk=self.digest).refcount, 1)
+
+    def test_failure_leaves_document_as_it_was(self):
+        adopt = ContentAddressedStorage.adopt
+
+        def adopt_then_fail(storage, path, digest):
+            adopt(storage, path, digest)
+            raise DatabaseError("boom")
+
+        with mock.patch.object(ContentAddressedStorage, "adopt", adopt_then_fail), \
+                self.assertRaises(DatabaseError):
+            self.convert()
+        document = Document.objects.get()
+        self.assertEqual((document.file.name, document.sha256), ("documents/legacy.pdf", ""))
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(document.file.storage.path(blob_name(self.digest))))
+        self.assertFalse(Blob.objects.exists())
+
+
+class ChunkedUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alumni)
+
+    def put_chunk(self, url, data, start, total):
+        return self.client.generic(
+            "PUT", url, data, content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(data) - 1}/{total}"
+        )
+
+    def test_chunked_upload_out_of_order(self):
+        content = b"0123456789" * 10
+        response = self.client.post("/api/uploads/", {
+            "title": "Scan", "document_type": "DIPLOMA",
+            "filename": "scan.pdf", "total_size": len(content)
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/uploads/{response.data['id']}/"
+
+        self.put_chunk(url, content[60:], 60, len(content))
+        self.assertEqual(self.client.post(url + "finalize/").status_code, 409)
+        self.put_chunk(url, content[:30], 0, len(content))
+        self.assertEqual(self.client.get(url).data["received"], [[0, 30], [60, 100]])
+        response = self.put_chunk(url, content[30:60], 30, len(content))
+        self.assertTrue(response.data["is_complete"])
+
+        response = self.client.post(url + "finalize/")
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(pk=response.data["id"])
+        self.assertEqual(document.file.read(), content)
+        document.file.close()
+        self.assertEqual(document.original_filename, "scan.pdf")
+        self.assertEqual(Blob.objects.get(pk=document.sha256).refcount, 1)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def complete_upload(self, content):
+        response = self.client.post("/api/uploads/", {
+            "title": "Scan", "filename": "scan.pdf", "total_size": len(content)
+        }, format="json")
+        url = f"/api/uploads/{response.data['id']}/"
+        self.put_chunk(url, content, 0, len(content))
+        return url, UploadSession.objects.get(pk=response.data["id"])
+
+    def test_finalize_twice(self):
+        url, session = self.complete_upload(b"0123456789")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url + "finalize/").status_code, 201)
+        self.assertEqual(self.client.post(url + "finalize/").status_code, 404)
+        # A finalize that loaded the session before the first one committed
+        with self.assertRaises(UploadSession.DoesNotExist):
+            finalize_session(session)
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_failed_finalize_can_be_retried(self):
+        url, session = self.complete_upload(b"0123456789")
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(UploadSession, "delete", side_effect=DatabaseError("lost")):
+            with self.assertRaises(DatabaseError):
+                finalize_session(session)
+        self.assertFalse(Document.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+        digest = hashlib.sha256(b"0123456789").hexdigest()
+        self.assertFalse(ContentAddressedStorage().exists(blob_name(digest)))
+        self.assertTrue(os.path.exists(session.part_path))
+        self.assertEqual(os.listdir(os.path.dirname(session.part_path)), [os.path.basename(session.part_path)])
+
+        response = self.client.post(url + "finalize/")
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(pk=response.data["id"])
+        self.assertEqual(document.file.read(), b"0123456789")
+        document.file.close()
+
+    @override_settings(DOCUMENT_UPLOAD_MAX_SESSIONS=2, DOCUMENT_UPLOAD_MAX_RESERVED_SIZE=100)
+    def test_open_sessions_are_capped(self):
+        def create(total_size):
+            return self.client.post("/api/uploads/", {
+                "title": "Scan", "filename": "scan.pdf", "total_size": total_size
+            }, format="json")
+
+        self.assertEqual(create(60).status_code, 201)
+        self.assertEqual(create(50).status_code, 409)
+        self.assertEqual(create(40).status_code, 201)
+        response = create(1)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("At most 2 uploads", response.data["detail"])
+        self.assertEqual(UploadSession.objects.count(), 2)
+
+    def test_chunk_after_finalize_conflicts(self):
+        url, session = self.complete_upload(b"0123456789")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url + "finalize/").status_code, 201)
+        self.assertFalse(os.path.exists(session.part_path))
+        # A chunk PUT that loaded the session before the finalize committed
+        with mock.patch.object(views.UploadSessionViewSet, "get_object", return_value=session):
+            response = self.put_chunk(url, b"01234", 0, 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(os.path.exists(session.part_path))
+        self.assertEqual(Document.objects.get().file_size, 10)
+
+    def test_rejects_range_outside_upload(self):
+        session = UploadSession.objects.create(
+            owner=self.alumni, title="Scan", filename="scan.pdf", total_size=10
+        )
+        response = self.put_chunk(f"/api/uploads/{session.pk}/", b"x" * 5, 8, 10)
+        self.assertEqual(response.status_code, 400)
+
+    def test_purge_expired_sessions(self):
+        session = UploadSession.objects.create(
+            owner=self.alumni, title="Scan", filename="scan.pdf", total_size=10
+        )
+        UploadSession.objects.filter(pk=session.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(purge_expired_sessions(timedelta(days=1)), 1)
+        self.assertFalse(UploadSession.objects.exists())
+
+
+class DebtStatusCacheTests(TestCase):
+    """The cached debt status must match the ledger after every fee write path"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user(
+            "alumni", password="x", role="ALUMNI", student_id="A1"
+        )
+
+    def setUp(self):
+        debt_cache.local_cache.clear()
+        caches["default"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertFresh(self, expected):
+        # Warm both cache layers, then check they agree with the ledger
+        self.assertEqual(debt_cache.owes_fees(self.alumni.pk), expected)
+        self.assertEqual(self.alumni.has_outstanding_debt(), expected)
+
+    def create_fee(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Fee.objects.create(
+                user=self.alumni, description="Tuition", amount=Decimal("10.00"), **kwargs
+            )
+
+    def test_warm_lookup_runs_no_queries(self):
+        self.assertFresh(False)
+        with self.assertNumQueries(0):
+            self.assertFalse(debt_cache.owes_fees(self.alumni.pk))
+
+    def test_falls_back_to_shared_cache(self):
+        self.assertFresh(False)
+        debt_cache.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertFalse(debt_cache.owes_fees(self.alumni.pk))
+
+    def test_fee_create(self):
+        self.assertFresh(False)
+        self.create_fee()
+        self.assertFresh(True)
+
+    def test_fee_save(self):
+        fee = self.create_fee()
+        self.assertFresh(True)
+        fee.is_paid = True
+        fee.save()
+        self.assertFresh(False)
+
+    def test_fee_reassigned(self):
+        fee = self.create_fee()
+        self.assertFresh(True)
+        fee.user = self.admin
+        fee.save()
+        self.assertFresh(False)
+
+    def test_fee_delete(self):
+        fee = self.create_fee()
+        self.assertFresh(True)
+        fee.delete()
+        self.assertFresh(False)
+
+    def test_queryset_delete(self):
+        self.create_fee()
+        self.assertFresh(True)
+        Fee.objects.filter(user=self.alumni).delete()
+        self.assertFresh(False)
+
+    def test_mark_paid_and_unpaid(self):
+        fee = self.create_fee()
+        self.assertFresh(True)
+        self.client.post(f"/api/fees/{fee.pk}/mark_paid/")
+        self.assertFresh(False)
+        self.client.post(f"/api/fees/{fee.pk}/mark_unpaid/")
+        self.assertFresh(True)
+
+    def test_bulk_settlement(self):
+        fee = self.create_fee()
+        self.assertFresh(True)
+        self.client.post("/api/fees/bulk_mark_paid/", {"ids": [fee.pk]}, format="json")
+        self.assertFresh(False)
+        self.client.post("/api/fees/bulk_mark_unpaid/", {"ids": [fee.pk]}, format="json")
+        self.assertFresh(True)
+
+    def test_csv_import(self):
+        self.assertFresh(False)
+        csv_file = SimpleUploadedFile(
+            "fees.csv", b"student_id,description,amount,due_date\nA1,Tuition,10.00,\n"
+        )
+        self.client.post("/api/fees/import_csv/", {"file": csv_file})
+        self.assertFresh(True)
+
+    def test_reconcile(self):
+        self.create_fee()
+        self.assertFresh(True)
+        # A write that bypasses the model layer, repaired by reconciliation
+        Fee.objects.filter(user=self.alumni).update(is_paid=True)
+        call_command("reconcile_balances", stdout=io.StringIO())
+        self.assertFresh(False)
+
+    def test_download_permission_uses_cache(self):
+        self.assertFresh(False)
+        self.alumni.refresh_from_db()
+        request = SimpleNamespace(user=self.alumni)
+        document = Document(owner=self.alumni)
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                DebtClearForDownload().has_object_permission(request, None, document)
+            )
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+
+    def setUp(self):
+        caches["default"].clear()
+        token = VersionedRefreshToken.for_user(self.alumni).access_token
+        self.token = token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def authenticate(self):
+        request = Request(RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {self.token}"))
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_token_carries_version(self):
+        self.assertEqual(self.token["ver"], self.alumni.version_stamp)
+
+    def test_warm_cache_skips_user_query(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().pk, self.alumni.pk)
+
+    def test_user_save_invalidates(self):
+        self.authenticate()
+        response = self.client.patch("/api/auth/profile/update/", {"first_name": "Amina"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.authenticate().first_name, "Amina")
+
+    def test_fee_change_invalidates(self):
+        self.assertFalse(self.authenticate().owes_fees)
+        with self.captureOnCommitCallbacks(execute=True):
+            Fee.objects.create(user=self.alumni, description="Tuition", amount=Decimal("10.00"))
+        self.assertTrue(self.authenticate().owes_fees)
+
+    def test_token_newer_than_cache_reads_database(self):
+        self.authenticate()
+        stale = self.authenticate()
+        stale.updated_at = stale.updated_at - timedelta(seconds=1)
+        user_cache.put(stale)
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_cache_holds_only_auth_fields(self):
+        self.authenticate()
+        self.assertEqual(set(user_cache.get(self.alumni.pk)), set(user_cache.FIELDS))
+        user = self.authenticate()
+        self.assertEqual(user.get_deferred_fields(), {
+            field.attname for field in User._meta.concrete_fields
+        } - set(user_cache.FIELDS))
+        self.assertEqual((user.role, user.is_active, user.owes_fees), ("ALUMNI", True, False))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, "alumni")
+
+    @mock.patch.object(jwt_settings, "CHECK_REVOKE_TOKEN", True, create=True)
+    def test_revoked_token_is_refused_from_cache(self):
+        self.token = VersionedRefreshToken.for_user(self.alumni).access_token
+        self.authenticate()
+        self.assertNotIn(self.alumni.password, user_cache.get(self.alumni.pk).values())
+        self.token["hash_password"] = "stale"
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+class SharedCacheCheckTests(TestCase):
+    LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    SHARED = {"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "api_cache"}}
+
+    def test_process_local_cache_is_flagged(self):
+        with override_settings(CACHES=self.LOCAL):
+            warnings = caching.check_shared_caches(None)
+        self.assertEqual([warning.id for warning in warnings], ["api.W001", "api.W001"])
+
+    def test_shared_cache_passes(self):
+        with override_settings(CACHES=self.SHARED):
+            self.assertEqual(caching.check_shared_caches(None), [])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        cls.fee = Fee.objects.create(
+            user=cls.alumni, description="Tuition", amount=Decimal("10.00"), created_by=cls.admin
+        )
+
+    def setUp(self):
+        caches["default"].clear()
+        token = VersionedRefreshToken.for_user(self.alumni).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_profile_not_modified_until_balance_changes(self):
+        first = self.client.get("/api/auth/profile/")
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidate("/api/auth/profile/", first).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Fee.objects.create(user=self.alumni, description="Library", amount=Decimal("5.00"))
+        changed = self.revalidate("/api/auth/profile/", first)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["total_debt"], "15.00")
+
+    def test_list_revalidates_from_the_page(self):
+        self.client.get("/api/auth/profile/")  # warm the user cache
+        first = self.client.get("/api/fees/")
+        # The count and the page, nothing else
+        with self.assertNumQueries(2):
+            response = self.revalidate("/api/fees/", first)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+    def test_list_changes_on_update_and_delete(self):
+        first = self.client.get("/api/fees/")
+        Fee.objects.filter(pk=self.fee.pk).update(
+            description="Tuition (revised)", updated_at=timezone.now()
+        )
+        second = self.revalidate("/api/fees/", first)
+        self.assertEqual(second.status_code, 200)
+
+        Fee.objects.create(user=self.alumni, description="Lab", amount=Decimal("1.00"))
+        third = self.revalidate("/api/fees/", second)
+        self.assertEqual(third.status_code, 200)
+        Fee.objects.filter(description="Lab").delete()
+        self.assertEqual(self.revalidate("/api/fees/", third).status_code, 200)
+
+    def test_cursor_page_etag(self):
+        url = "/api/fees/?pagination=cursor"
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        Fee.objects.create(user=self.alumni, description="Lab", amount=Decimal("1.00"))
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_related_user_change_moves_list_etag(self):
+        first = self.client.get("/api/fees/?expand=created_by")
+        self.admin.first_name = "Renamed"
+        self.admin.save()
+        response = self.revalidate("/api/fees/?expand=created_by", first)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["created_by"]["first_name"], "Renamed")
+
+    def test_etag_is_per_user_and_url(self):
+        first = self.client.get("/api/fees/")
+        self.assertNotEqual(self.client.get("/api/fees/?page=1")["ETag"], first["ETag"])
+        admin_token = VersionedRefreshToken.for_user(self.admin).access_token
+        admin = APIClient(HTTP_AUTHORIZATION=f"Bearer {admin_token}")
+        self.assertEqual(
+            admin.get("/api/fees/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200
+        )
+
+    def test_retrieve_not_modified(self):
+        url = f"/api/users/{self.alumni.pk}/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+
+    @override_settings(CONDITIONAL_RESPONSE_CACHE={"ENABLED": True})
+    def test_response_cache_skips_serialization(self):
+        self.client.get("/api/auth/profile/")
+        first = self.client.get("/api/fees/")
+        with mock.patch("api.serializers.FeeSerializer.to_representation") as serialize:
+            cached = self.client.get("/api/fees/")
+        serialize.assert_not_called()
+        self.assertEqual(cached.json(), first.json())
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        cls.fee = Fee.objects.create(
+            user=cls.alumni, description="Tuition", amount=Decimal("10.00"), created_by=cls.admin
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_related_users_default_to_ids(self):
+        row = self.client.get("/api/fees/").json()["results"][0]
+        self.assertEqual(row["user"], self.alumni.pk)
+        self.assertEqual(row["created_by"], self.admin.pk)
+
+    def test_expand_embeds_full_user(self):
+        row = self.client.get("/api/fees/?expand=user").json()["results"][0]
+        self.assertEqual(row["user"]["username"], "alumni")
+        self.assertEqual(row["user"]["total_debt"], "10.00")
+        self.assertEqual(row["created_by"], self.admin.pk)
+
+    def test_fields_limits_output(self):
+        response = self.client.get("/api/fees/?fields=id,amount,user&expand=user")
+        self.assertEqual(set(response.json()["results"][0]), {"id", "amount", "user"})
+        self.assertEqual(response.json()["results"][0]["user"]["id"], self.alumni.pk)
+
+    def test_queryset_loads_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/fees/?fields=id,amount")
+        page_sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("api_user", page_sql)
+        self.assertNotIn("description", page_sql)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/fees/?expand=created_by")
+        page_sql = queries.captured_queries[-1]["sql"]
+        self.assertIn('"created_by_id" = "api_user"."id"', page_sql)
+        self.assertNotIn("password", page_sql)
+
+    def test_sparse_cursor_pages_load_ordering_columns(self):
+        Fee.objects.bulk_create([
+            Fee(user=self.alumni, description="Fee", amount=Decimal(index + 1))
+            for index in range(20)
+        ])
+        for query in ("fields=id", "fields=id&ordering=amount", "fields=id&ordering=-created_at"):
+            url = f"/api/fees/?pagination=cursor&page_size=5&{query}"
+            # The page and nothing per row, on the first page and past it
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(set(response.data["results"][0]), {"id"})
+            with self.assertNumQueries(1):
+                self.client.get(response.data["next"])
+
+    def test_fields_do_not_restrict_writes(self):
+        response = self.client.post("/api/fees/?fields=id", {
+            "user_id": self.alumni.pk, "description": "Library", "amount": "5.00"
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(set(response.json()), {
+            "id", "user", "description", "amount", "is_paid", "due_date",
+            "paid_date", "created_at", "updated_at", "created_by"
+        })
+
+
+@skipUnless(orjson, "orjson is not installed")
+class FastJSONTests(TestCase):
+    """Golden tests: FastJSONRenderer/Parser must match DRF's JSON classes byte for byte"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user(
+            "alumni", password="x", role="ALUMNI", first_name="Zoë \u2028 \"Ñ\"", graduation_year=2019
+        )
+        for i in range(5):
+            Fee.objects.create(
+                user=cls.alumni, created_by=cls.admin, description=f"Fee {i} — €",
+                amount=Decimal("1234.50") + i, due_date=timezone.now().date()
+            )
+        Document.objects.bulk_create([
+            Document(
+                owner=cls.alumni, verified_by=cls.admin, title=f"Transcript {i} ✓",
+                file=f"documents/doc{i}.pdf", file_size=1024 * i,
+                verified_at=timezone.now()
+            )
+            for i in range(5)
+        ])
+
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def serialized(self, serializer_class, queryset, expand):
+        request = Request(RequestFactory().get("/", {"expand": expand}))
+        return serializer_class(queryset, many=True, context={"request": request}).data
+
+    def test_fee_and_document_payloads(self):
+        self.assertSameOutput(self.serialized(FeeSerializer, Fee.objects.all(), "user,created_by"))
+        self.assertSameOutput(self.serialized(FeeSerializer, Fee.objects.all(), ""))
+        self.assertSameOutput(
+            self.serialized(DocumentSerializer, Document.objects.all(), "owner,verified_by")
+        )
+
+    def test_python_values(self):
+        now = timezone.now()
+        self.assertSameOutput({
+            "decimal": Decimal("10.25"),
+            "aware": now,
+            "utc_offset": now.astimezone(timezone.get_fixed_timezone(330)),
+            "naive": now.replace(tzinfo=None, microsecond=0),
+            "date": now.date(),
+            "time": now.time(),
+            "duration": timedelta(days=1, seconds=5),
+            "uuid": uuid.uuid4(),
+            "lazy": gettext_lazy("Not found."),
+            "error": ErrorDetail("Bad value", code="invalid"),
+            "ints": {1: "one", 2: [1, 2.5, None, True]},
+            "tuple": (1, "two"),
+            "queryset": User.objects.order_by("pk").values_list("username", flat=True),
+            "separators": "line\u2028paragraph\u2029end",
+        })
+
+    def test_indent_falls_back_to_stock_renderer(self):
+        data = {"a": [1, 2]}
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_parser_matches_stock_parser(self):
+        body = '{"amount": "10.00", "names": ["Zoë", "\\u2028"], "n": 1.5, "ok": true}'.encode()
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body))
+        )
+        for bad in (b'{"a": NaN}', b'{"a": '):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(bad))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user(
+            "alumni", role="ALUMNI", student_id="A1", graduation_year=2019
+        )
+        cls.student = User.objects.create_user(
+            "student", role="STUDENT", student_id="S1", graduation_year=2026
+        )
+        for user in (cls.alumni, cls.student):
+            for day in (1, 15):
+                Fee.objects.create(
+                    user=user, created_by=cls.admin, description=f"Fee {day}",
+                    amount=Decimal("12.50"), due_date=f"2024-03-{day:02d}"
+                )
+        Fee.objects.filter(user=cls.student, description="Fee 1").update(is_paid=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def rows(self, path, **extra):
+        response = self.client.get(path, **extra)
+        self.assertEqual(response.status_code, 200, getattr(response, "data", None))
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        return response, body
+
+    def test_fee_csv_includes_user_columns(self):
+        response, body = self.rows("/api/fees/export/")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="fees.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]["username"], "alumni")
+        self.assertEqual(rows[0]["student_id"], "A1")
+        self.assertEqual(rows[0]["amount"], "12.50")
+        self.assertEqual(rows[0]["created_by"], "admin")
+
+    def test_filters(self):
+        _, body = self.rows(
+            "/api/fees/export/?is_paid=false&due_date_after=2024-03-10&graduation_year=2026"
+        )
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row["username"], row["due_date"]) for row in rows], [("student", "2024-03-15")])
+
+        _, body = self.rows("/api/users/export/?role=ALUMNI")
+        self.assertEqual([row["username"] for row in csv.DictReader(io.StringIO(body))], ["alumni"])
+
+    def test_ndjson(self):
+        response, body = self.rows("/api/fees/export/?output=ndjson&role=STUDENT")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["amount"], "12.50")
+        self.assertEqual(records[0]["due_date"], "2024-03-01")
+
+    def test_csv_neutralizes_formulas(self):
+        Fee.objects.filter(user=self.alumni).update(description='=HYPERLINK("http://x","y")')
+        User.objects.filter(pk=self.alumni.pk).update(first_name="+1", last_name="@SUM(A1)")
+        _, body = self.rows("/api/fees/export/?role=ALUMNI")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(rows[0]["description"], '\'=HYPERLINK("http://x","y")')
+        self.assertEqual(rows[0]["amount"], "12.50")
+
+        _, body = self.rows("/api/users/export/?role=ALUMNI")
+        row = next(csv.DictReader(io.StringIO(body)))
+        self.assertEqual((row["first_name"], row["last_name"]), ("'+1", "'@SUM(A1)"))
+
+        # NDJSON carries the values as they are stored
+        _, body = self.rows("/api/fees/export/?output=ndjson&role=ALUMNI")
+        self.assertEqual(json.loads(body.splitlines()[0])["description"], '=HYPERLINK("http://x","y")')
+
+    def test_single_query_whatever_the_row_count(self):
+        response = self.client.get("/api/fees/export/", HTTP_ACCEPT="text/csv")
+        with self.assertNumQueries(1):
+            b"".join(response.streaming_content)
+
+    def test_invalid_filters_and_outputs(self):
+        self.assertEqual(self.client.get("/api/users/export/?is_paid=true").status_code, 400)
+        self.assertEqual(self.client.get("/api/fees/export/?output=xlsx").status_code, 400)
+        self.assertEqual(self.client.get("/api/fees/export/?due_date_after=soon").status_code, 400)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.alumni)
+        for dataset in ("fees", "users", "documents"):
+            self.assertEqual(self.client.get(f"/api/{dataset}/export/").status_code, 403)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ledger.ndjson")
+            call_command("export_data", "fees", "--output", "ndjson", "--is-paid", "true", "--path", path)
+            with open(path, encoding="utf-8") as stream:
+                records = [json.loads(line) for line in stream]
+        self.assertEqual([record["username"] for record in records], ["student"])
+
+    def test_command_writes_stdout(self):
+        stdout = io.StringIO()
+        call_command("export_data", "fees", "--output", "ndjson", "--is-paid", "true", stdout=stdout)
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([record["username"] for record in records], ["student"])
+
+
+class ListFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        cls.other = User.objects.create_user("other", password="x", role="ALUMNI")
+        documents = [
+            Document(owner=cls.alumni, title=f"Doc {index}", document_type=document_type,
+                     file=f"documents/{index}.pdf", is_verified=index % 2 == 0,
+                     uploaded_at=timezone.make_aware(timezone.datetime(2024, 3, index + 1, 12)))
+            for index, document_type in enumerate(
+                ["TRANSCRIPT", "CERTIFICATE", "DIPLOMA", "OTHER"] + ["TRANSCRIPT"] * 21
+            )
+        ]
+        documents.append(Document(owner=cls.other, title="Theirs", document_type="TRANSCRIPT",
+                                  file="documents/theirs.pdf"))
+        Document.objects.bulk_create(documents)
+        for day, amount in ((10, "30.00"), (20, "10.00"), (28, "20.00")):
+            Fee.objects.create(user=cls.alumni, created_by=cls.admin, description="Fee",
+                               amount=Decimal(amount), due_date=f"2024-02-{day}",
+                               is_paid=day == 20)
+        Fee.objects.create(user=cls.other, created_by=cls.admin, description="Fee",
+                           amount=Decimal("5.00"), due_date=None)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alumni)
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_document_filters(self):
+        data = self.get("/api/documents/?document_type=TRANSCRIPT")
+        # Every match is counted, not just the first page
+        self.assertEqual(data["count"], 22)
+        data = self.get("/api/documents/?document_type=CERTIFICATE,DIPLOMA&ordering=title")
+        self.assertEqual([doc["title"] for doc in data["results"]], ["Doc 1", "Doc 2"])
+        data = self.get("/api/documents/?is_verified=true&uploaded_after=2024-03-03&uploaded_before=2024-03-05")
+        self.assertEqual([doc["title"] for doc in data["results"]], ["Doc 4", "Doc 2"])
+        data = self.get("/api/documents/?document_type=TRANSCRIPT&page_size=50")
+        self.assertEqual(len(data["results"]), 22)
+
+    def test_fee_filters_and_ordering(self):
+        data = self.get("/api/fees/?is_paid=false&ordering=-amount")
+        self.assertEqual([fee["amount"] for fee in data["results"]], ["30.00", "20.00"])
+        data = self.get("/api/fees/?due_date_after=2024-02-15&due_date_before=2024-02-25")
+        self.assertEqual([fee["due_date"] for fee in data["results"]], ["2024-02-20"])
+
+    def test_owner_and_user_filters_are_admin_only(self):
+        response = self.client.get(f"/api/documents/?owner={self.other.pk}")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("owner", response.data)
+
+        self.client.force_authenticate(self.admin)
+        data = self.get(f"/api/documents/?owner={self.other.pk}")
+        self.assertEqual([doc["title"] for doc in data["results"]], ["Theirs"])
+        data = self.get(f"/api/fees/?user={self.other.pk}")
+        self.assertEqual(data["count"], 1)
+
+    def test_invalid_parameters(self):
+        for query in ("document_type=POSTER", "ordering=file", "group_by=owner",
+                      "uploaded_after=yesterday"):
+            response = self.client.get(f"/api/documents/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+        self.assertEqual(self.client.get("/api/fees/?ordering=description").status_code, 400)
+
+    def test_grouped_counts(self):
+        with self.assertNumQueries(1):
+            data = self.get("/api/documents/?group_by=document_type")
+        self.assertEqual(data, {
+            "group_by": "document_type",
+            "count": 25,
+            "results": [
+                {"document_type": "CERTIFICATE", "count": 1},
+                {"document_type": "DIPLOMA", "count": 1},
+                {"document_type": "OTHER", "count": 1},
+                {"document_type": "TRANSCRIPT", "count": 22},
+            ],
+        })
+        data = self.get("/api/fees/?group_by=is_paid&due_date_after=2024-02-01")
+        self.assertEqual(data["results"], [
+            {"is_paid": False, "count": 2}, {"is_paid": True, "count": 1},
+        ])
+
+    def test_cursor_pagination_follows_ordering(self):
+        data = self.get("/api/documents/?pagination=cursor&ordering=title&page_size=2")
+        self.assertEqual([doc["title"] for doc in data["results"]], ["Doc 0", "Doc 1"])
+        data = self.get(data["next"])
+        self.assertEqual([doc["title"] for doc in data["results"]], ["Doc 10", "Doc 11"])
+
+        response = self.client.get("/api/fees/?pagination=cursor&ordering=due_date")
+        self.assertEqual(response.status_code, 400)
+
+
+class FeeSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user(
+            "alumni", role="ALUMNI", student_id="A1", graduation_year=2019
+        )
+        cls.student = User.objects.create_user(
+            "student", role="STUDENT", student_id="S1", graduation_year=2026
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_fee(self, user, amount, due_date="2024-03-01", **kwargs):
+        return Fee.objects.create(
+            user=user, created_by=self.admin, description="Fee",
+            amount=Decimal(amount), due_date=due_date, **kwargs
+        )
+
+    def assertSummaryMatchesLedger(self):
+        def rows(summary):
+            return {
+                (row.role, row.graduation_year, row.due_month): (
+                    row.outstanding_amount, row.outstanding_count,
+                    row.collected_amount, row.collected_count
+                )
+                for row in summary if row.outstanding_count or row.collected_count
+            }
+        self.assertEqual(rows(FeeSummary.objects.all()), rows(ledger_fee_summary()))
+
+    def test_write_paths_keep_summary_in_step(self):
+        fee = self.add_fee(self.student, "10.00")
+        self.add_fee(self.student, "5.00", due_date=None)
+        self.add_fee(self.alumni, "7.50", due_date="2024-04-10", is_paid=True)
+        self.assertSummaryMatchesLedger()
+        self.assertEqual(
+            FeeSummary.objects.get(role="STUDENT", due_month="2024-03").outstanding_amount,
+            Decimal("10.00")
+        )
+
+        fee.amount = Decimal("12.00")
+        fee.due_date = "2024-05-02"
+        fee.save()
+        self.assertSummaryMatchesLedger()
+
+        self.client.post(f"/api/fees/{fee.pk}/mark_paid/")
+        self.assertSummaryMatchesLedger()
+
+        self.client.post("/api/fees/bulk_mark_unpaid/", {"user_id": self.student.pk}, format="json")
+        self.assertSummaryMatchesLedger()
+
+        self.client.post("/api/fees/import_csv/", {"file": SimpleUploadedFile(
+            "fees.csv", b"student_id,description,amount,due_date\nA1,Dues,3.00,2024-04-01\n",
+            content_type="text/csv"
+        )})
+        self.assertSummaryMatchesLedger()
+
+        self.student.role = "ALUMNI"
+        self.student.graduation_year = 2025
+        self.student.save()
+        self.assertSummaryMatchesLedger()
+        self.assertFalse(
+            FeeSummary.objects.filter(role="STUDENT").exclude(outstanding_count=0).exists()
+        )
+
+        fee.delete()
+        self.assertSummaryMatchesLedger()
+
+    def test_bulk_deletes_settle_in_one_pass(self):
+        def delete_queries(count, delete):
+            for index in range(count):
+                self.add_fee(self.student, "1.00", due_date=f"2024-0{index % 3 + 1}-01",
+                             is_paid=index % 2 == 0)
+            with CaptureQueriesContext(connection) as queries:
+                delete()
+            return len(queries)
+
+        few = delete_queries(3, lambda: Fee.objects.filter(user=self.student).delete())
+        self.assertSummaryMatchesLedger()
+        self.assertEqual(
+            delete_queries(12, lambda: Fee.objects.filter(user=self.student).delete()), few
+        )
+        self.assertSummaryMatchesLedger()
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.outstanding_balance, Decimal("0.00"))
+        self.assertFalse(self.student.owes_fees)
+
+        self.add_fee(self.alumni, "4.00")
+        few = delete_queries(3, self.student.delete)
+        self.student = User.objects.create_user(
+            "student", role="STUDENT", student_id="S1", graduation_year=2026
+        )
+        self.assertEqual(delete_queries(12, self.student.delete), few)
+        self.assertSummaryMatchesLedger()
+        self.assertEqual(
+            FeeSummary.objects.get(role="ALUMNI", due_month="2024-03").outstanding_amount,
+            Decimal("4.00")
+        )
+        self.assertFalse(
+            FeeSummary.objects.filter(role="STUDENT").exclude(outstanding_count=0).exists()
+        )
+
+    def test_summary_endpoint(self):
+        self.add_fee(self.student, "10.00")
+        self.add_fee(self.student, "2.50", due_date=None)
+        self.add_fee(self.alumni, "7.50", is_paid=True)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/fees/summary/?group_by=role")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["group_by"], ["role"])
+        self.assertEqual(response.data["results"], [
+            {"role": "ALUMNI", "outstanding_amount": "0.00", "outstanding_count": 0,
+             "collected_amount": "7.50", "collected_count": 1},
+            {"role": "STUDENT", "outstanding_amount": "12.50", "outstanding_count": 2,
+             "collected_amount": "0.00", "collected_count": 0},
+        ])
+        self.assertEqual(response.data["totals"]["outstanding_amount"], "12.50")
+        self.assertEqual(response.data["totals"]["collected_count"], 1)
+
+        response = self.client.get("/api/fees/summary/")
+        self.assertEqual(response.data["group_by"], ["role", "graduation_year", "due_month"])
+        self.assertIn(
+            {"role": "STUDENT", "graduation_year": 2026, "due_month": None,
+             "outstanding_amount": "2.50", "outstanding_count": 1,
+             "collected_amount": "0.00", "collected_count": 0},
+            response.data["results"]
+        )
+
+        response = self.client.get("/api/fees/summary/?group_by=owner")
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get("/api/fees/summary/").status_code, 403)
+
+    def test_rebuild_command(self):
+        self.add_fee(self.student, "10.00")
+        Fee.objects.update(amount=Decimal("11.00"))
+
+        out = io.StringIO()
+        call_command("rebuild_fee_summary", "--check", stdout=out)
+        self.assertIn("1 bucket(s) out of sync", out.getvalue())
+
+        call_command("rebuild_fee_summary", stdout=io.StringIO())
+        self.assertSummaryMatchesLedger()
+        out = io.StringIO()
+        call_command("rebuild_fee_summary", "--check", stdout=out)
+        self.assertIn("matches the ledger", out.getvalue())
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        return response.content.decode()
+
+    def test_records_route_status_latency_and_queries(self):
+        self.client.get("/api/fees/")
+        self.client.get("/api/fees/")
+        self.client.get("/api/fees/999/")
+        self.client.get("/no-such-page/")
+        body = self.scrape()
+
+        self.assertIn('http_requests_total{route="fees-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_requests_total{route="fees-detail",method="GET",status="404"} 1', body)
+        self.assertIn('http_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn(
+            'http_request_duration_seconds_count{route="fees-list",method="GET"} 2', body
+        )
+        self.assertIn('http_request_duration_seconds_bucket{route="fees-list",method="GET",le="+Inf"} 2', body)
+        self.assertIn('http_request_db_queries_count{route="fees-list"} 2', body)
+        self.assertRegex(body, r'http_request_db_queries_sum\{route="fees-list"\} [1-9]')
+        self.assertRegex(body, r'http_request_db_duration_seconds_total\{route="fees-list"\} \d')
+
+    async def test_async_requests_skip_the_thread_hop(self):
+        async def view(request):
+            return HttpResponse()
+        middleware = metrics.RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual((await middleware(RequestFactory().get("/"))).status_code, 200)
+
+        token = VersionedRefreshToken.for_user(self.admin).access_token
+        response = await self.async_client.get("/api/fees/", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        body = metrics.registry.render()
+        self.assertIn('http_requests_total{route="fees-list",method="GET",status="200"} 1', body)
+        self.assertRegex(body, r'http_request_db_queries_sum\{route="fees-list"\} [1-9]')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 5))
+        for value in (0, 1, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.samples("q", route="r")), [
+            'q_bucket{route="r",le="1"} 2',
+            'q_bucket{route="r",le="5"} 3',
+            'q_bucket{route="r",le="+Inf"} 4',
+            'q_sum{route="r"} 13',
+            'q_count{route="r"} 4',
+        ])
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.alumni)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+
+    def test_slow_request_log_includes_sql(self):
+        with override_settings(REQUEST_METRICS={"SLOW_REQUEST_SECONDS": 0}):
+            with self.assertLogs("api.metrics", "WARNING") as logs:
+                self.client.get("/api/documents/")
+        self.assertIn("documents-list", logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+        with self.assertNoLogs("api.metrics", "WARNING"):
+            self.client.get("/api/documents/")
+
+
+class SyntheticDataTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_generate_data(self):
+        out = io.StringIO()
+        call_command("generate_data", "--users", "12", "--fees", "3", "--documents", "2",
+                     "--seed", "7", stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual((result["users"], result["fees"], result["documents"]), (12, 36, 24))
+
+        users = User.objects.filter(username__startswith="synthetic-user-")
+        self.assertEqual(users.count(), 12)
+        self.assertEqual(set(users.values_list("role", flat=True)) - {"STUDENT", "ALUMNI"}, set())
+        self.assertFalse(
+            users.annotate(ledger=ledger_balance()).exclude(outstanding_balance=F("ledger")).exists()
+        )
+        self.assertEqual(Fee.objects.aggregate(total=Sum("amount"))["total"],
+                         FeeSummary.objects.aggregate(total=Sum("outstanding_amount"))["total"]
+                         + FeeSummary.objects.aggregate(total=Sum("collected_amount"))["total"])
+        # Documents share a small pool of stored placeholder blobs
+        document = Document.objects.first()
+        self.assertTrue(document.file.storage.exists(document.file.name))
+        self.assertLessEqual(Document.objects.values("sha256").distinct().count(), 16)
+        # One reference per document, plus the pool's own
+        references = Document.objects.values("sha256").annotate(count=Count("id"))
+        for row in references:
+            self.assertEqual(Blob.objects.get(pk=row["sha256"]).refcount, row["count"] + 1)
+
+    def test_same_seed_same_rows(self):
+        def snapshot(prefix):
+            call_command("generate_data", "--users", "5", "--seed", "3", "--prefix", prefix,
+                         stdout=io.StringIO())
+            return list(
+                Fee.objects.filter(user__username__startswith=f"{prefix}-")
+                .order_by("user__username", "id").values_list("amount", "due_date", "is_paid")
+            )
+        self.assertEqual(snapshot("first"), snapshot("second"))
+
+
+class BenchmarkApiTests(TestCase):
+    def run_benchmark(self, *args):
+        out = io.StringIO()
+        call_command(
+            "benchmark_api", "--users", "3", "--iterations", "2", "--warmup", "0",
+            "--only", "GET fees-list,GET profile", *args, stdout=out
+        )
+        return json.loads(out.getvalue())
+
+    def test_report(self):
+        report = self.run_benchmark()
+        self.assertEqual(report["dataset"]["users"], 3)
+        self.assertEqual(
+            set(report["endpoints"]),
+            {"GET fees-list", "GET fees-list?admin", "GET fees-list?filtered", "GET profile"}
+        )
+        result = report["endpoints"]["GET fees-list"]
+        self.assertEqual(result["statuses"], [200])
+        self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+        self.assertLessEqual(result["p95_ms"], result["p99_ms"])
+        self.assertGreater(result["queries"], 0)
+        self.assertGreater(result["peak_memory_kb"], 0)
+        self.assertEqual(report["uncovered_routes"], [])
+        # Everything the run wrote was rolled back
+        self.assertFalse(User.objects.exists())
+
+    def test_percentile(self):
+        samples = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(samples, 0), 1)
+        self.assertEqual(percentile(samples, 50), 3)
+        self.assertEqual(percentile(samples, 80), 4)
+        self.assertEqual(percentile(samples, 99), 5)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_baseline_regressions_fail_the_run(self):
+        report = self.run_benchmark()
+        report["endpoints"]["GET fees-list"]["queries"] = 0
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as fh:
+            json.dump(report, fh)
+        self.addCleanup(os.remove, fh.name)
+
+        # Only the query count is compared; latency is too noisy for a test
+        with self.assertRaisesMessage(CommandError, "1 endpoint(s) regressed"):
+            self.run_benchmark("--baseline", fh.name, "--min-delta-ms", "100000")
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password="x", role="ADMIN")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def seed(self, count):
+        users = User.objects.bulk_create([
+            User(username=f"user{User.objects.count()}-{i}", role="ALUMNI") for i in range(count)
+        ])
+        Fee.objects.bulk_create([
+            Fee(user=user, description="Tuition", amount=Decimal("10.00")) for user in users
+        ])
+        Document.objects.bulk_create([
+            Document(owner=user, title="Transcript", file="documents/t.pdf", file_size=1)
+            for user in users
+        ])
+
+    def queries_for(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for model in ("user", "fee", "document"):
+            url = f"/admin/api/{model}/"
+            self.seed(5)
+            small = self.queries_for(url)
+            self.seed(60)
+            self.assertEqual(self.queries_for(url), small, url)
+
+    def test_count_is_bounded(self):
+        self.seed(5)
+        with mock.patch.object(BoundedCountPaginator, "COUNT_LIMIT", 3):
+            paginator = BoundedCountPaginator(Fee.objects.order_by("pk"), 2)
+            self.assertEqual(paginator.count, 3)
+            self.assertEqual(str(paginator.count), "3+")
+            self.assertEqual(paginator.num_pages, 2)
+
+            # Pages past the bound are read, and extend the page range
+            page = paginator.page(3)
+            self.assertEqual(len(page.object_list), 1)
+            self.assertFalse(page.has_next())
+            self.assertEqual(paginator.num_pages, 3)
+            self.assertTrue(paginator.page(2).has_next())
+            with self.assertRaises(EmptyPage):
+                paginator.page(4)
+
+    def test_changelist_pages_past_the_bound(self):
+        self.seed(5)
+        fee_admin = admin_site._registry[Fee]
+        with mock.patch.object(BoundedCountPaginator, "COUNT_LIMIT", 3), \
+                mock.patch.object(fee_admin, "list_per_page", 2):
+            response = self.client.get("/admin/api/fee/?p=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "3+ fees")
+        self.assertEqual(len(response.context["cl"].result_list), 1)
+
+    def test_date_hierarchy_reads_only_the_page(self):
+        self.seed(5)
+        fee_admin = admin_site._registry[Fee]
+        with mock.patch.object(fee_admin, "list_per_page", 2), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/admin/api/fee/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'class="toplinks"')
+        drilldown = [
+            q["sql"] for q in queries
+            if "api_fee" in q["sql"] and ("MIN(" in q["sql"] or "DISTINCT" in q["sql"])
+        ]
+        self.assertTrue(drilldown)
+        page = [str(fee.pk) for fee in response.context["cl"].result_list]
+        for sql in drilldown:
+            self.assertIn(f"IN ({', '.join(page)})", sql)
+
+
+class AsyncAuthViewTests(TransactionTestCase):
+    def setUp(self):
+        User.objects.create_user("alumni", password="Str0ng-pass!", role="ALUMNI")
+
+    def post(self, view, data):
+        request = AsyncRequestFactory().post(
+            "/api/auth/", json.dumps(data), content_type="application/json"
+        )
+        return async_to_sync(view)(request)
+
+    def test_login_returns_tokens(self):
+        response = self.post(async_views.login, {"username": "alumni", "password": "Str0ng-pass!"})
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body["user"]["username"], "alumni")
+        self.assertIn("access", body["tokens"])
+
+    def test_bad_password_is_rejected(self):
+        response = self.post(async_views.login, {"username": "alumni", "password": "wrong"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_register_creates_user(self):
+        response = self.post(async_views.register, {
+            "username": "student", "email": "student@example.com", "role": "STUDENT",
+            "password": "Str0ng-pass!", "password_confirm": "Str0ng-pass!",
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(User.objects.filter(username="student").exists())
+
+    @override_settings(AUTH_HASHING_WORKERS=1, AUTH_HASHING_QUEUE_SIZE=0)
+    def test_full_pool_returns_429(self):
+        with mock.patch.object(async_views.hashing_pool, "_pending", 1):
+            response = self.post(async_views.login, {"username": "alumni", "password": "Str0ng-pass!"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_loadtest_needs_allow_writes(self):
+        with self.assertRaises(CommandError):
+            call_command("loadtest_auth", "--requests", "2", stdout=io.StringIO())
+        self.assertEqual(User.objects.count(), 1)
+
+        out = io.StringIO()
+        call_command(
+            "loadtest_auth", "--allow-writes", "--requests", "2", "--concurrency", "2", stdout=out
+        )
+        results = json.loads(out.getvalue())
+        self.assertEqual(results["sync"]["status_codes"], {"200": 2})
+        self.assertEqual(results["async"]["status_codes"], {"200": 2})
+        # Only the run's own throwaway user is removed
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["alumni"])
+
+
+@override_settings(READ_REPLICAS={"ALIASES": ["replica"], "STICKY_SECONDS": 60})
+class ReadReplicaTests(TransactionTestCase):
+    """
+    Runs against a second SQLite file standing in for a replica; ``replicate``
+    copies the primary into it, and anything written afterwards is lag.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after setUpClass, so the test runner does not block the alias
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings["replica"] = {
+            **connections.settings["default"],
+            "NAME": os.path.join(cls.replica_dir.name, "replica.sqlite3"),
+            "TEST": {"MIRROR": None},
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches["default"].clear()
+        replicas.reset_health()
+        self.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        self.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        Fee.objects.create(user=self.alumni, description="Tuition", amount=Decimal("10.00"))
+        self.replicate()
+
+    def replicate(self):
+        connections["replica"].close()
+        connection.ensure_connection()
+        with closing(sqlite3.connect(connections.settings["replica"]["NAME"])) as target:
+            connection.connection.backup(target)
+
+    def client_for(self, user):
+        token = VersionedRefreshToken.for_user(user).access_token
+        return APIClient(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def fee_count(self, client):
+        response = client.get("/api/fees/")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["count"]
+
+    def test_reads_come_from_replica(self):
+        Fee.objects.create(user=self.alumni, description="Library", amount=Decimal("5.00"))
+        self.assertEqual(self.fee_count(self.client_for(self.alumni)), 1)
+
+    async def test_async_requests_read_from_replica(self):
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(replicas.ReplicaMiddleware(view)))
+        await sync_to_async(Fee.objects.create)(
+            user=self.alumni, description="Library", amount=Decimal("5.00")
+        )
+        token = VersionedRefreshToken.for_user(self.alumni).access_token
+        response = await self.async_client.get("/api/fees/", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_new_user_authenticates_before_replica_catches_up(self):
+        student = User.objects.create_user("student", password="x", role="STUDENT")
+        self.assertEqual(self.fee_count(self.client_for(student)), 0)
+
+    def test_writer_is_pinned_to_primary(self):
+        admin = self.client_for(self.admin)
+        response = admin.post("/api/fees/", {
+            "user_id": self.alumni.pk, "description": "Library", "amount": "5.00",
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        # The admin reads their own write; the alumni still sees the replica
+        self.assertEqual(self.fee_count(admin), 2)
+        self.assertEqual(self.fee_count(self.client_for(self.alumni)), 1)
+
+        caches["default"].clear()
+        self.assertEqual(self.fee_count(admin), 1)
+
+    def test_lagging_replica_is_skipped(self):
+        Fee.objects.create(user=self.alumni, description="Library", amount=Decimal("5.00"))
+        client = self.client_for(self.alumni)
+        with mock.patch.object(replicas, "replica_lag", return_value=60.0), \
+                self.assertLogs("api.replicas", "WARNING"):
+            self.assertEqual(self.fee_count(client), 2)
+        # Not checked again until RETRY_SECONDS have passed
+        self.assertEqual(self.fee_count(client), 2)
+        replicas.reset_health()
+        self.assertEqual(self.fee_count(client), 1)
+
+    def test_unreachable_replica_is_skipped(self):
+        with mock.patch.object(replicas, "replica_lag", side_effect=DatabaseError("down")), \
+                self.assertLogs("api.replicas", "WARNING"):
+            self.assertEqual(self.fee_count(self.client_for(self.alumni)), 1)
+        self.assertFalse(replicas.is_available("replica"))
+
+    def test_failed_replica_read_runs_again_on_primary(self):
+        Fee.objects.create(user=self.alumni, description="Library", amount=Decimal("5.00"))
+        with closing(sqlite3.connect(connections.settings["replica"]["NAME"])) as replica:
+            replica.execute("DROP TABLE api_fee")
+        connections["replica"].close()
+        with self.assertLogs("api.replicas", "WARNING"):
+            self.assertEqual(self.fee_count(self.client_for(self.alumni)), 2)
+        self.assertFalse(replicas.is_available("replica"))
+
+    def test_router(self):
+        router = replicas.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Fee))
+        cache_entry = DatabaseCache("api_cache", {}).cache_model_class
+        self.assertEqual(router.db_for_read(cache_entry), "default")
+        self.assertEqual(router.db_for_write(Fee), "default")
+
+        state = replicas._RequestState(use_replica=True)
+        token = replicas._state.set(state)
+        try:
+            self.assertEqual(router.db_for_write(cache_entry), "default")
+            self.assertFalse(state.wrote)
+            router.db_for_write(Fee)
+            self.assertTrue(state.wrote)
+        finally:
+            replicas._state.reset(token)
+        self.assertFalse(router.allow_migrate("replica", "api"))
+        self.assertIsNone(router.allow_migrate("default", "api"))
+
+
+class BatchRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="ADMIN")
+        cls.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        Document.objects.bulk_create([
+            Document(owner=cls.alumni, title=title, document_type=document_type,
+                     file=f"documents/{title}.pdf")
+            for title, document_type in (("Transcript", "TRANSCRIPT"), ("Diploma", "DIPLOMA"))
+        ])
+        Fee.objects.create(user=cls.alumni, description="Tuition", amount=Decimal("10.00"))
+
+    def client_for(self, user):
+        token = VersionedRefreshToken.for_user(user).access_token
+        return APIClient(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def batch(self, user, requests, expected_status=200):
+        response = self.client_for(user).post("/api/batch/", {"requests": requests}, format="json")
+        self.assertEqual(response.status_code, expected_status, response.data)
+        return response.data.get("responses")
+
+    def test_dashboard_in_one_round_trip(self):
+        with mock.patch.object(
+            CachedJWTAuthentication, "authenticate", autospec=True,
+            side_effect=CachedJWTAuthentication.authenticate
+        ) as authenticate:
+            profile, documents, fees = self.batch(self.alumni, [
+                {"path": "/api/auth/profile/"},
+                {"path": "/api/documents/?document_type=DIPLOMA&fields=title"},
+                {"path": "/api/fees/"},
+            ])
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual(profile["status"], 200)
+        self.assertEqual(profile["body"]["username"], "alumni")
+        self.assertEqual(documents["body"]["results"], [{"title": "Diploma"}])
+        self.assertEqual(fees["body"]["count"], 1)
+        self.assertIn("ETag", fees["headers"])
+
+    def test_writes_run_in_order(self):
+        created, listing = self.batch(self.admin, [
+            {"method": "POST", "path": "/api/fees/", "body": {
+                "user_id": self.alumni.pk, "description": "Library", "amount": "5.00"}},
+            {"path": f"/api/users/{self.alumni.pk}/fees/"},
+        ])
+        self.assertEqual(created["status"], 201, created["body"])
+        self.assertEqual(len(listing["body"]), 2)
+
+    def test_each_sub_request_answers_for_itself(self):
+        results = self.batch(self.alumni, [
+            {"method": "POST", "path": "/api/fees/", "body": {"description": "Nope"}},
+            {"path": "/api/missing/"},
+            {"method": "POST", "path": "/api/batch/", "body": {"requests": []}},
+            {"method": "PATCH", "path": "/api/auth/profile/update/", "body": {"first_name": "Amina"}},
+        ])
+        self.assertEqual([result["status"] for result in results], [403, 404, 400, 200])
+        self.alumni.refresh_from_db()
+        self.assertEqual(self.alumni.first_name, "Amina")
+
+        export, = self.batch(self.admin, [{"path": "/api/documents/export/"}])
+        self.assertEqual(export["status"], 400)
+
+    def test_file_responses_are_refused(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with override_settings(MEDIA_ROOT=media_root.name):
+            document = Document.objects.create(
+                owner=self.admin, title="Scan", file=SimpleUploadedFile("scan.pdf", b"%PDF-1.4 scan")
+            )
+            path = f"/api/documents/{document.pk}/download/"
+            responses = []
+            response_payload = batch.response_payload
+
+            def capture(response):
+                responses.append(response)
+                return response_payload(response)
+
+            finished = mock.Mock()
+            request_finished.connect(finished)
+            self.addCleanup(request_finished.disconnect, finished)
+            with mock.patch.object(batch, "response_payload", side_effect=capture):
+                streamed, = self.batch(self.admin, [{"path": path}])
+            self.assertEqual(streamed["status"], 400)
+            self.assertTrue(responses[0].file_to_stream.closed)
+            # Sent for the batch alone: sub-responses are closed without it
+            self.assertEqual(finished.call_count, 1)
+
+            for backend in ("nginx", "apache"):
+                with override_settings(DOCUMENT_DOWNLOAD_BACKEND=backend):
+                    offloaded, = self.batch(self.admin, [{"path": path}])
+                self.assertEqual(offloaded["status"], 400, backend)
+
+    def test_sub_requests_are_measured(self):
+        metrics.registry.reset()
+        self.batch(self.alumni, [{"path": "/api/fees/"}, {"path": "/api/fees/"}, {"path": "/api/missing/"}])
+        body = metrics.registry.render()
+        self.assertIn('http_requests_total{route="fees-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('http_requests_total{route="batch",method="POST",status="200"} 1', body)
+        self.assertRegex(body, r'http_request_db_queries_sum\{route="fees-list"\} [1-9]')
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_is_validated(self):
+        self.batch(self.alumni, [{"path": "/admin/"}], expected_status=400)
+        self.batch(self.alumni, [{"path": "/api/fees/"}] * 3, expected_status=400)
+        response = APIClient().post("/api/batch/", {"requests": []}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(BATCH_MAX_WORKERS=3)
+class ConcurrentBatchTests(TransactionTestCase):
+    def setUp(self):
+        self.alumni = User.objects.create_user("alumni", password="x", role="ALUMNI")
+        Fee.objects.create(user=self.alumni, description="Tuition", amount=Decimal("10.00"))
+
+    def test_gets_run_concurrently(self):
+        threads = []
+        dispatch = batch.dispatch
+
+        def record(request, item):
+            threads.append(threading.current_thread().name)
+            return dispatch(request, item)
+
+        token = VersionedRefreshToken.for_user(self.alumni).access_token
+        client = APIClient(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with mock.patch.object(batch, "dispatch", side_effect=record):
+            response = client.post("/api/batch/", {"requests": [
+                {"path": "/api/fees/"},
+                {"path": "/api/auth/profile/"},
+                {"method": "PATCH", "path": "/api/auth/profile/update/", "body": {"first_name": "A"}},
+                {"path": "/api/auth/profile/"},
+            ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        responses = response.data["responses"]
+        self.assertEqual([result["status"] for result in responses], [200] * 4)
+        self.assertEqual(responses[0]["body"]["count"], 1)
+        self.assertEqual(responses[3]["body"]["first_name"], "A")
+        # The two leading GETs on workers; the write and the GET after it inline
+        self.assertTrue(all(name.startswith("batch") for name in threads[:2]))
+        self.assertFalse(any(name.startswith("batch") for name in threads[2:]))
+
+
+class HashingPoolTests(TestCase):
+    @override_settings(AUTH_HASHING_WORKERS=1, AUTH_HASHING_QUEUE_SIZE=1)
+    def test_admission_is_bounded(self):
+        pool = HashingPool()
+        release = threading.Event()
+
+        async def burst():
+            jobs = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(PoolOverloaded):
+                await pool.run(lambda: None)
+            release.set()
+            return await asyncio.gather(*jobs)
+
+        self.assertEqual(async_to_sync(burst)(), [True, True])
+        self.assertEqual(pool._pending, 0)
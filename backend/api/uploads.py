@@ -0,0 +1,162 @@
+import os
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Document, UploadSession, User, discard_blob
+from .storage import link_or_copy
+
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+_content_range = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class ChunkError(ValueError):
+    pass
+
+
+class QuotaExceeded(ValueError):
+    pass
+
+
+def parse_content_range(header, total_size):
+    """
+    Parse ``Content-Range: bytes start-end/total`` for a chunk upload.
+    Returns ``(start, end)`` with ``end`` exclusive.
+    """
+    match = _content_range.match((header or "").strip())
+    if not match:
+        raise ChunkError('Content-Range must look like "bytes start-end/total".')
+    start, last, total = (int(value) for value in match.groups())
+    if total != total_size:
+        raise ChunkError(f"Total size must be {total_size}.")
+    if last < start or last >= total_size:
+        raise ChunkError("Range lies outside the upload.")
+    if last - start + 1 > settings.DOCUMENT_UPLOAD_MAX_CHUNK_SIZE:
+        raise ChunkError(
+            f"Chunks may be at most {settings.DOCUMENT_UPLOAD_MAX_CHUNK_SIZE} bytes."
+        )
+    return start, last + 1
+
+
+def check_quota(owner_id, total_size):
+    """
+    Raise ``QuotaExceeded`` if one more session of ``total_size`` bytes would
+    give the owner more than ``DOCUMENT_UPLOAD_MAX_SESSIONS`` open sessions
+    or ``DOCUMENT_UPLOAD_MAX_RESERVED_SIZE`` bytes reserved between them.
+    Call in the transaction that creates the session: the owner's row stays
+    locked, so concurrent creates are counted one after another.
+    """
+    User.objects.select_for_update().filter(pk=owner_id).values_list('pk').first()
+    sessions = UploadSession.objects.filter(owner_id=owner_id).aggregate(
+        count=Count('pk'), reserved=Sum('total_size', default=0)
+    )
+    if sessions['count'] >= settings.DOCUMENT_UPLOAD_MAX_SESSIONS:
+        raise QuotaExceeded(
+            f"At most {settings.DOCUMENT_UPLOAD_MAX_SESSIONS} uploads may be open at once; "
+            "finalize or delete one first."
+        )
+    if sessions['reserved'] + total_size > settings.DOCUMENT_UPLOAD_MAX_RESERVED_SIZE:
+        raise QuotaExceeded(
+            f"Open uploads may reserve at most {settings.DOCUMENT_UPLOAD_MAX_RESERVED_SIZE} "
+            "bytes between them; finalize or delete one first."
+        )
+
+
+def open_session(session):
+    """Create the sparse part file that chunks are written into"""
+    os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+    with open(session.part_path, "wb") as fh:
+        fh.truncate(session.total_size)
+
+
+def write_chunk(session, stream, start, end):
+    """
+    Copy ``end - start`` bytes from the request ``stream`` straight into the
+    part file at ``start``. Whatever arrives is recorded, so a chunk cut
+    short by a dropped connection still counts towards the upload.
+    Returns the number of bytes written. The session row is locked
+    throughout, as ``finalize_session`` locks it, so a chunk never lands in
+    a part file that is being finalized; raises
+    ``UploadSession.DoesNotExist`` if the session was finalized meanwhile.
+    """
+    written = 0
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        with open(session.part_path, "r+b") as fh:
+            fh.seek(start)
+            while written < end - start:
+                data = stream.read(min(COPY_CHUNK_SIZE, end - start - written))
+                if not data:
+                    break
+                fh.write(data)
+                written += len(data)
+
+        if written:
+            locked.add_range(start, start + written)
+            locked.save(update_fields=["received", "updated_at"])
+    session.received = locked.received
+    return written
+
+
+class PartFile(File):
+    """A complete upload's part file, which storage adopts in place"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def finalize_session(session):
+    """
+    Turn a complete upload into a Document. The part file is hashed and
+    linked into the blob store without being copied; it is only removed
+    once the document is committed, so a failed save can be retried.
+    Raises ``UploadSession.DoesNotExist`` if the session was finalized
+    meanwhile.
+    """
+    staged = f"{session.part_path}.{uuid.uuid4().hex}"
+    doc = None
+    try:
+        with transaction.atomic():
+            # A concurrent finalize of the same session waits here
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            link_or_copy(session.part_path, staged)
+            doc = Document(
+                owner_id=session.owner_id,
+                title=session.title,
+                document_type=session.document_type,
+                file_size=session.total_size,
+            )
+            with open(staged, "rb") as part:
+                doc.file = PartFile(part, name=session.filename)
+                doc.save()
+            if not session.delete()[0]:
+                raise UploadSession.DoesNotExist
+    except Exception:
+        digest = doc.sha256 if doc is not None else ""
+        if digest:
+            discard_blob(digest)
+        raise
+    finally:
+        if os.path.exists(staged):
+            os.remove(staged)
+    return doc
+
+
+def purge_expired_sessions(max_age=None):
+    """Delete upload sessions (and their part files) idle for ``max_age``"""
+    if max_age is None:
+        max_age = timedelta(seconds=settings.DOCUMENT_UPLOAD_SESSION_TTL)
+    expired = UploadSession.objects.filter(updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for session in expired.iterator():
+        session.delete()
+        count += 1
+    return count
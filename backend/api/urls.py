@@ -1,14 +1,21 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
-    DocumentViewSet, UserViewSet, FeeViewSet,
-    register, login, profile, update_profile
+    DocumentViewSet, UserViewSet, FeeViewSet, UploadSessionViewSet,
+    register, login, profile, update_profile, batch
 )
 
+if settings.AUTH_ASYNC_VIEWS:
+    # Hash passwords off the event loop when served over ASGI
+    register, login = async_views.register, async_views.login
+
 router = DefaultRouter()
 router.register(r"documents", DocumentViewSet, basename="documents")
 router.register(r"users", UserViewSet, basename="users")
 router.register(r"fees", FeeViewSet, basename="fees")
+router.register(r"uploads", UploadSessionViewSet, basename="uploads")
 
 urlpatterns = [
     # Authentication endpoints
@@ -16,6 +23,7 @@ urlpatterns = [
     path("auth/login/", login, name="login"),
     path("auth/profile/", profile, name="profile"),
     path("auth/profile/update/", update_profile, name="update_profile"),
+    path("batch/", batch, name="batch"),
     
     # API endpoints
     path("", include(router.urls)),
@@ -0,0 +1,52 @@
+"""
+Short-lived cache of ``User`` rows for request authentication.
+
+``CachedJWTAuthentication`` stores the fields it needs from the user it
+loads here, so later requests carrying the same token skip the ``SELECT`` on
+``api_user``. Only those fields are cached, never the model instance: the
+password hash is kept as the digest simplejwt compares, and only when
+``CHECK_REVOKE_TOKEN`` is on. Entries are dropped whenever the row changes:
+on ``User`` save/delete and whenever ``api.models`` adjusts stored balances
+with ``UPDATE`` statements.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings
+
+from . import caching
+
+
+DEFAULTS = {
+    "CACHE_ALIAS": "default",
+    "TTL": 60,
+}
+
+# What authentication and the permission classes read from request.user;
+# anything else is loaded from the database on first access
+FIELDS = ("id", "role", "is_active", "owes_fees", "updated_at")
+
+
+def _config(name):
+    return getattr(settings, "JWT_USER_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def _key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def get(user_id):
+    """The cached fields of a user as a dict, or None"""
+    return caches[_config("CACHE_ALIAS")].get(_key(user_id))
+
+
+def put(user):
+    entry = {name: getattr(user, name) for name in FIELDS}
+    if getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+        from rest_framework_simplejwt.utils import get_md5_hash_password
+        entry["password_digest"] = get_md5_hash_password(user.password)
+    caches[_config("CACHE_ALIAS")].set(_key(user.pk), entry, _config("TTL"))
+
+
+def invalidate(user_ids):
+    """Drop cached users now and again when the current transaction commits"""
+    caching.invalidate(_config("CACHE_ALIAS"), map(_key, user_ids))
@@ -24,12 +24,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so the timings cover the rest of the stack
+    "api.metrics.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.replicas.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -89,6 +92,50 @@ else:
         }
     }
 
+# The JWT user cache, debt-status cache and replica pins are invalidated by
+# whichever worker makes a write, so they need a cache every worker shares:
+# Redis when REDIS_URL is set, otherwise the database (run
+# `python manage.py createcachetable`). Local memory is only used with DEBUG,
+# where runserver is a single process.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+elif DEBUG:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "api_cache",
+        }
+    }
+
+# Read replicas: DB_REPLICAS lists replica hosts (PostgreSQL/MySQL) or
+# database files (SQLite), comma-separated. Each becomes a "replicaN" alias
+# with the primary's other settings; see api/replicas.py for the routing.
+for index, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), 1):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        **({"NAME": BASE_DIR / replica.strip()} if DB_ENGINE == "sqlite3" else {"HOST": replica.strip()}),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+
+READ_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+    # Seconds a user reads from the primary after writing
+    "STICKY_SECONDS": int(os.getenv("REPLICA_STICKY_SECONDS", "10")),
+    "MAX_LAG_SECONDS": 5,
+    "CHECK_INTERVAL": 5,
+    "RETRY_SECONDS": 30,
+    "CACHE_ALIAS": "default",
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -105,25 +152,111 @@ STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# How document downloads are delivered: "django" streams the file from the
+# worker (development), "nginx" hands it off with X-Accel-Redirect and
+# "apache" with X-Sendfile once permissions and debt checks have passed.
+DOCUMENT_DOWNLOAD_BACKEND = os.getenv("DOCUMENT_DOWNLOAD_BACKEND", "django")
+# nginx `internal` location that aliases MEDIA_ROOT
+DOCUMENT_DOWNLOAD_ACCEL_PREFIX = os.getenv("DOCUMENT_DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+
+# Resumable chunked uploads (/api/uploads/)
+DOCUMENT_UPLOAD_MAX_SIZE = int(os.getenv("DOCUMENT_UPLOAD_MAX_SIZE", 500 * 1024 * 1024))
+DOCUMENT_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("DOCUMENT_UPLOAD_MAX_CHUNK_SIZE", 16 * 1024 * 1024))
+# Seconds an idle upload session is kept before purge_upload_sessions removes it
+DOCUMENT_UPLOAD_SESSION_TTL = int(os.getenv("DOCUMENT_UPLOAD_SESSION_TTL", 24 * 60 * 60))
+# Per user: open sessions, and the bytes their total_size may reserve between them
+DOCUMENT_UPLOAD_MAX_SESSIONS = int(os.getenv("DOCUMENT_UPLOAD_MAX_SESSIONS", 5))
+DOCUMENT_UPLOAD_MAX_RESERVED_SIZE = int(
+    os.getenv("DOCUMENT_UPLOAD_MAX_RESERVED_SIZE", 2 * DOCUMENT_UPLOAD_MAX_SIZE)
+)
+
+# /api/batch/: sub-requests per call, and worker threads for runs of GETs
+# (1 runs everything in the request thread)
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 4))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CORS_ALLOW_ALL_ORIGINS = True  # dev only
 
+# The JWT user cache only saves work when the cache is Redis or in-process;
+# with the database cache each hit would be a SELECT of its own
+JWT_AUTHENTICATION_CLASS = (
+    "rest_framework_simplejwt.authentication.JWTAuthentication"
+    if CACHES["default"]["BACKEND"] == "django.core.cache.backends.db.DatabaseCache"
+    else "api.authentication.CachedJWTAuthentication"
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        JWT_AUTHENTICATION_CLASS,
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # orjson-backed JSON with the same output as DRF's JSONRenderer; swap
+    # back to rest_framework.renderers.JSONRenderer / parsers.JSONParser
+    # to use the stdlib json module
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.CountedPageNumberPagination",
     "PAGE_SIZE": 20,
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "api.authentication.VersionedTokenObtainPairSerializer",
+}
+
+# Users resolved by CachedJWTAuthentication (see JWT_AUTHENTICATION_CLASS)
+# are cached for TTL seconds and invalidated whenever the user row changes.
+JWT_USER_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TTL": 60,
 }
 
 AUTH_USER_MODEL = "api.User"
+
+# Serve /api/auth/login/ and /api/auth/register/ with async views that hash
+# passwords on a bounded thread pool (for ASGI deployments). When all
+# workers are busy and the queue is full, requests get 429.
+AUTH_ASYNC_VIEWS = os.getenv("AUTH_ASYNC_VIEWS", "False") == "True"
+AUTH_HASHING_WORKERS = int(os.getenv("AUTH_HASHING_WORKERS", 4))
+AUTH_HASHING_QUEUE_SIZE = int(os.getenv("AUTH_HASHING_QUEUE_SIZE", 64))
+
+# Conditional GET for profile, user, fee and document reads (see
+# api/conditional.py). ETags and 304s are always on; ENABLED additionally
+# caches full responses per user, keyed by their ETag.
+CONDITIONAL_RESPONSE_CACHE = {
+    "ENABLED": os.getenv("CONDITIONAL_RESPONSE_CACHE", "False") == "True",
+    "CACHE_ALIAS": "default",
+    "TTL": 300,
+}
+
+# Per-route latency, query count and DB time, served to admins in Prometheus
+# text format on /metrics (see api/metrics.py). Set SLOW_REQUEST_SECONDS to
+# log requests at least that slow together with their SQL.
+REQUEST_METRICS = {
+    "ENABLED": os.getenv("REQUEST_METRICS", "True") == "True",
+    "SLOW_REQUEST_SECONDS": (
+        float(os.getenv("SLOW_REQUEST_SECONDS")) if os.getenv("SLOW_REQUEST_SECONDS") else None
+    ),
+}
+
+# Debt-status cache used by DebtClearForDownload (see api/debt_cache.py).
+# CACHE_ALIAS must name a cache shared by all workers (see CACHES above).
+DEBT_STATUS_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TTL": 300,
+    "LOCAL_SIZE": 10000,
+    "LOCAL_TTL": 5,
+}
@@ -20,6 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from api.views import metrics
 
 def api_root(request):
     """Simple API root view"""
@@ -37,8 +38,10 @@ def api_root(request):
                 "users": "/api/users/",
                 "documents": "/api/documents/",
                 "fees": "/api/fees/",
+                "batch": "/api/batch/",
             },
             "admin": "/admin/",
+            "metrics": "/metrics",
         }
     })
 
@@ -48,6 +51,7 @@ urlpatterns = [
     path("api/auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/", include("api.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -164,12 +164,14 @@ export async function getProfile() {
   return res.json();
 }
 
-// Get user documents
-export async function getDocuments() {
+// Get user documents, optionally filtered server-side
+// (e.g. { document_type: "CERTIFICATE,DIPLOMA", page_size: "24" })
+export async function getDocuments(params: Record<string, string> = {}) {
   const token = getAuthToken();
   if (!token) throw new Error("Not authenticated");
   
-  const res = await fetch(`${API_BASE}/documents/`, {
+  const query = new URLSearchParams(params).toString();
+  const res = await fetch(`${API_BASE}/documents/${query ? `?${query}` : ""}`, {
     headers: {
       "Authorization": `Bearer ${token}`,
     },
@@ -178,6 +180,54 @@ export async function getDocuments() {
   return res.json();
 }
 
+// Follow the `next` (or `previous`) link of a paginated list response
+export async function getPage(url: string) {
+  const token = getAuthToken();
+  if (!token) throw new Error("Not authenticated");
+
+  const res = await fetch(url, {
+    headers: {
+      "Authorization": `Bearer ${token}`,
+    },
+  });
+  if (!res.ok) throw new Error("Failed to get page");
+  return res.json();
+}
+
+export interface BatchRequest {
+  method?: "GET" | "POST" | "PUT" | "PATCH" | "DELETE";
+  path: string;
+  body?: unknown;
+}
+
+export interface BatchResponse<T = any> {
+  status: number;
+  headers?: Record<string, string>;
+  body: T;
+}
+
+// Run several API requests in one round trip; paths are full API paths
+// (e.g. "/api/auth/profile/") and responses come back in the same order
+export async function batch(requests: BatchRequest[]): Promise<BatchResponse[]> {
+  const token = getAuthToken();
+  if (!token) throw new Error("Not authenticated");
+
+  const res = await fetch(`${API_BASE}/batch/`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "Authorization": `Bearer ${token}`,
+    },
+    body: JSON.stringify({ requests }),
+  });
+  if (!res.ok) {
+    const errorMessage = await parseErrorResponse(res);
+    throw new Error(errorMessage);
+  }
+  const response = await res.json();
+  return response.responses;
+}
+
 // Download document
 export async function downloadDocument(documentId: number) {
   const token = getAuthToken();
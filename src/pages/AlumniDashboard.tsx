@@ -3,7 +3,7 @@ import { Button } from "@/components/ui/button";
 import { Download, FileText, Award, AlertCircle, Loader2 } from "lucide-react";
 import { useEffect, useState } from "react";
 import { useToast } from "@/hooks/use-toast";
-import { getDocuments, downloadDocument, getStoredUser, clearAuthTokens } from "@/api";
+import { batch, downloadDocument, getPage, getStoredUser, setStoredUser, clearAuthTokens } from "@/api";
 import { useNavigate } from "react-router-dom";
 
 interface Document {
@@ -16,9 +16,37 @@ interface Document {
   file_size: number;
 }
 
+// Dashboard sections, each fetched with a server-side document_type filter
+const SECTION_TYPES = {
+  transcripts: "TRANSCRIPT",
+  certificates: "CERTIFICATE,DIPLOMA",
+  others: "OTHER",
+};
+
+type SectionKey = keyof typeof SECTION_TYPES;
+
+// Documents per request; further pages are loaded on demand
+const PAGE_SIZE = "24";
+
+// Where a section's list stands: its total and the link to the next page
+interface SectionPage {
+  count: number;
+  next: string | null;
+}
+
+const EMPTY_PAGES: Record<SectionKey, SectionPage> = {
+  transcripts: { count: 0, next: null },
+  certificates: { count: 0, next: null },
+  others: { count: 0, next: null },
+};
+
 const AlumniDashboard = () => {
-  const [documents, setDocuments] = useState<Document[]>([]);
+  const [transcripts, setTranscripts] = useState<Document[]>([]);
+  const [certificates, setCertificates] = useState<Document[]>([]);
+  const [otherDocuments, setOtherDocuments] = useState<Document[]>([]);
+  const [pages, setPages] = useState<Record<SectionKey, SectionPage>>(EMPTY_PAGES);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState<SectionKey | null>(null);
   const [downloading, setDownloading] = useState<number | null>(null);
   const { toast } = useToast();
   const navigate = useNavigate();
@@ -35,8 +63,25 @@ const AlumniDashboard = () => {
   const fetchDocuments = async () => {
     try {
       setLoading(true);
-      const response = await getDocuments();
-      setDocuments(response.results || response);
+      // Profile and every section in one round trip
+      const [profile, ...sections] = await batch([
+        { path: "/api/auth/profile/" },
+        ...Object.values(SECTION_TYPES).map((documentType) => ({
+          path: `/api/documents/?${new URLSearchParams({ document_type: documentType, page_size: PAGE_SIZE })}`,
+        })),
+      ]);
+      const failed = sections.find((section) => section.status !== 200);
+      if (failed) throw new Error(failed.body?.detail || "Failed to get documents");
+      if (profile.status === 200) setStoredUser(profile.body);
+      const [transcriptPage, certificatePage, otherPage] = sections.map((section) => section.body);
+      setTranscripts(transcriptPage.results || transcriptPage);
+      setCertificates(certificatePage.results || certificatePage);
+      setOtherDocuments(otherPage.results || otherPage);
+      setPages({
+        transcripts: sectionPage(transcriptPage),
+        certificates: sectionPage(certificatePage),
+        others: sectionPage(otherPage),
+      });
     } catch (error: any) {
       toast({
         title: "Failed to load documents",
@@ -48,6 +93,55 @@ const AlumniDashboard = () => {
     }
   };
 
+  const sectionPage = (page: any): SectionPage =>
+    page.results ? { count: page.count, next: page.next } : { count: page.length, next: null };
+
+  const sectionSetters = {
+    transcripts: setTranscripts,
+    certificates: setCertificates,
+    others: setOtherDocuments,
+  };
+
+  const loadMore = async (key: SectionKey) => {
+    const next = pages[key].next;
+    if (!next) return;
+    try {
+      setLoadingMore(key);
+      const page = await getPage(next);
+      sectionSetters[key]((documents) => [...documents, ...page.results]);
+      setPages((current) => ({ ...current, [key]: sectionPage(page) }));
+    } catch (error: any) {
+      toast({
+        title: "Failed to load documents",
+        description: error.message || "Could not fetch more documents.",
+        variant: "destructive",
+      });
+    } finally {
+      setLoadingMore(null);
+    }
+  };
+
+  const renderLoadMore = (key: SectionKey, shown: number) => {
+    if (!pages[key].next) return null;
+    return (
+      <div className="mt-4 flex items-center justify-center gap-4">
+        <span className="text-sm text-muted-foreground">
+          Showing {shown} of {pages[key].count}
+        </span>
+        <Button variant="outline" onClick={() => loadMore(key)} disabled={loadingMore === key}>
+          {loadingMore === key ? (
+            <>
+              <Loader2 className="h-4 w-4 mr-2 animate-spin" />
+              Loading...
+            </>
+          ) : (
+            "Load more"
+          )}
+        </Button>
+      </div>
+    );
+  };
+
   const handleDownload = async (documentId: number, title: string) => {
     try {
       setDownloading(documentId);
@@ -100,15 +194,6 @@ const AlumniDashboard = () => {
     });
   };
 
-  // Filter documents by type
-  const transcripts = documents.filter((doc) => doc.document_type === "TRANSCRIPT");
-  const certificates = documents.filter(
-    (doc) => doc.document_type === "CERTIFICATE" || doc.document_type === "DIPLOMA"
-  );
-  const otherDocuments = documents.filter(
-    (doc) => doc.document_type !== "TRANSCRIPT" && doc.document_type !== "CERTIFICATE" && doc.document_type !== "DIPLOMA"
-  );
-
   const canDownload = !user?.owes_fees && !user?.total_debt;
 
   return (
@@ -193,49 +278,52 @@ const AlumniDashboard = () => {
                 Transcripts
               </h2>
               {transcripts.length > 0 ? (
-                <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-4">
-                  {transcripts.map((doc) => (
-                    <Card key={doc.id} className="hover:shadow-lg transition-shadow">
-                      <CardHeader>
-                        <div className="flex items-start justify-between">
-                          {getDocumentIcon(doc.document_type)}
-                          {doc.is_verified && (
-                            <span className="text-xs bg-green-100 text-green-800 px-2 py-1 rounded">
-                              Verified
-                            </span>
-                          )}
-                        </div>
-                        <CardTitle className="text-lg mt-2">{doc.title}</CardTitle>
-                      </CardHeader>
-                      <CardContent>
-                        <div className="space-y-3">
-                          <div className="text-sm text-muted-foreground">
-                            <p>Uploaded: {formatDate(doc.uploaded_at)}</p>
-                            <p>Size: {formatFileSize(doc.file_size)}</p>
-                          </div>
-                          <Button
-                            onClick={() => handleDownload(doc.id, doc.title)}
-                            disabled={!canDownload || downloading === doc.id}
-                            className="w-full"
-                            variant={canDownload ? "default" : "outline"}
-                          >
-                            {downloading === doc.id ? (
-                              <>
-                                <Loader2 className="h-4 w-4 mr-2 animate-spin" />
-                                Downloading...
-                              </>
-                            ) : (
-                              <>
-                                <Download className="h-4 w-4 mr-2" />
-                                Download Transcript
-                              </>
+                <>
+                  <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-4">
+                    {transcripts.map((doc) => (
+                      <Card key={doc.id} className="hover:shadow-lg transition-shadow">
+                        <CardHeader>
+                          <div className="flex items-start justify-between">
+                            {getDocumentIcon(doc.document_type)}
+                            {doc.is_verified && (
+                              <span className="text-xs bg-green-100 text-green-800 px-2 py-1 rounded">
+                                Verified
+                              </span>
                             )}
-                          </Button>
-                        </div>
-                      </CardContent>
-                    </Card>
-                  ))}
-                </div>
+                          </div>
+                          <CardTitle className="text-lg mt-2">{doc.title}</CardTitle>
+                        </CardHeader>
+                        <CardContent>
+                          <div className="space-y-3">
+                            <div className="text-sm text-muted-foreground">
+                              <p>Uploaded: {formatDate(doc.uploaded_at)}</p>
+                              <p>Size: {formatFileSize(doc.file_size)}</p>
+                            </div>
+                            <Button
+                              onClick={() => handleDownload(doc.id, doc.title)}
+                              disabled={!canDownload || downloading === doc.id}
+                              className="w-full"
+                              variant={canDownload ? "default" : "outline"}
+                            >
+                              {downloading === doc.id ? (
+                                <>
+                                  <Loader2 className="h-4 w-4 mr-2 animate-spin" />
+                                  Downloading...
+                                </>
+                              ) : (
+                                <>
+                                  <Download className="h-4 w-4 mr-2" />
+                                  Download Transcript
+                                </>
+                              )}
+                            </Button>
+                          </div>
+                        </CardContent>
+                      </Card>
+                    ))}
+                  </div>
+                  {renderLoadMore("transcripts", transcripts.length)}
+                </>
               ) : (
                 <Card>
                   <CardContent className="p-8 text-center text-muted-foreground">
@@ -256,49 +344,52 @@ const AlumniDashboard = () => {
                 Certificates & Testimonials
               </h2>
               {certificates.length > 0 ? (
-                <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-4">
-                  {certificates.map((doc) => (
-                    <Card key={doc.id} className="hover:shadow-lg transition-shadow">
-                      <CardHeader>
-                        <div className="flex items-start justify-between">
-                          {getDocumentIcon(doc.document_type)}
-                          {doc.is_verified && (
-                            <span className="text-xs bg-green-100 text-green-800 px-2 py-1 rounded">
-                              Verified
-                            </span>
-                          )}
-                        </div>
-                        <CardTitle className="text-lg mt-2">{doc.title}</CardTitle>
-                      </CardHeader>
-                      <CardContent>
-                        <div className="space-y-3">
-                          <div className="text-sm text-muted-foreground">
-                            <p>Uploaded: {formatDate(doc.uploaded_at)}</p>
-                            <p>Size: {formatFileSize(doc.file_size)}</p>
-                          </div>
-                          <Button
-                            onClick={() => handleDownload(doc.id, doc.title)}
-                            disabled={!canDownload || downloading === doc.id}
-                            className="w-full"
-                            variant={canDownload ? "default" : "outline"}
-                          >
-                            {downloading === doc.id ? (
-                              <>
-                                <Loader2 className="h-4 w-4 mr-2 animate-spin" />
-                                Downloading...
-                              </>
-                            ) : (
-                              <>
-                                <Download className="h-4 w-4 mr-2" />
-                                Download {doc.document_type === "DIPLOMA" ? "Diploma" : "Certificate"}
-                              </>
+                <>
+                  <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-4">
+                    {certificates.map((doc) => (
+                      <Card key={doc.id} className="hover:shadow-lg transition-shadow">
+                        <CardHeader>
+                          <div className="flex items-start justify-between">
+                            {getDocumentIcon(doc.document_type)}
+                            {doc.is_verified && (
+                              <span className="text-xs bg-green-100 text-green-800 px-2 py-1 rounded">
+                                Verified
+                              </span>
                             )}
-                          </Button>
-                        </div>
-                      </CardContent>
-                    </Card>
-                  ))}
-                </div>
+                          </div>
+                          <CardTitle className="text-lg mt-2">{doc.title}</CardTitle>
+                        </CardHeader>
+                        <CardContent>
+                          <div className="space-y-3">
+                            <div className="text-sm text-muted-foreground">
+                              <p>Uploaded: {formatDate(doc.uploaded_at)}</p>
+                              <p>Size: {formatFileSize(doc.file_size)}</p>
+                            </div>
+                            <Button
+                              onClick={() => handleDownload(doc.id, doc.title)}
+                              disabled={!canDownload || downloading === doc.id}
+                              className="w-full"
+                              variant={canDownload ? "default" : "outline"}
+                            >
+                              {downloading === doc.id ? (
+                                <>
+                                  <Loader2 className="h-4 w-4 mr-2 animate-spin" />
+                                  Downloading...
+                                </>
+                              ) : (
+                                <>
+                                  <Download className="h-4 w-4 mr-2" />
+                                  Download {doc.document_type === "DIPLOMA" ? "Diploma" : "Certificate"}
+                                </>
+                              )}
+                            </Button>
+                          </div>
+                        </CardContent>
+                      </Card>
+                    ))}
+                  </div>
+                  {renderLoadMore("certificates", certificates.length)}
+                </>
               ) : (
                 <Card>
                   <CardContent className="p-8 text-center text-muted-foreground">
@@ -359,6 +450,7 @@ const AlumniDashboard = () => {
                     </Card>
                   ))}
                 </div>
+                {renderLoadMore("others", otherDocuments.length)}
               </section>
             )}
           </div>